@@ -56,6 +56,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'inventory.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -143,7 +144,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Pagination par curseur (inventory/pagination.py) : temps constant quelle que
+    # soit la page, total compté uniquement avec `count=1`
+    'DEFAULT_PAGINATION_CLASS': 'inventory.pagination.KeysetPagination',
     'PAGE_SIZE': 50,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -160,9 +163,79 @@ REST_FRAMEWORK = {
 # GraphQL
 GRAPHENE = {
     'SCHEMA': 'inventory.schema.schema',
+    # DjangoDebugMiddleware enregistre chaque requête SQL : développement uniquement
     'MIDDLEWARE': [
         'graphene_django.debug.DjangoDebugMiddleware',
-    ],
+    ] if DEBUG else [],
+}
+
+
+# Ingestion des inventaires
+# 'sync'  : l'inventaire est traité pendant la requête GraphQL (par défaut)
+# 'spool' : syncInventory enregistre l'inventaire brut et répond immédiatement ;
+#           rien n'est ingéré tant que `python manage.py process_ingest_spool --loop`
+#           ne tourne pas en permanence
+INVENTORY_INGEST_MODE = os.getenv('INVENTORY_INGEST_MODE', 'sync')
+
+# Historique matériel/réseau : une image complète toutes les N modifications,
+# des différences entre les deux
+INVENTORY_SNAPSHOT_KEYFRAME_INTERVAL = 20
+
+# Nombre de documents GraphQL analysés et validés conservés en mémoire (LRU)
+GRAPHQL_DOCUMENT_CACHE_SIZE = 500
+
+# Budgets des requêtes GraphQL par classe de client (anonyme, authentifié,
+# membre du staff) : profondeur maximale et coût estimé maximal. Le coût
+# multiplie chaque niveau par la taille de page ou, pour les listes non
+# paginées, par GRAPHQL_LIST_SIZE_ESTIMATE.
+GRAPHQL_QUERY_BUDGETS = {
+    'anonymous': {'max_depth': 8, 'max_cost': 5000},
+    'authenticated': {'max_depth': 12, 'max_cost': 50000},
+    'staff': {'max_depth': 15, 'max_cost': 500000},
+}
+GRAPHQL_LIST_SIZE_ESTIMATE = 100
+
+# Nombre maximal d'éléments renvoyés par les listes non paginées (allComputers,
+# allSoftware, allLogs), y compris avec un argument `limit` plus grand
+GRAPHQL_LIST_MAX_RESULTS = 1000
+
+# Profilage des requêtes (inventory/profiling.py). Un profil détaillé (SQL les
+# plus lents, durées des résolveurs GraphQL, cProfile avec `X-Profile: cprofile`)
+# est établi sur demande (en-tête `X-Profile` en DEBUG, pour le staff ou avec
+# `X-Profile-Token`) ou pour une fraction SAMPLE_RATE des requêtes. Les requêtes
+# profilées ou plus lentes que SLOW_REQUEST_MS sont conservées dans RING_DIR
+# (RING_SIZE fichiers au plus).
+INVENTORY_PROFILING = {
+    'TOKEN': os.getenv('PROFILING_TOKEN', ''),
+    'SAMPLE_RATE': float(os.getenv('PROFILING_SAMPLE_RATE', '0')),
+    'SLOW_REQUEST_MS': 1000,
+    'RING_DIR': BASE_DIR / 'logs' / 'slow_requests',
+    'RING_SIZE': 200,
+}
+
+# Conservation des logs d'inventaire, en jours, par type (None : illimitée).
+# Appliquée par `manage.py prune_inventory_logs` ; les scans plus anciens sont
+# regroupés en un log 'summary' par ordinateur et par jour.
+INVENTORY_LOG_RETENTION_DAYS = {
+    'scan': 7,
+    'sync': 30,
+    'error': 90,
+    'change': 365,
+    'summary': 365,
+}
+
+# Durée (s) pendant laquelle un client peut réutiliser la réponse du dashboard
+# sans la redemander (Cache-Control: max-age). Les compteurs sont maintenus à
+# l'ingestion et recalculés par `manage.py reconcile_fleet_statistics`.
+INVENTORY_DASHBOARD_MAX_AGE = 30
+
+# Alias de normalisation des logiciels (inventory/canonical.py), ajoutés aux
+# alias par défaut : valeur après application des règles (insensible à la
+# casse) -> valeur canonique. Après une modification, lancer
+# `manage.py canonicalize_software`.
+INVENTORY_CANONICAL_ALIASES = {
+    'names': {},
+    'publishers': {},
 }
 
 
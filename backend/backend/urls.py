@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
+from inventory.graphql_view import InventoryGraphQLView
 from inventory.schema import schema
 
 urlpatterns = [
@@ -27,5 +27,5 @@ urlpatterns = [
     path('', include('inventory.urls')),
     
     # GraphQL endpoint
-    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True, schema=schema))),
+    path('graphql/', csrf_exempt(InventoryGraphQLView.as_view(graphiql=True, schema=schema))),
 ]
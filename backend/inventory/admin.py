@@ -3,10 +3,16 @@ Interface d'administration Django
 """
 
 from django.contrib import admin
+from django.db import transaction
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Computer, Software, InventoryLog
+from django.utils import timezone
+from .models import Computer, ComputerSnapshot, Software, InventoryLog, IngestSpool, SoftwareProduct, Vulnerability, VulnerableRange
+from .ingest import save_software
+from .search import matching_computer_ids
+from .snapshots import record_changes
+from .statistics import fleet_counters, update_fleet_statistics
 
 
 @admin.register(Computer)
@@ -55,6 +61,25 @@ class ComputerAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Optimise les requêtes"""
         return super().get_queryset(request).prefetch_related('software_list')
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Recherche via l'index plein texte au lieu de LIKE '%x%' sur chaque champ"""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(id__in=matching_computer_ids(search_term)), False
+    
+    def save_model(self, request, obj, form, change):
+        """Enregistre l'ordinateur, historise le matériel/réseau modifié et met à jour les statistiques du parc"""
+        previous = Computer.objects.filter(pk=obj.pk).first() if change else None
+        obj.refresh_fingerprints()
+        super().save_model(request, obj, form, change)
+        update_fleet_statistics(fleet_counters(previous), fleet_counters(obj))
+        sections = {field: getattr(obj, field) for field in ComputerSnapshot.SECTION_FIELDS.values()}
+        if previous is None:
+            record_changes(obj, sections, obj.created_at, created=True)
+        else:
+            # Comparaison avec l'état stocké avant l'enregistrement
+            record_changes(previous, sections, timezone.now())
 
 
 @admin.register(Software)
@@ -92,8 +117,57 @@ class SoftwareAdmin(admin.ModelAdmin):
     computer_link.short_description = 'Ordinateur'
     
     def get_queryset(self, request):
-        """Optimise les requêtes"""
-        return super().get_queryset(request).select_related('computer')
+        """Optimise les requêtes (logiciels désinstallés inclus)"""
+        queryset = Software.all_objects.select_related('computer')
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+    
+    # Écritures via save_software : catalogue, historique, présence,
+    # vulnérabilités et nombres d'installations suivent la modification
+    def save_model(self, request, obj, form, change):
+        save_software(obj)
+    
+    def delete_model(self, request, obj):
+        save_software(obj, delete=True)
+    
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for software in queryset:
+            save_software(software, delete=True)
+
+
+@admin.register(SoftwareProduct)
+class SoftwareProductAdmin(admin.ModelAdmin):
+    """Administration du catalogue des produits logiciels"""
+    
+    list_display = ['name', 'publisher', 'created_at']
+    search_fields = ['name', 'publisher']
+    readonly_fields = ['created_at']
+
+
+class VulnerableRangeInline(admin.TabularInline):
+    model = VulnerableRange
+    extra = 0
+    fields = ['product_name', 'publisher', 'version_start', 'start_inclusive', 'version_end', 'end_inclusive']
+
+
+@admin.register(Vulnerability)
+class VulnerabilityAdmin(admin.ModelAdmin):
+    """Administration du catalogue local des vulnérabilités"""
+    
+    list_display = ['identifier', 'severity', 'cvss', 'published_at', 'imported_at']
+    list_filter = ['severity']
+    search_fields = ['identifier', 'summary']
+    readonly_fields = ['imported_at']
+    inlines = [VulnerableRangeInline]
+    
+    def save_model(self, request, obj, form, change):
+        # Nouvelle révision du catalogue : l'index des intervalles est rechargé
+        # (rapprocher le parc avec `manage.py match_vulnerabilities`)
+        obj.imported_at = timezone.now()
+        super().save_model(request, obj, form, change)
 
 
 @admin.register(InventoryLog)
@@ -142,3 +216,23 @@ class InventoryLogAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """Empêche la modification des logs"""
         return False
+
+
+@admin.register(IngestSpool)
+class IngestSpoolAdmin(admin.ModelAdmin):
+    """Administration de la file d'attente d'ingestion"""
+    
+    list_display = [
+        'serial_number', 'status', 'attempts', 'received_at', 'processed_at', 'latency_ms'
+    ]
+    list_filter = ['status', 'received_at']
+    search_fields = ['serial_number']
+    readonly_fields = [
+        'serial_number', 'status', 'worker', 'attempts', 'error',
+        'received_at', 'claimed_at', 'processed_at', 'latency_ms'
+    ]
+    exclude = ['payload']
+    
+    def has_add_permission(self, request):
+        """Empêche l'ajout manuel d'inventaires"""
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        # Statistiques du parc, index de recherche et nombres d'installations mis à jour par signaux
+        from . import rollups, search, statistics  # noqa: F401
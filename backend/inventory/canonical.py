@@ -0,0 +1,189 @@
+"""
+Normalisation des noms et des éditeurs de logiciels
+
+Les valeurs DisplayName / Publisher remontées par les agents varient d'un
+poste à l'autre pour un même logiciel (« Microsoft Corporation » et
+« Microsoft Corp. », « 7-Zip 23.01 (x64) » et « 7-Zip 22.01 »). Le nom et
+l'éditeur canoniques sont calculés à l'ingestion et stockés à côté des
+valeurs brutes (`canonical_name`, `canonical_publisher`) ; le catalogue des
+produits est indexé sur ces valeurs, ce qui regroupe les variantes.
+
+Les règles sont des expressions régulières compilées une fois et des tables
+d'alias (complétées par le réglage INVENTORY_CANONICAL_ALIASES). Le résultat
+est mémorisé par valeur brute : une valeur déjà vue sur le parc ne coûte
+qu'une recherche dans un dictionnaire.
+
+Après une modification des règles, `manage.py canonicalize_software`
+recalcule les valeurs canoniques des logiciels existants.
+"""
+
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+# Nombre de valeurs brutes mémorisées (noms et éditeurs, séparément)
+CACHE_SIZE = 100000
+
+# Formes juridiques retirées des éditeurs (« Google LLC », « Adobe Systems Incorporated »)
+LEGAL_SUFFIX_PATTERN = re.compile(
+    r'[\s,]+(?:inc|incorporated|corp|corporation|co|company|llc|ltd|limited|gmbh|ag|sa|s\.a|sas|sarl|'
+    r'b\.?v|n\.?v|l\.?p|plc|pty|s\.?r\.?o|s\.?p\.?a|oy|ab|as|kg|co\.?\s*kg|srl)\.?$',
+    re.IGNORECASE
+)
+
+# Règles appliquées aux noms, dans l'ordre
+NAME_PATTERNS = [
+    # Architecture et langue entre parenthèses : « (x64) », « (64-bit) », « (x64 fr) », « (en-US) »
+    re.compile(
+        r'\s*\((?:\s*(?:x64|x86|x86_64|amd64|arm64|64|32|(?:32|64)[- ]?bits?|[a-z]{2}(?:-[a-z]{2,4})?)\s*)+\)',
+        re.IGNORECASE
+    ),
+    # Version en suffixe séparée par un tiret : « ... Redistributable - 14.36.32532 »
+    re.compile(r'\s+-\s+v?\d+(?:\.\d+)+\S*$', re.IGNORECASE),
+    # Mise à jour Java : « Java 8 Update 301 »
+    re.compile(r'\s+update\s+\d+$', re.IGNORECASE),
+    # Version à points en suffixe : « Mozilla Firefox 120.0.1 », « 7-Zip 23.01 », « VLC v3.0.20 »
+    re.compile(r'\s+(?:version\s+)?v?\d+(?:\.\d+)+[a-z0-9.\-]*$', re.IGNORECASE),
+    # Architecture en suffixe : « ... x64 », « ... 64-bit »
+    re.compile(r'[\s\-]+(?:x64|x86|amd64|arm64|(?:32|64)[- ]?bits?)$', re.IGNORECASE),
+]
+
+# Gammes dont la version majeure (ou majeure.mineure) fait partie de l'identité
+# du produit : elle est conservée, seuls les numéros de correctif et de build
+# sont retirés (« Python 3.11.7 (64-bit) » -> « Python 3.11 », « Microsoft .NET
+# Framework 4.8 » inchangé, « Java 8 Update 301 » -> « Java 8 »)
+VERSIONED_NAME_PATTERNS = [
+    re.compile(r'^(?P<product>python)\s+v?(?P<version>\d+\.\d+)(?:\.\d+)*(?:[a-z]+\d*)?(?=[\s(]|$)', re.IGNORECASE),
+    re.compile(
+        r'^(?P<product>(?:microsoft\s+)?(?:asp\.net|\.net)(?:\s+(?:framework|core|runtime|sdk))*)'
+        r'\s+(?:-\s+)?v?(?P<version>\d+\.\d+)(?:\.\d+)*(?=[\s(]|$)',
+        re.IGNORECASE
+    ),
+    re.compile(
+        r'^(?P<product>java(?:\s+se)?(?:\s+(?:development\s+kit|runtime\s+environment))?)'
+        r'\s+(?P<version>\d+)(?:\.\d+)*(?=[\s(]|$)',
+        re.IGNORECASE
+    ),
+]
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Marques déposées : « Intel(R) », « Windows® », « (TM) »
+TRADEMARK_PATTERN = re.compile(r'\((?:r|tm|c)\)|[®™©]', re.IGNORECASE)
+
+# Alias (clé en minuscules, après application des règles) -> valeur canonique
+DEFAULT_PUBLISHER_ALIASES = {
+    'microsoft': 'Microsoft',
+    'google': 'Google',
+    'adobe': 'Adobe',
+    'adobe systems': 'Adobe',
+    'oracle': 'Oracle',
+    'oracle america': 'Oracle',
+    'mozilla': 'Mozilla',
+    'mozilla foundation': 'Mozilla',
+    'apple': 'Apple',
+    'intel': 'Intel',
+    'nvidia': 'NVIDIA',
+    'hp': 'HP',
+    'hp development': 'HP',
+    'hewlett-packard': 'HP',
+    'hewlett packard': 'HP',
+    'dell': 'Dell',
+    'dell technologies': 'Dell',
+    'lenovo': 'Lenovo',
+    'igor pavlov': 'Igor Pavlov',
+    'videolan': 'VideoLAN',
+    'the git development community': 'Git',
+    'python software foundation': 'Python Software Foundation',
+    'anydesk software': 'AnyDesk',
+    'teamviewer': 'TeamViewer',
+    'citrix systems': 'Citrix',
+    'vmware': 'VMware',
+    'cisco systems': 'Cisco',
+    'zoom video communications': 'Zoom',
+    'crowdstrike': 'CrowdStrike',
+}
+
+DEFAULT_NAME_ALIASES = {
+    'adobe acrobat reader dc': 'Adobe Acrobat Reader',
+    'adobe acrobat reader dc mui': 'Adobe Acrobat Reader',
+    'adobe acrobat dc': 'Adobe Acrobat',
+    'microsoft edge webview2 runtime': 'Microsoft Edge WebView2 Runtime',
+    'microsoft teams classic': 'Microsoft Teams',
+    'teams machine-wide installer': 'Microsoft Teams Machine-Wide Installer',
+    'vlc media player': 'VLC media player',
+    'zoom workplace': 'Zoom',
+}
+
+
+def configured_aliases():
+    """Alias par défaut complétés par le réglage INVENTORY_CANONICAL_ALIASES"""
+    custom = getattr(settings, 'INVENTORY_CANONICAL_ALIASES', {})
+    return (
+        {**DEFAULT_NAME_ALIASES, **{key.lower(): value for key, value in custom.get('names', {}).items()}},
+        {**DEFAULT_PUBLISHER_ALIASES, **{key.lower(): value for key, value in custom.get('publishers', {}).items()}},
+    )
+
+
+NAME_ALIASES, PUBLISHER_ALIASES = configured_aliases()
+
+
+def clean(value):
+    return WHITESPACE_PATTERN.sub(' ', TRADEMARK_PATTERN.sub('', value or '')).strip(' ,.-_')
+
+
+def strip_name_noise(value):
+    for pattern in NAME_PATTERNS:
+        value = clean(pattern.sub('', value))
+    return value
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_name(name):
+    """Nom canonique d'un logiciel (sans version, architecture ni langue, sauf version de gamme)"""
+    raw = clean(name)
+    value = None
+    for pattern in VERSIONED_NAME_PATTERNS:
+        match = pattern.match(raw)
+        if match is None:
+            continue
+        # Règles appliquées au nom sans sa version, remise ensuite après le produit
+        product = match['product']
+        stripped = strip_name_noise(product + raw[match.end():])
+        if stripped.startswith(product):
+            value = f"{product} {match['version']}{stripped[len(product):]}"
+        break
+    if value is None:
+        value = strip_name_noise(raw) or raw
+    return NAME_ALIASES.get(value.lower(), value)[:255]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_publisher(publisher):
+    """Éditeur canonique (sans forme juridique, alias connus)"""
+    raw = clean(publisher)
+    value = raw
+    # Formes juridiques successives : « Foo Software Co., Ltd. »
+    while True:
+        stripped = clean(LEGAL_SUFFIX_PATTERN.sub('', value))
+        if stripped == value or not stripped:
+            break
+        value = stripped
+    alias = PUBLISHER_ALIASES.get(value.lower()) or PUBLISHER_ALIASES.get(raw.lower())
+    return (alias or value or raw)[:255]
+
+
+def product_family(name):
+    """Nom canonique sans version de gamme (« Python 3.11 » -> « Python »), tel que nommé par les avis de sécurité"""
+    for pattern in VERSIONED_NAME_PATTERNS:
+        match = pattern.match(name)
+        if match is not None:
+            return clean(match['product'] + name[match.end():])
+    return name
+
+
+def clear_cache():
+    """Vide les résultats mémorisés (après modification des règles)"""
+    canonical_name.cache_clear()
+    canonical_publisher.cache_clear()
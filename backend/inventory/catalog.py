@@ -0,0 +1,174 @@
+"""
+Catalogue des logiciels : produits et versions dédupliqués sur le parc
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from .canonical import canonical_name, canonical_publisher, clear_cache
+from .models import Software, SoftwareInstallHistory, SoftwareProduct, SoftwareVersion
+from .search import index_products
+from .versions import version_key
+
+
+class SoftwareCatalog:
+    """
+    Résout (nom canonique, éditeur canonique, version) en identifiants du catalogue.
+
+    Les entrées du catalogue ne sont jamais modifiées : leurs identifiants
+    sont conservés dans un cache mémoire propre au processus, alimenté
+    uniquement après validation de la transaction qui les a lus ou créés.
+    """
+
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self._products = {}
+        self._versions = {}
+
+    def clear(self):
+        self._products.clear()
+        self._versions.clear()
+
+    def _remember(self, cache, resolved):
+        if len(cache) + len(resolved) > self.max_entries:
+            cache.clear()
+        cache.update(resolved)
+
+    def product_ids(self, keys):
+        """Retourne {(nom, éditeur): id}, en créant les produits manquants"""
+        keys = set(keys)
+        result = {key: self._products[key] for key in keys if key in self._products}
+        missing = keys - result.keys()
+        if not missing:
+            return result
+
+        SoftwareProduct.objects.bulk_create(
+            [SoftwareProduct(name=name, publisher=publisher) for name, publisher in missing],
+            ignore_conflicts=True
+        )
+        resolved = {}
+        rows = SoftwareProduct.objects.filter(
+            name__in={name for name, _ in missing},
+            publisher__in={publisher for _, publisher in missing}
+        ).values_list('name', 'publisher', 'id')
+        for name, publisher, product_id in rows:
+            if (name, publisher) in missing:
+                resolved[(name, publisher)] = product_id
+        # Nouveaux produits dans l'index de recherche (déjà indexés : ignorés)
+        index_products(resolved.values())
+
+        transaction.on_commit(lambda: self._remember(self._products, resolved))
+        result.update(resolved)
+        return result
+
+    def version_ids(self, keys):
+        """Retourne {(id produit, version): id}, en créant les versions manquantes"""
+        keys = set(keys)
+        result = {key: self._versions[key] for key in keys if key in self._versions}
+        missing = keys - result.keys()
+        if not missing:
+            return result
+
+        SoftwareVersion.objects.bulk_create(
+            [
+                SoftwareVersion(product_id=product_id, version=version, version_key=version_key(version))
+                for product_id, version in missing
+            ],
+            ignore_conflicts=True
+        )
+        resolved = {}
+        rows = SoftwareVersion.objects.filter(
+            product_id__in={product_id for product_id, _ in missing},
+            version__in={version for _, version in missing}
+        ).values_list('product_id', 'version', 'id')
+        for product_id, version, version_id in rows:
+            if (product_id, version) in missing:
+                resolved[(product_id, version)] = version_id
+
+        transaction.on_commit(lambda: self._remember(self._versions, resolved))
+        result.update(resolved)
+        return result
+
+    def assign(self, software_list):
+        """Renseigne product_id et product_version_id sur des instances de Software"""
+        if not software_list:
+            return
+        # Produits identifiés par le nom et l'éditeur canoniques (voir canonical.py)
+        products = self.product_ids(
+            (software.canonical_name, software.canonical_publisher) for software in software_list
+        )
+        for software in software_list:
+            software.product_id = products[(software.canonical_name, software.canonical_publisher)]
+        versions = self.version_ids((software.product_id, software.version) for software in software_list)
+        for software in software_list:
+            software.product_version_id = versions[(software.product_id, software.version)]
+
+
+# Instance partagée par le processus
+software_catalog = SoftwareCatalog()
+
+
+@transaction.atomic
+def canonicalize_software(batch_size=2000, prune=False):
+    """
+    Recalcule le nom et l'éditeur canoniques des logiciels (après une
+    modification des règles de canonical.py) et rattache les logiciels
+    concernés, et leur historique, au produit correspondant. `prune` supprime
+    les produits qui ne sont plus référencés.
+
+    Les index dérivés du catalogue (présence, vulnérabilités, recherche) sont
+    à reconstruire ensuite. Retourne (logiciels rattachés, produits supprimés).
+    """
+    from .vulnerabilities import remove_findings
+
+    clear_cache()
+    software_catalog.clear()
+    products = {
+        product_id: (name, publisher)
+        for product_id, name, publisher in SoftwareProduct.objects.values_list('id', 'name', 'publisher').iterator()
+    }
+    updated = 0
+    last_id = 0
+    while True:
+        # Parcours par identifiant : les lots lus ne sont pas modifiés pendant la lecture
+        batch = list(
+            Software.all_objects.filter(id__gt=last_id).order_by('id').only(
+                'id', 'name', 'version', 'publisher', 'canonical_name', 'canonical_publisher', 'product_id',
+                'product_version_id'
+            )[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        changed = []
+        for software in batch:
+            software.canonical_name = canonical_name(software.name)
+            software.canonical_publisher = canonical_publisher(software.publisher)
+            if products.get(software.product_id) != (software.canonical_name, software.canonical_publisher):
+                changed.append(software)
+        if not changed:
+            continue
+        software_catalog.assign(changed)
+        Software.all_objects.bulk_update(
+            changed, ['canonical_name', 'canonical_publisher', 'product', 'product_version'], batch_size=500
+        )
+        by_product = defaultdict(list)
+        for software in changed:
+            by_product[software.product_id].append(software.id)
+        for product_id, software_ids in by_product.items():
+            SoftwareInstallHistory.objects.filter(software_id__in=software_ids).update(product_id=product_id)
+        remove_findings([software.id for software in changed])
+        products.update(
+            (software.product_id, (software.canonical_name, software.canonical_publisher)) for software in changed
+        )
+        updated += len(changed)
+
+    pruned = 0
+    if prune:
+        pruned = SoftwareProduct.objects.filter(installations__isnull=True, history__isnull=True).delete()[1].get(
+            SoftwareProduct._meta.label, 0
+        )
+    # Identifiants résolus pendant la transaction : ceux des produits supprimés ne doivent pas être conservés
+    transaction.on_commit(software_catalog.clear)
+    return updated, pruned
@@ -0,0 +1,239 @@
+"""
+Requêtes de conformité du parc sur l'index de présence des logiciels
+
+Une expression combine des produits du catalogue avec AND, OR, NOT et des
+parenthèses. Un produit est désigné par son identifiant ou par son nom entre
+guillemets (tous les éditeurs), éventuellement suivi d'une contrainte de
+version (=, !=, <, <=, >, >=) :
+
+    "CrowdStrike Falcon Sensor" AND NOT "AnyDesk"
+    "Google Chrome" < 120.0 OR (42 AND NOT 43 >= 2.1)
+
+L'expression est évaluée sur les bitmaps de présence (presence.py) chargés
+en une requête : le résultat est l'ensemble des ordinateurs actifs qui la
+satisfont, sans jointure sur la table Software.
+"""
+
+import re
+
+from django.db.models import Q
+
+from .models import Computer, SoftwareProduct
+from .presence import bitmap_from_ids, bitmap_ids, product_bitmaps
+from .versions import version_key
+
+TOKEN_PATTERN = re.compile(
+    r'\s*(?:(?P<paren>[()])|(?P<op><=|>=|!=|=|<|>)|"(?P<string>(?:[^"\\]|\\.)*)"|(?P<word>[^\s()<>=!"]+))'
+)
+
+KEYWORDS = {'AND', 'OR', 'NOT'}
+
+VERSION_OPERATORS = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+class ExpressionError(ValueError):
+    """Expression de conformité invalide"""
+
+
+def tokenize(expression):
+    """[(type, valeur)] d'une expression ; type : paren, op, string, word ou keyword"""
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if match is None or match.end() == position:
+            if expression[position] == '"':
+                raise ExpressionError(f"Guillemet fermant manquant à partir de la position {position}")
+            raise ExpressionError(f"Caractère inattendu à la position {position} : {expression[position]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            value = re.sub(r'\\(.)', r'\1', value)
+        elif kind == 'word' and value.upper() in KEYWORDS:
+            kind, value = 'keyword', value.upper()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    """
+    Analyse descendante : OR < AND < NOT < terme ou parenthèses.
+
+    Produit un arbre de tuples : ('or', a, b), ('and', a, b), ('not', a) et
+    ('product', identifiant ou nom, opérateur, version).
+    """
+
+    def __init__(self, expression):
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("Expression vide")
+        tree = self.parse_or()
+        if self.position < len(self.tokens):
+            raise ExpressionError(f"Élément inattendu : {self.peek()[1]!r}")
+        return tree
+
+    def parse_or(self):
+        tree = self.parse_and()
+        while self.peek() == ('keyword', 'OR'):
+            self.take()
+            tree = ('or', tree, self.parse_and())
+        return tree
+
+    def parse_and(self):
+        tree = self.parse_not()
+        while self.peek() == ('keyword', 'AND'):
+            self.take()
+            tree = ('and', tree, self.parse_not())
+        return tree
+
+    def parse_not(self):
+        if self.peek() == ('keyword', 'NOT'):
+            self.take()
+            return ('not', self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind, value = self.take()
+        if (kind, value) == ('paren', '('):
+            tree = self.parse_or()
+            if self.take() != ('paren', ')'):
+                raise ExpressionError("Parenthèse fermante manquante")
+            return tree
+        if kind == 'string':
+            product = value
+        elif kind == 'word' and value.isdigit():
+            product = int(value)
+        elif kind is None:
+            raise ExpressionError("Expression incomplète")
+        else:
+            raise ExpressionError(f"Produit attendu (identifiant ou nom entre guillemets) : {value!r}")
+
+        operator = version = None
+        if self.peek()[0] == 'op':
+            operator = self.take()[1]
+            kind, version = self.take()
+            if kind not in ('word', 'string'):
+                raise ExpressionError(f"Version attendue après {operator}")
+        return ('product', product, operator, version)
+
+
+def parse_expression(expression):
+    return Parser(expression).parse()
+
+
+def product_terms(tree):
+    """Termes produit d'un arbre"""
+    if tree[0] == 'product':
+        return [tree]
+    return [term for child in tree[1:] for term in product_terms(child)]
+
+
+def resolve_products(terms):
+    """{nom ou identifiant: [ids produits]} ; ExpressionError pour un produit inconnu"""
+    ids = {term[1] for term in terms if isinstance(term[1], int)}
+    names = {term[1] for term in terms if isinstance(term[1], str)}
+    products = {}
+    if ids:
+        known = set(SoftwareProduct.objects.filter(id__in=ids).values_list('id', flat=True))
+        for product_id in ids:
+            products[product_id] = [product_id] if product_id in known else []
+    if names:
+        lowered = {name.lower(): name for name in names}
+        for name in names:
+            products[name] = []
+        condition = Q()
+        for name in names:
+            condition |= Q(name__iexact=name)
+        for product_id, product_name in SoftwareProduct.objects.filter(condition).values_list('id', 'name'):
+            products[lowered[product_name.lower()]].append(product_id)
+    unknown = [str(reference) for reference, product_ids in products.items() if not product_ids]
+    if unknown:
+        raise ExpressionError(f"Produits inconnus : {', '.join(unknown)}")
+    return products
+
+
+def evaluate_tree(tree, bitmaps, universe):
+    operation = tree[0]
+    if operation == 'or':
+        return evaluate_tree(tree[1], bitmaps, universe) | evaluate_tree(tree[2], bitmaps, universe)
+    if operation == 'and':
+        return evaluate_tree(tree[1], bitmaps, universe) & evaluate_tree(tree[2], bitmaps, universe)
+    if operation == 'not':
+        return universe & ~evaluate_tree(tree[1], bitmaps, universe)
+    return bitmaps[tree[1:]]
+
+
+def term_bitmap(versions, operator, version):
+    """
+    Union des bitmaps des versions satisfaisant la contrainte, comparées par
+    clé de version (les versions sans clé ne satisfont aucune contrainte)
+    """
+    value = 0
+    if operator is None:
+        for _, bitmap in versions:
+            value |= bitmap
+        return value
+    compare = VERSION_OPERATORS[operator]
+    target = version_key(version)
+    if not target:
+        raise ExpressionError(f"Version invalide : {version}")
+    for key, bitmap in versions:
+        if key and compare(key, target):
+            value |= bitmap
+    return value
+
+
+def active_computers_bitmap():
+    return bitmap_from_ids(Computer.objects.filter(is_active=True).values_list('id', flat=True).order_by())
+
+
+def evaluate(expression):
+    """Bitmap des ordinateurs actifs satisfaisant l'expression (ExpressionError si invalide)"""
+    tree = parse_expression(expression)
+    terms = product_terms(tree)
+    products = resolve_products(terms)
+    presence = product_bitmaps({product_id for ids in products.values() for product_id in ids})
+
+    bitmaps = {}
+    for _, reference, operator, version in terms:
+        versions = [entry for product_id in products[reference] for entry in presence.get(product_id, [])]
+        bitmaps[(reference, operator, version)] = term_bitmap(versions, operator, version)
+
+    universe = active_computers_bitmap()
+    return evaluate_tree(tree, bitmaps, universe) & universe
+
+
+def compliance(expression, limit=100):
+    """Nombre et premiers ordinateurs (par identifiant) satisfaisant l'expression"""
+    result = evaluate(expression)
+    ids = bitmap_ids(result, limit)
+    computers = Computer.objects.filter(id__in=ids).order_by('id').values(
+        'id', 'hostname', 'serial_number', 'current_user', 'last_seen'
+    )
+    return {
+        'expression': expression,
+        'count': result.bit_count(),
+        'computers': list(computers),
+    }
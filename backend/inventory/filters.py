@@ -0,0 +1,108 @@
+"""
+Filtres partagés par l'API REST et les connexions GraphQL
+"""
+
+from django import forms
+from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
+
+from .models import Computer, Software, SoftwareRollup
+from .search import matching_computer_ids
+from .versions import version_key
+
+
+class VersionKeyField(forms.CharField):
+    """Version saisie, convertie en clé de tri (voir versions.py)"""
+    
+    def clean(self, value):
+        value = super().clean(value)
+        if value in self.empty_values:
+            return value
+        key = version_key(value)
+        if not key:
+            raise forms.ValidationError(f"Version invalide : {value}")
+        return key
+
+
+class VersionFilter(filters.CharFilter):
+    """
+    Comparaison de versions sur la colonne indexée `version_key` : un
+    intervalle de l'index au lieu d'une comparaison de textes libres. Les
+    versions sans clé (« Unknown ») sont exclues.
+    """
+    
+    field_class = VersionKeyField
+    
+    def __init__(self, lookup_expr, field_name='version_key', **kwargs):
+        super().__init__(field_name=field_name, lookup_expr=lookup_expr, **kwargs)
+    
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        conditions = {f'{self.field_name}__{self.lookup_expr}': value}
+        if self.lookup_expr in ('lt', 'lte'):
+            conditions[f'{self.field_name}__gt'] = ''
+        return qs.filter(**conditions)
+
+
+class VersionRangeFilter(filters.BaseRangeFilter, VersionFilter):
+    """Versions comprises entre deux bornes incluses (« 119.0,120.0.6099 »)"""
+    
+    def __init__(self, field_name='version_key', **kwargs):
+        super().__init__(lookup_expr='range', field_name=field_name, **kwargs)
+
+
+class ComputerFilter(filters.FilterSet):
+    """Filtres pour les ordinateurs"""
+    
+    hostname = filters.CharFilter(lookup_expr='icontains')
+    manufacturer = filters.CharFilter(lookup_expr='icontains')
+    model = filters.CharFilter(lookup_expr='icontains')
+    current_user = filters.CharFilter(lookup_expr='icontains')
+    is_active = filters.BooleanFilter()
+    last_seen_after = filters.DateTimeFilter(field_name='last_seen', lookup_expr='gte')
+    last_seen_before = filters.DateTimeFilter(field_name='last_seen', lookup_expr='lte')
+    # Nom d'hôte, numéro de série, utilisateur, fabricant ou modèle, via l'index de recherche
+    search = filters.CharFilter(method='filter_search')
+    
+    class Meta:
+        model = Computer
+        fields = ['hostname', 'manufacturer', 'model', 'current_user', 'is_active']
+    
+    def filter_search(self, queryset, name, value):
+        return queryset.filter(id__in=matching_computer_ids(value))
+
+
+class SoftwareFilter(filters.FilterSet):
+    """Filtres pour les logiciels"""
+    
+    product_id = filters.NumberFilter()
+    name = filters.CharFilter(lookup_expr='istartswith')
+    publisher = filters.CharFilter()
+    version__lt = VersionFilter('lt')
+    version__lte = VersionFilter('lte')
+    version__gt = VersionFilter('gt')
+    version__gte = VersionFilter('gte')
+    version__between = VersionRangeFilter()
+    
+    class Meta:
+        model = Software
+        fields = ['product_id', 'name', 'publisher']
+
+
+class SoftwareRollupFilter(filters.FilterSet):
+    """Filtres pour les nombres d'installations (produit, éditeur, versions)"""
+    
+    product_id = filters.NumberFilter()
+    name = filters.CharFilter(field_name='product__name', lookup_expr='istartswith')
+    publisher = filters.CharFilter(field_name='product__publisher', lookup_expr='iexact')
+    min_count = filters.NumberFilter(field_name='install_count', lookup_expr='gte')
+    version__lt = VersionFilter('lt', field_name='version__version_key')
+    version__lte = VersionFilter('lte', field_name='version__version_key')
+    version__gt = VersionFilter('gt', field_name='version__version_key')
+    version__gte = VersionFilter('gte', field_name='version__version_key')
+    version__between = VersionRangeFilter(field_name='version__version_key')
+    
+    class Meta:
+        model = SoftwareRollup
+        fields = ['product_id', 'name', 'publisher', 'min_count']
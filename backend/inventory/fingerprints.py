@@ -0,0 +1,34 @@
+"""
+Empreintes de contenu des inventaires
+
+Les empreintes sont calculées de la même façon par l'agent
+(`inventory_agent/src/api_client.py`) : toute modification de l'algorithme
+doit être répercutée des deux côtés.
+"""
+
+import hashlib
+import json
+
+
+# Colonnes servant à l'empreinte d'un logiciel, dans l'ordre
+SOFTWARE_FINGERPRINT_FIELDS = [
+    'name', 'version', 'publisher', 'install_date',
+    'install_location', 'uninstall_string', 'source',
+]
+
+
+def content_fingerprint(value):
+    """Empreinte SHA-256 d'une valeur JSON sérialisée de façon canonique, '' si vide"""
+    if not value:
+        return ''
+    canonical = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def software_fingerprint(software_by_key):
+    """Empreinte de l'ensemble des logiciels normalisés, indexés par (nom, version)"""
+    rows = sorted(
+        [str(data[field]) for field in SOFTWARE_FINGERPRINT_FIELDS]
+        for data in software_by_key.values()
+    )
+    return content_fingerprint(rows)
@@ -0,0 +1,228 @@
+"""
+Vue GraphQL avec requêtes persistées, cache des documents compilés et
+limitation du coût des requêtes
+
+Les clients peuvent n'envoyer que l'empreinte SHA-256 d'une requête déjà
+connue du serveur (protocole « Automatic Persisted Queries » :
+`extensions.persistedQuery.sha256Hash`). Si le serveur ne la connaît pas, il
+répond `PersistedQueryNotFound` et le client renvoie la requête complète avec
+son empreinte, qui est alors enregistrée.
+
+Dans tous les cas, le document analysé et validé est conservé dans un cache
+LRU indexé par l'empreinte du texte : une requête déjà vue n'est ni
+ré-analysée ni re-validée. Son coût estimé est ensuite comparé au budget du
+client (voir query_cost.py) avant toute exécution.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, parse, validate,
+    validate_schema,
+)
+
+from .profiling import ResolverTimingMiddleware
+from .query_cost import check_query_cost
+
+PERSISTED_QUERY_CACHE_PREFIX = 'graphql:persisted:'
+PERSISTED_QUERY_NOT_FOUND = 'PersistedQueryNotFound'
+
+
+def query_hash(query):
+    """Empreinte SHA-256 du texte d'une requête"""
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """Cache LRU des documents analysés et validés, partagé par les threads du processus"""
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                self.misses += 1
+                return None
+            self._documents.move_to_end(key)
+            self.hits += 1
+            return document
+
+    def set(self, key, document):
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.max_entries:
+                self._documents.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self.hits = self.misses = 0
+
+
+class InventoryGraphQLView(GraphQLView):
+    """GraphQLView avec requêtes persistées, documents précompilés et budgets de coût"""
+
+    document_cache = DocumentCache(getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 500))
+
+    def get_middleware(self, request):
+        """Ajoute la mesure des résolveurs aux requêtes profilées uniquement"""
+        middleware = super().get_middleware(request)
+        profile = getattr(request, 'inventory_profile', None)
+        if profile is not None and profile.detailed:
+            middleware = list(middleware or []) + [ResolverTimingMiddleware()]
+        return middleware
+
+    def get_response(self, request, data, show_graphiql=False):
+        try:
+            return super().get_response(request, data, show_graphiql)
+        finally:
+            # DjangoDebugMiddleware (DEBUG) ne restaure les curseurs que si le
+            # champ _debug est demandé : sinon l'instrumentation resterait
+            # active sur la connexion pour les requêtes suivantes
+            debug = getattr(request, 'django_debug', None)
+            if debug is not None:
+                debug.disable_instrumentation()
+
+    def get_persisted_query_hash(self, request, data):
+        """Empreinte `extensions.persistedQuery.sha256Hash` de la requête, None si absente"""
+        extensions = data.get('extensions') or request.GET.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions invalides."))
+        if not isinstance(extensions, dict):
+            return None
+        persisted = extensions.get('persistedQuery')
+        if not isinstance(persisted, dict):
+            return None
+        return persisted.get('sha256Hash') or None
+
+    def get_document(self, schema, query):
+        """Document analysé et validé (depuis le cache si possible), et erreurs éventuelles"""
+        key = query_hash(query)
+        document = self.document_cache.get(key)
+        if document is not None:
+            return document, []
+
+        try:
+            document = parse(query)
+        except Exception as e:
+            return None, [e]
+
+        validation_errors = validate(
+            schema,
+            document,
+            self.validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        if validation_errors:
+            return None, validation_errors
+
+        self.document_cache.set(key, document)
+        return document, []
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        persisted_hash = self.get_persisted_query_hash(request, data)
+        if persisted_hash:
+            cache_key = PERSISTED_QUERY_CACHE_PREFIX + persisted_hash
+            if query:
+                if query_hash(query) != persisted_hash:
+                    return ExecutionResult(errors=[GraphQLError("L'empreinte ne correspond pas à la requête")])
+                cache.set(cache_key, query, timeout=None)
+            else:
+                query = cache.get(cache_key)
+                if query is None:
+                    return ExecutionResult(errors=[GraphQLError(
+                        PERSISTED_QUERY_NOT_FOUND, extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'}
+                    )])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, errors = self.get_document(schema, query)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is not None:
+            # Nom de l'opération, repris dans les profils de requêtes
+            request.graphql_operation = operation_name or (operation_ast.name and operation_ast.name.value)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        # Rejet avant exécution des requêtes hors budget (profondeur, coût estimé)
+        cost_error = check_query_cost(request, schema, document, operation_name, variables)
+        if cost_error is not None:
+            return ExecutionResult(data=None, errors=[cost_error])
+
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
@@ -0,0 +1,59 @@
+"""
+Historique temporel des installations de logiciels
+
+Chaque ligne de SoftwareInstallHistory est une période [valid_from, valid_to)
+pendant laquelle un logiciel était installé ; valid_to vaut NULL tant qu'il
+l'est toujours. Les périodes ne sont écrites que lors des changements.
+"""
+
+from django.db.models import Q
+
+from .models import SoftwareInstallHistory
+
+
+def open_intervals(software_list, now):
+    """Ouvre une période pour des logiciels installés ou réinstallés"""
+    SoftwareInstallHistory.objects.bulk_create([
+        SoftwareInstallHistory(
+            computer_id=software.computer_id,
+            software_id=software.id,
+            product_id=software.product_id,
+            name=software.name,
+            version=software.version,
+            publisher=software.publisher,
+            valid_from=now,
+        )
+        for software in software_list
+    ], batch_size=500)
+
+
+def close_intervals(software_ids, now):
+    """Ferme les périodes ouvertes de logiciels désinstallés"""
+    if not software_ids:
+        return 0
+    return SoftwareInstallHistory.objects.filter(
+        software_id__in=software_ids, valid_to__isnull=True
+    ).update(valid_to=now)
+
+
+def software_as_of(computer_id, at):
+    """Logiciels installés sur un ordinateur à une date donnée"""
+    return SoftwareInstallHistory.objects.filter(
+        Q(valid_to__isnull=True) | Q(valid_to__gt=at),
+        computer_id=computer_id,
+        valid_from__lte=at,
+    ).order_by('name', 'version')
+
+
+def software_changes(since, until=None, computer_id=None):
+    """Périodes ayant commencé (installation) ou fini (désinstallation) dans l'intervalle"""
+    started = Q(valid_from__gte=since)
+    ended = Q(valid_to__gte=since)
+    if until is not None:
+        started &= Q(valid_from__lt=until)
+        ended &= Q(valid_to__lt=until)
+
+    queryset = SoftwareInstallHistory.objects.filter(started | ended)
+    if computer_id:
+        queryset = queryset.filter(computer_id=computer_id)
+    return queryset.order_by('-valid_from', '-id')
@@ -0,0 +1,440 @@
+"""
+Logique d'ingestion des inventaires envoyés par les agents
+"""
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Computer, Software, InventoryLog
+from .canonical import canonical_name, canonical_publisher
+from .catalog import software_catalog
+from .history import open_intervals, close_intervals
+from .presence import installed_version_ids, record_presence_changes
+from .rollups import rollup_counts, update_software_rollups
+from .fingerprints import software_fingerprint
+from .snapshots import record_changes
+from .statistics import COUNTED_FIELDS, fleet_counters, update_fleet_statistics
+from .retention import day_start
+from .versions import version_key
+from .vulnerabilities import match_software, remove_findings
+
+
+class SoftwareSyncResult:
+    """Résultat d'une synchronisation des logiciels d'un ordinateur"""
+
+    def __init__(self, created=None, updated=None, deactivated_ids=None):
+        self.created = created or []
+        self.updated = updated or []
+        self.deactivated_ids = deactivated_ids or []
+
+
+class IngestResult:
+    """Résultat d'une ingestion d'inventaire"""
+
+    def __init__(self, computer, created=False, software=None, unchanged=False):
+        self.computer = computer
+        self.created = created
+        self.software = software or SoftwareSyncResult()
+        # Vrai si seul last_seen a été mis à jour
+        self.unchanged = unchanged
+
+    @property
+    def software_created(self):
+        return len(self.software.created)
+
+    @property
+    def software_updated(self):
+        return len(self.software.updated)
+
+    @property
+    def software_deactivated(self):
+        return len(self.software.deactivated_ids)
+
+
+# Champs comparés pour détecter qu'un logiciel existant a changé
+SOFTWARE_TRACKED_FIELDS = [
+    'publisher', 'canonical_name', 'canonical_publisher', 'install_date', 'install_location', 'uninstall_string',
+    'source',
+]
+
+# Champs qui déterminent le produit du catalogue
+SOFTWARE_PRODUCT_FIELDS = {'canonical_name', 'canonical_publisher'}
+
+# Taille des lots pour bulk_create / bulk_update
+SOFTWARE_BATCH_SIZE = 500
+
+# Libellé de la source d'une ingestion dans le journal des scans
+SOURCE_LABELS = {
+    'graphql': 'GraphQL',
+    'spool': "la file d'ingestion",
+}
+
+
+def normalize_software_item(item, now=None):
+    """Convertit un élément logiciel (SoftwareItemInput ou dict camelCase) en données du modèle"""
+    detection_date = item.get('detectionDate')
+    if isinstance(detection_date, str):
+        # Inventaire relu depuis la file d'attente
+        detection_date = parse_datetime(detection_date)
+    name = (item.get('name') or 'Unknown').strip()[:255]
+    publisher = (item.get('publisher') or 'Unknown')[:255]
+    return {
+        'name': name,
+        'version': (item.get('version') or 'Unknown')[:100],
+        'publisher': publisher,
+        # Valeurs canoniques mémorisées : une valeur déjà vue ne coûte qu'une recherche
+        'canonical_name': canonical_name(name),
+        'canonical_publisher': canonical_publisher(publisher),
+        'install_date': item.get('installDate') or 'Unknown',
+        'install_location': (item.get('installLocation') or '')[:512],
+        'uninstall_string': item.get('uninstallString') or '',
+        'source': (item.get('source') or '')[:50],
+        'detection_date': detection_date or now or timezone.now(),
+    }
+
+
+def normalize_software_items(items, now=None):
+    """Normalise une liste d'éléments logiciels, indexée par (nom, version) (le dernier l'emporte)"""
+    now = now or timezone.now()
+    incoming = {}
+    for item in items:
+        data = normalize_software_item(item, now)
+        incoming[(data['name'], data['version'])] = data
+    return incoming
+
+
+@transaction.atomic
+def upsert_software(computer, incoming, complete=False):
+    """
+    Crée ou met à jour les logiciels d'un ordinateur.
+
+    `incoming` est le résultat de `normalize_software_items`. Les logiciels
+    existants sont chargés en une requête et comparés en mémoire par
+    (nom, version) : seules les nouvelles lignes sont insérées et seules les
+    lignes modifiées sont mises à jour, par lots. Si `complete` est vrai,
+    `incoming` est la liste complète des logiciels installés et ceux qui n'y
+    figurent plus sont désactivés en une seule requête.
+    """
+    now = timezone.now()
+
+    existing = {
+        (software.name, software.version): software
+        for software in Software.all_objects.filter(computer=computer)
+    }
+    installed_before = installed_version_ids(existing.values())
+    installations_before = rollup_counts(existing.values())
+
+    to_create = []
+    to_update = []
+    # Logiciels dont la référence au catalogue doit être (re)calculée
+    to_assign = []
+    reactivated = []
+    changed_fields = set()
+    for key, data in incoming.items():
+        software = existing.get(key)
+        if software is None:
+            to_create.append(Software(computer=computer, version_key=version_key(data['version']), **data))
+            continue
+
+        changed = [field for field in SOFTWARE_TRACKED_FIELDS if getattr(software, field) != data[field]]
+        if not software.is_active:
+            # Logiciel réinstallé
+            software.is_active = True
+            changed.append('is_active')
+            reactivated.append(software)
+        if SOFTWARE_PRODUCT_FIELDS.intersection(changed) or software.product_id is None:
+            to_assign.append(software)
+            changed += ['product', 'product_version']
+        if not changed:
+            continue
+        for field in changed:
+            if field in data:
+                setattr(software, field, data[field])
+        software.detection_date = data['detection_date']
+        software.updated_at = now
+        changed_fields.update(changed)
+        to_update.append(software)
+
+    software_catalog.assign(to_create + to_assign)
+
+    if to_create:
+        Software.all_objects.bulk_create(to_create, batch_size=SOFTWARE_BATCH_SIZE)
+    if to_update:
+        Software.all_objects.bulk_update(
+            to_update,
+            sorted(changed_fields) + ['detection_date', 'updated_at'],
+            batch_size=SOFTWARE_BATCH_SIZE
+        )
+
+    deactivated_ids = []
+    if complete:
+        deactivated_ids = [
+            software.id for key, software in existing.items()
+            if software.is_active and key not in incoming
+        ]
+        if deactivated_ids:
+            Software.all_objects.filter(id__in=deactivated_ids).update(is_active=False, updated_at=now)
+
+    # Historique : seuls les changements de présence sont enregistrés
+    open_intervals(to_create + reactivated, now)
+    close_intervals(deactivated_ids, now)
+
+    # Index de présence : versions du catalogue installées / désinstallées
+    installed = [software for key, software in existing.items() if not complete or key in incoming] + to_create
+    installed_after = installed_version_ids(installed)
+    record_presence_changes(
+        computer.pk, installed_after - installed_before, installed_before - installed_after
+    )
+    # Nombres d'installations par produit et par version
+    update_software_rollups(installations_before, rollup_counts(installed))
+
+    # Vulnérabilités : logiciels désinstallés ou rattachés à un autre produit,
+    # puis logiciels nouveaux, réinstallés ou rattachés à un autre produit
+    remove_findings(deactivated_ids + [software.id for software in to_assign])
+    match_software(to_create + reactivated + to_assign, now)
+
+    return SoftwareSyncResult(created=to_create, updated=to_update, deactivated_ids=deactivated_ids)
+
+
+# Champs bruts qui identifient un logiciel : les modifier change son produit et sa période d'installation
+SOFTWARE_IDENTITY_FIELDS = ('name', 'version', 'publisher')
+
+
+def installed_software(computer_id):
+    """Logiciels actifs d'un ordinateur, réduits aux champs utiles aux index dérivés"""
+    return list(
+        Software.objects.filter(computer_id=computer_id).only('id', 'computer_id', 'product_id', 'product_version_id', 'is_active')
+    )
+
+
+@transaction.atomic
+def save_software(software, delete=False):
+    """
+    Enregistre ou supprime un logiciel modifié hors synchronisation (API REST, mutations).
+
+    Comme `upsert_software`, met à jour la référence au catalogue, l'historique,
+    l'index de présence, les nombres d'installations et les vulnérabilités. La
+    présence et les installations sont recalculées sur l'ensemble des
+    logiciels actifs de l'ordinateur avant et après l'écriture : une version
+    du catalogue reste présente tant qu'un autre logiciel y est rattaché.
+    """
+    now = timezone.now()
+    computer_id = software.computer_id
+    software_id = software.pk
+
+    previous = None
+    if software_id is not None:
+        previous = Software.all_objects.filter(pk=software_id).only(
+            'product_id', 'product_version_id', 'is_active', *SOFTWARE_IDENTITY_FIELDS
+        ).first()
+    identity_changed = previous is None or any(
+        getattr(previous, field) != getattr(software, field) for field in SOFTWARE_IDENTITY_FIELDS
+    )
+    was_active = previous is not None and previous.is_active
+
+    before = installed_software(computer_id)
+    if delete:
+        software.delete()
+        is_active = False
+    else:
+        software.refresh_derived_fields()
+        if identity_changed or software.product_id is None:
+            software_catalog.assign([software])
+        software.save()
+        software_id = software.pk
+        is_active = software.is_active
+    after = installed_software(computer_id)
+
+    # Historique : une modification de l'identité clôt la période et en ouvre une nouvelle
+    if was_active and (not is_active or identity_changed):
+        close_intervals([software_id], now)
+    if is_active and (not was_active or identity_changed):
+        open_intervals([software], now)
+
+    installed_before = installed_version_ids(before)
+    installed_after = installed_version_ids(after)
+    record_presence_changes(computer_id, installed_after - installed_before, installed_before - installed_after)
+    update_software_rollups(rollup_counts(before), rollup_counts(after))
+
+    product_changed = previous is None or previous.product_version_id != software.product_version_id
+    if was_active and (not is_active or product_changed):
+        remove_findings([software_id])
+    if is_active and (not was_active or product_changed):
+        match_software([software], now)
+
+    return software
+
+
+@transaction.atomic
+def ingest_software(computer, items, complete=False):
+    """Synchronise une liste de logiciels et, si elle est complète, l'empreinte logicielle"""
+    incoming = normalize_software_items(items)
+    result = upsert_software(computer, incoming, complete=complete)
+    if complete:
+        computer.software_hash = software_fingerprint(incoming)
+        Computer.objects.filter(pk=computer.pk).update(software_hash=computer.software_hash)
+    return result
+
+
+# Champ de ComputerInput -> champ JSON du modèle
+SECTION_INPUT_FIELDS = {
+    'systemInfo': 'system_info',
+    'hardwareInfo': 'hardware_info',
+    'networkInfo': 'network_info',
+}
+
+# Champ de ComputerInput -> champ simple du modèle
+SCALAR_INPUT_FIELDS = {
+    'hostname': 'hostname',
+    'manufacturer': 'manufacturer',
+    'model': 'model',
+    'currentUser': 'current_user',
+}
+
+
+def locked_computer(serial_number):
+    """Ordinateur verrouillé jusqu'à la fin de la transaction, sans ses sections JSON"""
+    return (
+        Computer.objects.select_for_update()
+        .defer(*SECTION_INPUT_FIELDS.values())
+        .filter(serial_number=serial_number)
+        .first()
+    )
+
+
+@transaction.atomic
+def ingest_inventory(computer_data, software_items=None, source='graphql', seen_at=None):
+    """
+    Enregistre un inventaire complet (ordinateur + logiciels) en une seule transaction.
+
+    L'ordinateur est identifié par son numéro de série. `software_items` est la
+    liste complète des logiciels installés : ceux qui n'y figurent plus sont
+    désactivés. Si elle vaut None, les logiciels ne sont pas modifiés.
+
+    Les sections JSON et les logiciels ne sont réécrits que si leur empreinte
+    diffère de celle stockée ; un scan sans changement se limite à la mise à
+    jour de last_seen. `seen_at` est la date de réception de l'inventaire
+    (maintenant par défaut).
+    """
+    serial_number = computer_data.get('serialNumber')
+    if not serial_number:
+        raise ValueError("Numéro de série manquant")
+
+    now = seen_at or timezone.now()
+    sections = {
+        field: computer_data[input_field]
+        for input_field, field in SECTION_INPUT_FIELDS.items()
+        if computer_data.get(input_field)
+    }
+    incoming_software = None
+    software_hash = ''
+    if software_items is not None:
+        incoming_software = normalize_software_items(software_items, now)
+        software_hash = software_fingerprint(incoming_software)
+
+    computer = locked_computer(serial_number)
+    created = False
+    if computer is None:
+        computer = Computer(
+            serial_number=serial_number,
+            hostname=computer_data.get('hostname') or 'Unknown',
+            manufacturer=computer_data.get('manufacturer') or 'Unknown',
+            model=computer_data.get('model') or 'Unknown',
+            current_user=computer_data.get('currentUser') or 'Unknown',
+            last_seen=now,
+            software_hash=software_hash,
+            **sections
+        )
+        computer.refresh_fingerprints()
+        try:
+            with transaction.atomic():
+                computer.save()
+            created = True
+        except IntegrityError:
+            # Premier inventaire reçu deux fois en parallèle : l'autre requête a
+            # créé l'ordinateur, celle-ci le met à jour
+            computer = locked_computer(serial_number)
+
+    if created:
+        update_fleet_statistics((), fleet_counters(computer))
+        record_changes(computer, sections, now, created=True)
+        result = IngestResult(computer, created=True)
+        software_changed = incoming_software is not None
+    else:
+        counters = fleet_counters(computer)
+        update_fields = []
+        for input_field, field in SCALAR_INPUT_FIELDS.items():
+            value = computer_data.get(input_field)
+            if value and value != getattr(computer, field):
+                setattr(computer, field, value)
+                update_fields.append(field)
+
+        record_changes(computer, sections, now)
+        for field, value in sections.items():
+            update_fields += computer.update_section(field, value)
+
+        software_changed = incoming_software is not None and software_hash != computer.software_hash
+        if software_changed:
+            computer.software_hash = software_hash
+            update_fields.append('software_hash')
+
+        # Un inventaire traité en différé ne doit pas faire reculer last_seen
+        computer.last_seen = max(computer.last_seen, now)
+        # Sans requête si ni le fabricant, ni le modèle, ni le jour de dernière vue n'ont changé
+        update_fleet_statistics(counters, fleet_counters(computer))
+
+        if not update_fields:
+            Computer.objects.filter(pk=computer.pk).update(last_seen=computer.last_seen)
+            return IngestResult(computer, unchanged=True)
+
+        computer.save(update_fields=update_fields + ['last_seen', 'updated_at'])
+        result = IngestResult(computer)
+
+    if software_changed:
+        result.software = upsert_software(computer, incoming_software, complete=True)
+
+    InventoryLog.log_scan(
+        computer=computer,
+        message=f"Inventaire synchronisé via {SOURCE_LABELS.get(source, source)}",
+        details={
+            'source': source,
+            'created': result.created,
+            'software_created': result.software_created,
+            'software_updated': result.software_updated,
+            'software_deactivated': result.software_deactivated,
+        }
+    )
+
+    return result
+
+
+def touch_inventory(serial_number, fingerprints):
+    """
+    Met à jour last_seen si les empreintes fournies correspondent à celles stockées.
+
+    `fingerprints` associe un champ d'empreinte (system_hash, ...) à sa valeur ;
+    seules les empreintes fournies sont comparées. Retourne False si
+    l'ordinateur est inconnu ou a changé : un inventaire complet est alors
+    nécessaire.
+    """
+    fingerprints = {field: value for field, value in fingerprints.items() if value}
+    if not serial_number or not fingerprints:
+        return False
+
+    now = timezone.now()
+    computers = Computer.objects.filter(serial_number=serial_number, **fingerprints)
+    # Cas courant, une seule requête : l'ordinateur a déjà été vu aujourd'hui et
+    # les statistiques du parc ne changent pas
+    if computers.filter(last_seen__gte=day_start(now)).update(last_seen=now):
+        return True
+
+    with transaction.atomic():
+        computer = computers.select_for_update().only('id', *COUNTED_FIELDS).first()
+        if computer is None:
+            return False
+        counters = fleet_counters(computer)
+        computer.last_seen = max(computer.last_seen, now)
+        Computer.objects.filter(pk=computer.pk).update(last_seen=computer.last_seen)
+        update_fleet_statistics(counters, fleet_counters(computer))
+    return True
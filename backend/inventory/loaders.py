@@ -0,0 +1,107 @@
+"""
+Chargement par lots des relations GraphQL (DataLoader synchrone)
+
+Sans chargeur, `allSoftware { computer { hostname } }` exécute une requête SQL
+par logiciel. Les résolveurs de listes annoncent les objets qu'ils retournent
+(`queue_*`) ; la première relation résolue charge alors celles de tous les
+objets annoncés en une seule requête IN, et le résultat est mis en cache pour
+la durée de la requête HTTP.
+"""
+
+from .models import Computer, Software, InventoryLog
+
+
+class BatchLoader:
+    """
+    Chargeur par lots propre à une requête.
+
+    `batch_load_fn` reçoit une liste de clés et retourne {clé: valeur} ;
+    `default` fournit la valeur des clés absentes du résultat.
+    """
+
+    def __init__(self, batch_load_fn, default=None):
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self._cache = {}
+        self._queue = set()
+
+    def queue(self, keys):
+        """Annonce des clés qui seront chargées avec le prochain lot"""
+        self._queue.update(key for key in keys if key not in self._cache)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._queue.add(key)
+            keys = list(self._queue)
+            self._queue.clear()
+            loaded = self.batch_load_fn(keys)
+            for batch_key in keys:
+                self._cache[batch_key] = loaded.get(batch_key, self.default() if self.default else None)
+        return self._cache[key]
+
+
+def group_by_computer(queryset, computer_ids):
+    grouped = {}
+    for obj in queryset.filter(computer_id__in=computer_ids):
+        grouped.setdefault(obj.computer_id, []).append(obj)
+    return grouped
+
+
+class InventoryLoaders:
+    """Chargeurs des relations computer, software_list et logs"""
+
+    def __init__(self):
+        self.computer = BatchLoader(self._load_computers)
+        self.software_by_computer = BatchLoader(self._load_software, default=list)
+        self.logs_by_computer = BatchLoader(self._load_logs, default=list)
+
+    def queue_computers(self, computers):
+        computers = list(computers)
+        ids = [computer.id for computer in computers]
+        self.software_by_computer.queue(ids)
+        self.logs_by_computer.queue(ids)
+        return computers
+
+    def queue_software(self, software_list):
+        software_list = list(software_list)
+        self.computer.queue(software.computer_id for software in software_list)
+        return software_list
+
+    def queue_logs(self, logs):
+        logs = list(logs)
+        self.computer.queue(log.computer_id for log in logs)
+        return logs
+
+    def queue_findings(self, findings):
+        findings = list(findings)
+        self.computer.queue(finding.computer_id for finding in findings)
+        return findings
+
+    def _load_computers(self, ids):
+        computers = Computer.objects.in_bulk(ids)
+        self.queue_computers(computers.values())
+        return computers
+
+    def _load_software(self, computer_ids):
+        grouped = group_by_computer(Software.objects.all(), computer_ids)
+        for software_list in grouped.values():
+            self.queue_software(software_list)
+        return grouped
+
+    def _load_logs(self, computer_ids):
+        grouped = group_by_computer(InventoryLog.objects.all(), computer_ids)
+        for logs in grouped.values():
+            self.queue_logs(logs)
+        return grouped
+
+
+def get_loaders(info):
+    """Chargeurs de la requête GraphQL en cours"""
+    context = info.context
+    if context is None:
+        return InventoryLoaders()
+    loaders = getattr(context, 'inventory_loaders', None)
+    if loaders is None:
+        loaders = InventoryLoaders()
+        context.inventory_loaders = loaders
+    return loaders
@@ -0,0 +1,35 @@
+"""
+Recalcul des noms et éditeurs canoniques des logiciels
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.catalog import canonicalize_software
+from inventory.presence import rebuild_presence_bitmaps
+from inventory.rollups import reconcile_software_rollups
+from inventory.search import rebuild_search_index
+from inventory.vulnerabilities import match_fleet
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les noms et éditeurs canoniques (après une modification des règles), "
+        "rattache les logiciels au produit correspondant et reconstruit les index du catalogue"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help="Supprime les produits qui ne sont plus référencés (redémarrer ensuite les processus d'ingestion)"
+        )
+
+    def handle(self, *args, **options):
+        updated, pruned = canonicalize_software(prune=options['prune'])
+        self.stdout.write(f"{updated} logiciels rattachés à un autre produit, {pruned} produits supprimés")
+        if updated or pruned:
+            self.stdout.write(f"{rebuild_presence_bitmaps()} versions indexées")
+            self.stdout.write(f"Nombres d'installations : {reconcile_software_rollups()} compteurs corrigés")
+            created, removed = match_fleet()
+            self.stdout.write(f"Correspondances : {created} créées, {removed} supprimées")
+            self.stdout.write(f"{rebuild_search_index()} documents indexés")
@@ -0,0 +1,30 @@
+"""
+Import du catalogue local des vulnérabilités
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.vulnerabilities import import_vulnerabilities, load_entries
+
+
+class Command(BaseCommand):
+    help = "Importe des vulnérabilités (JSON ou JSON Lines, intervalles de versions type CPE) et rapproche le parc"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer")
+        parser.add_argument(
+            '--replace', action='store_true', help="Supprime les vulnérabilités absentes du fichier"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8') as source:
+                entries = load_entries(source)
+            result = import_vulnerabilities(entries, replace=options['replace'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise CommandError(f"Import impossible : {e}")
+        self.stdout.write(
+            f"{result['vulnerabilities']} vulnérabilités importées ({result['ranges']} intervalles, "
+            f"{result['deleted']} supprimées) ; correspondances : {result['findings_created']} créées, "
+            f"{result['findings_removed']} supprimées"
+        )
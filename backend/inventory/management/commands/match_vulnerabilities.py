@@ -0,0 +1,15 @@
+"""
+Rapprochement complet du parc et du catalogue des vulnérabilités
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.vulnerabilities import match_fleet
+
+
+class Command(BaseCommand):
+    help = "Rapproche tous les logiciels installés du catalogue des vulnérabilités"
+
+    def handle(self, *args, **options):
+        created, removed = match_fleet()
+        self.stdout.write(f"Correspondances : {created} créées, {removed} supprimées")
@@ -0,0 +1,69 @@
+"""
+Traitement de la file d'attente d'ingestion des inventaires
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Avg, Max
+
+from inventory.models import IngestSpool
+from inventory.spool import claim_batch, process_group, purge_processed, requeue_stale
+
+
+class Command(BaseCommand):
+    help = "Traite les inventaires en attente par lots, avec un pool de workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Nombre de threads de traitement (1 sous SQLite)")
+        parser.add_argument('--batch-size', type=int, default=100, help="Nombre d'ordinateurs par lot")
+        parser.add_argument('--loop', action='store_true', help="Traite la file en continu")
+        parser.add_argument('--interval', type=float, default=2.0, help="Attente (s) lorsque la file est vide")
+        parser.add_argument('--max-attempts', type=int, default=3, help="Tentatives avant passage en erreur")
+        parser.add_argument('--stale-minutes', type=int, default=10, help="Délai avant reprise d'un lot abandonné")
+        parser.add_argument('--purge-after-hours', type=int, default=24, help="Conservation des inventaires traités")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if connection.vendor == 'sqlite' and workers > 1:
+            # Un seul écrivain à la fois : des threads concurrents échouent sur « database is locked »
+            self.stdout.write("SQLite : traitement sur un seul thread")
+            workers = 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                requeued = requeue_stale(options['stale_minutes'])
+                if requeued:
+                    self.stdout.write(f"{requeued} inventaires abandonnés remis en attente")
+
+                processed = self.process_batch(pool, options)
+
+                if not processed:
+                    purge_processed(options['purge_after_hours'])
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+
+    def process_batch(self, pool, options):
+        """Réserve et traite un lot, retourne le nombre d'ordinateurs traités"""
+        started = time.monotonic()
+        groups = claim_batch(options['batch_size'])
+        if not groups:
+            return 0
+
+        coalesced = sum(pool.map(
+            lambda entries: process_group(entries, options['max_attempts']),
+            groups.values()
+        ))
+
+        latest_ids = [entries[-1].id for entries in groups.values()]
+        stats = IngestSpool.objects.filter(id__in=latest_ids, status='done').aggregate(
+            avg=Avg('latency_ms'), max=Max('latency_ms')
+        )
+        self.stdout.write(
+            f"{len(groups)} ordinateurs traités ({coalesced} inventaires fusionnés) "
+            f"en {time.monotonic() - started:.2f}s - latence moyenne {stats['avg'] or 0:.0f} ms, "
+            f"max {stats['max'] or 0} ms"
+        )
+        return len(groups)
@@ -0,0 +1,22 @@
+"""
+Application de la politique de conservation des logs d'inventaire
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.retention import prune_logs, retention_days
+
+
+class Command(BaseCommand):
+    help = "Regroupe les anciens scans en résumés quotidiens et supprime les logs expirés, par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Nombre de logs traités par transaction")
+        parser.add_argument('--pause', type=float, default=0.1, help="Attente (s) entre deux lots")
+
+    def handle(self, *args, **options):
+        retention = retention_days()
+        processed = prune_logs(batch_size=options['batch_size'], pause=options['pause'], retention=retention)
+        for log_type, count in processed.items():
+            action = "regroupés en résumés" if log_type == 'scan' else "supprimés"
+            self.stdout.write(f"{log_type} : {count} logs {action} (conservation {retention[log_type]} jours)")
@@ -0,0 +1,14 @@
+"""
+Reconstruction de l'index de présence des logiciels
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.presence import rebuild_presence_bitmaps
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les bitmaps de présence des versions du catalogue depuis les logiciels installés"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{rebuild_presence_bitmaps()} versions indexées")
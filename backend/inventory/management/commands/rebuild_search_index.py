@@ -0,0 +1,17 @@
+"""
+Reconstruction de l'index de recherche plein texte
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.search import rebuild_search_index, search_index_available
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche (ordinateurs et catalogue des logiciels)"
+
+    def handle(self, *args, **options):
+        if not search_index_available():
+            self.stdout.write("Index FTS5 indisponible sur cette base : la recherche utilise icontains")
+            return
+        self.stdout.write(f"{rebuild_search_index()} documents indexés")
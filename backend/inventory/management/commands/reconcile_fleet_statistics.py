@@ -0,0 +1,15 @@
+"""
+Recalcul des statistiques du parc affichées par le dashboard
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.statistics import reconcile_fleet_statistics
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs du dashboard depuis la table des ordinateurs et regroupe les jours anciens"
+
+    def handle(self, *args, **options):
+        corrected = reconcile_fleet_statistics()
+        self.stdout.write(f"{corrected} compteurs corrigés")
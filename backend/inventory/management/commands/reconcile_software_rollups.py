@@ -0,0 +1,15 @@
+"""
+Recalcul des nombres d'installations par produit et par version
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.rollups import reconcile_software_rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcule les nombres d'installations par produit et par version depuis la table des logiciels"
+
+    def handle(self, *args, **options):
+        corrected = reconcile_software_rollups()
+        self.stdout.write(f"{corrected} compteurs corrigés")
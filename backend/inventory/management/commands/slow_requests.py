@@ -0,0 +1,35 @@
+"""
+Affichage des requêtes lentes ou profilées conservées par ProfilingMiddleware
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from inventory.profiling import read_ring
+
+
+class Command(BaseCommand):
+    help = "Liste les dernières requêtes lentes ou profilées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help="Nombre de requêtes affichées")
+        parser.add_argument('--id', help="Affiche le profil complet d'une requête")
+
+    def handle(self, *args, **options):
+        records = read_ring()
+        if options['id']:
+            for record in records:
+                if record['id'] == options['id']:
+                    self.stdout.write(json.dumps(record, ensure_ascii=False, indent=2))
+                    return
+            self.stderr.write(f"Profil {options['id']} introuvable")
+            return
+
+        for record in records[:options['limit']]:
+            operation = f" {record['graphql_operation']}" if record.get('graphql_operation') else ''
+            self.stdout.write(
+                f"{record['started_at']} {record['id']} {record['method']} {record['path']}{operation} "
+                f"{record['status']} - {record['duration_ms']} ms, "
+                f"{record['sql_count']} requêtes SQL ({record['sql_ms']} ms)"
+            )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_software_install_location_software_source_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(fields=['computer', 'is_active'], name='software_computer_active_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:22
+
+from django.db import migrations, models
+
+from inventory.fingerprints import content_fingerprint
+
+
+def compute_fingerprints(apps, schema_editor):
+    """Calcule les empreintes des ordinateurs existants"""
+    Computer = apps.get_model('inventory', 'Computer')
+    for computer in Computer.objects.iterator():
+        computer.system_hash = content_fingerprint(computer.system_info)
+        computer.hardware_hash = content_fingerprint(computer.hardware_info)
+        computer.network_hash = content_fingerprint(computer.network_info)
+        computer.save(update_fields=['system_hash', 'hardware_hash', 'network_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_software_software_computer_active_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computer',
+            name='hardware_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte matérielle'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='network_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte réseau'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='software_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte logiciels'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='system_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte système'),
+        ),
+        migrations.RunPython(compute_fingerprints, migrations.RunPython.noop),
+    ]
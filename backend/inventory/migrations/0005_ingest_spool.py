@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:24
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_computer_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestSpool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial_number', models.CharField(max_length=255, verbose_name='Numéro de série')),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Inventaire brut')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours de traitement'), ('done', 'Traité'), ('coalesced', 'Remplacé par un inventaire plus récent'), ('error', 'Erreur')], default='pending', max_length=20, verbose_name='Statut')),
+                ('worker', models.CharField(blank=True, default='', max_length=64, verbose_name='Worker')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de réception')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Date de prise en charge')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Date de traitement')),
+                ('latency_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Latence (ms)')),
+            ],
+            options={
+                'verbose_name': 'Inventaire en attente',
+                'verbose_name_plural': 'Inventaires en attente',
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='spool_status_received_idx'), models.Index(fields=['serial_number', 'status'], name='spool_serial_status_idx')],
+            },
+        ),
+    ]
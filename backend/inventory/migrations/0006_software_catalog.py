@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_catalog(apps, schema_editor):
+    """
+    Rattache les logiciels existants au catalogue : produits et versions créés
+    par lots, puis logiciels parcourus par identifiant et mis à jour par lots
+    (pas de mise à jour filtrée par nom, éditeur et version, non indexés)
+    """
+    Software = apps.get_model('inventory', 'Software')
+    SoftwareProduct = apps.get_model('inventory', 'SoftwareProduct')
+    SoftwareVersion = apps.get_model('inventory', 'SoftwareVersion')
+
+    triples = set(Software.objects.order_by().values_list('name', 'publisher', 'version').distinct())
+    SoftwareProduct.objects.bulk_create(
+        [SoftwareProduct(name=name, publisher=publisher) for name, publisher in {t[:2] for t in triples}],
+        batch_size=500, ignore_conflicts=True
+    )
+    products = {
+        (name, publisher): product_id
+        for product_id, name, publisher in SoftwareProduct.objects.values_list('id', 'name', 'publisher').iterator()
+    }
+    SoftwareVersion.objects.bulk_create(
+        [
+            SoftwareVersion(product_id=products[(name, publisher)], version=version)
+            for name, publisher, version in triples
+        ],
+        batch_size=500, ignore_conflicts=True
+    )
+    versions = {
+        (product_id, version): version_id
+        for version_id, product_id, version in SoftwareVersion.objects.values_list('id', 'product_id', 'version').iterator()
+    }
+
+    last_id = 0
+    while True:
+        batch = list(
+            Software.objects.filter(id__gt=last_id).order_by('id').only('id', 'name', 'publisher', 'version')[:2000]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for software in batch:
+            software.product_id = products[(software.name, software.publisher)]
+            software.product_version_id = versions[(software.product_id, software.version)]
+        Software.objects.bulk_update(batch, ['product_id', 'product_version_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_ingest_spool'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoftwareProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Nom')),
+                ('publisher', models.CharField(max_length=255, verbose_name='Éditeur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+            ],
+            options={
+                'verbose_name': 'Produit logiciel',
+                'verbose_name_plural': 'Produits logiciels',
+                'ordering': ['name', 'publisher'],
+                'unique_together': {('name', 'publisher')},
+            },
+        ),
+        migrations.AddField(
+            model_name='software',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='installations', to='inventory.softwareproduct', verbose_name='Produit'),
+        ),
+        migrations.CreateModel(
+            name='SoftwareVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=100, verbose_name='Version')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='inventory.softwareproduct', verbose_name='Produit')),
+            ],
+            options={
+                'verbose_name': 'Version de produit',
+                'verbose_name_plural': 'Versions de produits',
+                'ordering': ['product', 'version'],
+                'unique_together': {('product', 'version')},
+            },
+        ),
+        migrations.AddField(
+            model_name='software',
+            name='product_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='installations', to='inventory.softwareversion', verbose_name='Version du produit'),
+        ),
+        migrations.RunPython(populate_catalog, migrations.RunPython.noop),
+    ]
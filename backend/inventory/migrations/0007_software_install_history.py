@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_intervals(apps, schema_editor):
+    """Ouvre une période de présence pour chaque logiciel actif existant"""
+    Software = apps.get_model('inventory', 'Software')
+    SoftwareInstallHistory = apps.get_model('inventory', 'SoftwareInstallHistory')
+
+    batch = []
+    for software in Software.objects.filter(is_active=True).iterator():
+        batch.append(SoftwareInstallHistory(
+            computer_id=software.computer_id,
+            software_id=software.id,
+            product_id=software.product_id,
+            name=software.name,
+            version=software.version,
+            publisher=software.publisher,
+            valid_from=software.created_at,
+        ))
+        if len(batch) >= 1000:
+            SoftwareInstallHistory.objects.bulk_create(batch)
+            batch = []
+    SoftwareInstallHistory.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_software_catalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoftwareInstallHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Nom')),
+                ('version', models.CharField(max_length=100, verbose_name='Version')),
+                ('publisher', models.CharField(max_length=255, verbose_name='Éditeur')),
+                ('valid_from', models.DateTimeField(verbose_name='Installé le')),
+                ('valid_to', models.DateTimeField(blank=True, null=True, verbose_name='Désinstallé le')),
+                ('computer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='software_history', to='inventory.computer', verbose_name='Ordinateur')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='history', to='inventory.softwareproduct', verbose_name='Produit')),
+                ('software', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='inventory.software', verbose_name='Logiciel')),
+            ],
+            options={
+                'verbose_name': "Historique d'installation",
+                'verbose_name_plural': 'Historique des installations',
+                'ordering': ['-valid_from'],
+                'indexes': [models.Index(fields=['computer', 'valid_from'], name='history_computer_from_idx'), models.Index(fields=['valid_from'], name='history_from_idx'), models.Index(fields=['valid_to'], name='history_to_idx')],
+            },
+        ),
+        migrations.RunPython(open_intervals, migrations.RunPython.noop),
+    ]
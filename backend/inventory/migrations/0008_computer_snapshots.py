@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_software_install_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComputerSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(choices=[('hardware', 'Matériel'), ('network', 'Réseau')], max_length=20, verbose_name='Section')),
+                ('sequence', models.PositiveIntegerField(verbose_name='Numéro')),
+                ('base_sequence', models.PositiveIntegerField(verbose_name="Numéro de l'image complète de référence")),
+                ('is_keyframe', models.BooleanField(default=False, verbose_name='Image complète')),
+                ('data', models.JSONField(verbose_name='État complet ou différence')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date')),
+                ('computer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.computer', verbose_name='Ordinateur')),
+            ],
+            options={
+                'verbose_name': 'Historique matériel/réseau',
+                'verbose_name_plural': 'Historiques matériel/réseau',
+                'ordering': ['computer', 'section', 'sequence'],
+                'indexes': [models.Index(fields=['computer', 'section', 'created_at'], name='snapshot_computer_date_idx')],
+                'unique_together': {('computer', 'section', 'sequence')},
+            },
+        ),
+    ]
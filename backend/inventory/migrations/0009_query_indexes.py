@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_computer_snapshots'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='software',
+            name='software_computer_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['-updated_at'], name='computer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['last_seen'], name='computer_active_seen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['last_seen'], name='computer_last_seen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['manufacturer', 'model'], name='computer_manufacturer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['model'], name='computer_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['computer', '-created_at'], name='log_computer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['log_type', '-created_at'], name='log_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['-created_at'], name='log_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['computer', 'name', 'version'], name='software_computer_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name', 'version'], name='software_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(fields=['publisher', 'name'], name='software_publisher_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventorylog',
+            name='log_type',
+            field=models.CharField(choices=[('scan', 'Scan complet'), ('change', 'Détection de changement'), ('error', 'Erreur'), ('sync', 'Synchronisation'), ('summary', 'Résumé quotidien des scans')], max_length=20, verbose_name='Type de log'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:46
+
+from collections import Counter
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_statistics(apps, schema_editor):
+    """Calcule les compteurs initiaux du dashboard"""
+    Computer = apps.get_model('inventory', 'Computer')
+    FleetStatistic = apps.get_model('inventory', 'FleetStatistic')
+
+    computers = Computer.objects.order_by()
+    counters = Counter()
+    counters[('total', '')] = computers.count()
+    counters[('active', '')] = computers.filter(is_active=True).count()
+    for field in ('manufacturer', 'model'):
+        for row in computers.values(field).annotate(count=Count('id')):
+            counters[(field, row[field][:255])] += row['count']
+    first_recent_day = timezone.localdate() - timedelta(days=7)
+    for row in computers.annotate(day=TruncDate('last_seen')).values('day').annotate(count=Count('id')):
+        key = row['day'].isoformat() if row['day'] >= first_recent_day else 'older'
+        counters[('last_seen_day', key)] += row['count']
+
+    FleetStatistic.objects.bulk_create([
+        FleetStatistic(metric=metric, key=key, value=value)
+        for (metric, key), value in counters.items() if value
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_log_summary_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FleetStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('total', 'Ordinateurs'), ('active', 'Ordinateurs actifs'), ('manufacturer', 'Ordinateurs par fabricant'), ('model', 'Ordinateurs par modèle'), ('last_seen_day', 'Ordinateurs par jour de dernière vue')], max_length=20, verbose_name='Statistique')),
+                ('key', models.CharField(blank=True, default='', max_length=255, verbose_name='Clé')),
+                ('value', models.IntegerField(default=0, verbose_name='Valeur')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Statistique du parc',
+                'verbose_name_plural': 'Statistiques du parc',
+                'unique_together': {('metric', 'key')},
+            },
+        ),
+        migrations.RunPython(populate_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# Index pg_trgm servant les filtres icontains sous PostgreSQL
+POSTGRES_TRIGRAM_INDEXES = {
+    'inventory_computer': ['hostname', 'serial_number', 'current_user', 'manufacturer', 'model'],
+    'inventory_softwareproduct': ['name', 'publisher'],
+}
+
+
+def create_search_index(apps, schema_editor):
+    """Index FTS5 à trigrammes sous SQLite, index pg_trgm sous PostgreSQL"""
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE inventory_search USING fts5(title, body, tokenize='trigram')"
+                )
+            except OperationalError:
+                # SQLite sans FTS5 ou antérieur à 3.34 : recherche par icontains
+                return
+            cursor.execute(
+                "INSERT INTO inventory_search (rowid, title, body) "
+                "SELECT id * 2, hostname, serial_number || ' ' || current_user || ' ' || manufacturer || ' ' || model "
+                "FROM inventory_computer"
+            )
+            cursor.execute(
+                "INSERT INTO inventory_search (rowid, title, body) "
+                "SELECT id * 2 + 1, name, publisher FROM inventory_softwareproduct"
+            )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, columns in POSTGRES_TRIGRAM_INDEXES.items():
+            for column in columns:
+                schema_editor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm '
+                    f'ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS inventory_search')
+    elif connection.vendor == 'postgresql':
+        for table, columns in POSTGRES_TRIGRAM_INDEXES.items():
+            for column in columns:
+                schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_fleet_statistics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
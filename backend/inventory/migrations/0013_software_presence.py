@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:59
+
+import zlib
+from collections import defaultdict
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def populate_presence(apps, schema_editor):
+    """Construit les bitmaps de présence depuis les logiciels installés"""
+    Software = apps.get_model('inventory', 'Software')
+    SoftwarePresence = apps.get_model('inventory', 'SoftwarePresence')
+
+    bitmaps = defaultdict(bytearray)
+    products = {}
+    rows = Software.objects.filter(is_active=True, product_version__isnull=False).values_list(
+        'product_version_id', 'product_id', 'computer_id'
+    ).order_by().iterator(chunk_size=10000)
+    for version_id, product_id, computer_id in rows:
+        data = bitmaps[version_id]
+        if len(data) <= computer_id >> 3:
+            data.extend(bytes((computer_id >> 3) + 1 - len(data)))
+        data[computer_id >> 3] |= 1 << (computer_id & 7)
+        products[version_id] = product_id
+
+    SoftwarePresence.objects.bulk_create([
+        SoftwarePresence(
+            version_id=version_id,
+            product_id=products[version_id],
+            bitmap=zlib.compress(bytes(data)),
+            computer_count=int.from_bytes(data, 'little').bit_count(),
+        )
+        for version_id, data in bitmaps.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoftwarePresence',
+            fields=[
+                ('version', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='presence', serialize=False, to='inventory.softwareversion', verbose_name='Version')),
+                ('bitmap', models.BinaryField(default=b'', verbose_name='Ordinateurs')),
+                ('computer_count', models.PositiveIntegerField(default=0, verbose_name="Nombre d'ordinateurs")),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernière mise à jour')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presence', to='inventory.softwareproduct', verbose_name='Produit')),
+            ],
+            options={
+                'verbose_name': "Présence d'une version",
+                'verbose_name_plural': 'Présence des versions',
+            },
+        ),
+        migrations.RunPython(populate_presence, migrations.RunPython.noop),
+    ]
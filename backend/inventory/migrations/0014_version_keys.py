@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+from inventory.versions import version_key
+
+
+def populate_version_keys(apps, schema_editor):
+    """Calcule les clés de version du catalogue, puis des logiciels par leur version du catalogue"""
+    Software = apps.get_model('inventory', 'Software')
+    SoftwareVersion = apps.get_model('inventory', 'SoftwareVersion')
+
+    versions = []
+    for version in SoftwareVersion.objects.only('id', 'version').iterator(chunk_size=2000):
+        version.version_key = version_key(version.version)
+        versions.append(version)
+    SoftwareVersion.objects.bulk_update(versions, ['version_key'], batch_size=500)
+
+    Software.objects.filter(product_version__isnull=False).update(
+        version_key=Subquery(SoftwareVersion.objects.filter(pk=OuterRef('product_version_id')).values('version_key'))
+    )
+    software = []
+    for item in Software.objects.filter(product_version__isnull=True).only('id', 'version').iterator(chunk_size=2000):
+        item.version_key = version_key(item.version)
+        software.append(item)
+    Software.objects.bulk_update(software, ['version_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_software_presence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='software',
+            name='version_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Clé de version'),
+        ),
+        migrations.AddField(
+            model_name='softwareversion',
+            name='version_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Clé de version'),
+        ),
+        migrations.RunPython(populate_version_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product', 'version_key'], name='software_product_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name', 'version_key'], name='software_name_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='softwareversion',
+            index=models.Index(fields=['product', 'version_key'], name='version_product_key_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_version_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vulnerability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=64, unique=True, verbose_name='Identifiant')),
+                ('summary', models.TextField(blank=True, default='', verbose_name='Description')),
+                ('severity', models.CharField(choices=[('unknown', 'Inconnue'), ('low', 'Faible'), ('medium', 'Moyenne'), ('high', 'Élevée'), ('critical', 'Critique')], default='unknown', max_length=10, verbose_name='Sévérité')),
+                ('cvss', models.FloatField(blank=True, null=True, verbose_name='Score CVSS')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='Date de publication')),
+                ('imported_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name="Date d'import")),
+            ],
+            options={
+                'verbose_name': 'Vulnérabilité',
+                'verbose_name_plural': 'Vulnérabilités',
+                'ordering': ['identifier'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VulnerableRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(max_length=255, verbose_name='Produit')),
+                ('publisher', models.CharField(blank=True, default='', max_length=255, verbose_name='Éditeur')),
+                ('version_start', models.CharField(blank=True, default='', max_length=100, verbose_name='Version de début')),
+                ('start_inclusive', models.BooleanField(default=True, verbose_name='Début inclus')),
+                ('version_end', models.CharField(blank=True, default='', max_length=100, verbose_name='Version de fin')),
+                ('end_inclusive', models.BooleanField(default=False, verbose_name='Fin incluse')),
+                ('start_key', models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Clé de début')),
+                ('end_key', models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Clé de fin')),
+                ('vulnerability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranges', to='inventory.vulnerability', verbose_name='Vulnérabilité')),
+            ],
+            options={
+                'verbose_name': 'Intervalle de versions affectées',
+                'verbose_name_plural': 'Intervalles de versions affectées',
+            },
+        ),
+        migrations.CreateModel(
+            name='VulnerabilityFinding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=100, verbose_name='Version')),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de détection')),
+                ('computer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vulnerability_findings', to='inventory.computer', verbose_name='Ordinateur')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vulnerability_findings', to='inventory.softwareproduct', verbose_name='Produit')),
+                ('software', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vulnerability_findings', to='inventory.software', verbose_name='Logiciel')),
+                ('vulnerability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='findings', to='inventory.vulnerability', verbose_name='Vulnérabilité')),
+            ],
+            options={
+                'verbose_name': 'Logiciel vulnérable',
+                'verbose_name_plural': 'Logiciels vulnérables',
+                'indexes': [models.Index(fields=['computer', 'vulnerability'], name='finding_computer_idx'), models.Index(fields=['vulnerability', 'computer'], name='finding_vulnerability_idx')],
+                'unique_together': {('software', 'vulnerability')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:12
+
+from django.db import migrations, models
+
+from inventory.canonical import canonical_name, canonical_publisher
+
+
+def populate_canonical_names(apps, schema_editor):
+    """
+    Calcule les valeurs canoniques, une mise à jour par valeur brute distincte.
+    Le rattachement au catalogue est fait par `manage.py canonicalize_software`.
+    """
+    Software = apps.get_model('inventory', 'Software')
+    for field, canonical in (('name', canonical_name), ('publisher', canonical_publisher)):
+        for value in Software.objects.order_by().values_list(field, flat=True).distinct():
+            Software.objects.filter(**{field: value}).update(**{f'canonical_{field}': canonical(value)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_vulnerabilities'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='software',
+            name='canonical_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Nom canonique'),
+        ),
+        migrations.AddField(
+            model_name='software',
+            name='canonical_publisher',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Éditeur canonique'),
+        ),
+        migrations.RunPython(populate_canonical_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_rollups(apps, schema_editor):
+    """Nombres d'installations actives par version et par produit"""
+    Software = apps.get_model('inventory', 'Software')
+    SoftwareRollup = apps.get_model('inventory', 'SoftwareRollup')
+    counts = Counter()
+    rows = Software.objects.filter(is_active=True, product_version__isnull=False).order_by().values(
+        'product_id', 'product_version_id'
+    ).annotate(count=Count('id'))
+    for row in rows:
+        counts[(row['product_id'], row['product_version_id'])] += row['count']
+        counts[(row['product_id'], None)] += row['count']
+    SoftwareRollup.objects.bulk_create(
+        [
+            SoftwareRollup(product_id=product_id, version_id=version_id, install_count=count)
+            for (product_id, version_id), count in counts.items()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_canonical_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoftwareRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('install_count', models.IntegerField(default=0, verbose_name='Installations')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernière mise à jour')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='inventory.softwareproduct', verbose_name='Produit')),
+                ('version', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='inventory.softwareversion', verbose_name='Version')),
+            ],
+            options={
+                'verbose_name': "Installations d'un produit",
+                'verbose_name_plural': 'Installations des produits',
+                'indexes': [models.Index(condition=models.Q(('version__isnull', True)), fields=['-install_count', 'id'], name='rollup_product_count_idx'), models.Index(condition=models.Q(('version__isnull', False)), fields=['product', '-install_count', 'id'], name='rollup_version_count_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('version__isnull', False)), fields=('version',), name='rollup_version_unique'), models.UniqueConstraint(condition=models.Q(('version__isnull', True)), fields=('product',), name='rollup_product_total_unique')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
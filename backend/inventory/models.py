@@ -2,10 +2,15 @@
 Modèles Django pour l'inventaire
 """
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 import json
 
+from .canonical import canonical_name, canonical_publisher
+from .fingerprints import content_fingerprint
+from .versions import version_key
+
 
 class Computer(models.Model):
     """Modèle pour les ordinateurs"""
@@ -21,6 +26,12 @@ class Computer(models.Model):
     hardware_info = models.JSONField(default=dict, verbose_name="Informations matérielles")
     network_info = models.JSONField(default=dict, verbose_name="Informations réseau")
     
+    # Empreintes du contenu, pour détecter les scans sans changement sans relire le JSON
+    system_hash = models.CharField(max_length=64, blank=True, default="", verbose_name="Empreinte système")
+    hardware_hash = models.CharField(max_length=64, blank=True, default="", verbose_name="Empreinte matérielle")
+    network_hash = models.CharField(max_length=64, blank=True, default="", verbose_name="Empreinte réseau")
+    software_hash = models.CharField(max_length=64, blank=True, default="", verbose_name="Empreinte logiciels")
+    
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
@@ -31,10 +42,53 @@ class Computer(models.Model):
         verbose_name = "Ordinateur"
         verbose_name_plural = "Ordinateurs"
         ordering = ['-updated_at']
+        indexes = [
+            # Tri par défaut des listes (API, admin)
+            models.Index(fields=['-updated_at'], name='computer_updated_idx'),
+            # Dashboard (actifs, vus récemment) et filtres is_active / last_seen_*.
+            # Index partiel : Django traduit is_active=True par « WHERE is_active »,
+            # que seul un index portant la même condition peut exploiter
+            models.Index(fields=['last_seen'], condition=models.Q(is_active=True), name='computer_active_seen_idx'),
+            models.Index(fields=['last_seen'], name='computer_last_seen_idx'),
+            # Regroupements du dashboard et filtres de l'admin
+            models.Index(fields=['manufacturer', 'model'], name='computer_manufacturer_idx'),
+            models.Index(fields=['model'], name='computer_model_idx'),
+        ]
+    
+    # Champ JSON -> champ d'empreinte correspondant
+    FINGERPRINT_FIELDS = {
+        'system_info': 'system_hash',
+        'hardware_info': 'hardware_hash',
+        'network_info': 'network_hash',
+    }
     
     def __str__(self):
         return f"{self.hostname} ({self.serial_number})"
     
+    def refresh_fingerprints(self):
+        """Recalcule les empreintes des champs JSON, retourne les champs modifiés"""
+        changed = []
+        for field, hash_field in self.FINGERPRINT_FIELDS.items():
+            value = content_fingerprint(getattr(self, field))
+            if getattr(self, hash_field) != value:
+                setattr(self, hash_field, value)
+                changed.append(hash_field)
+        return changed
+    
+    def section_changed(self, field, value):
+        """Indique si une nouvelle valeur d'un champ JSON diffère de celle stockée"""
+        return content_fingerprint(value) != getattr(self, self.FINGERPRINT_FIELDS[field])
+    
+    def update_section(self, field, value):
+        """Remplace un champ JSON si son contenu a changé, retourne les champs modifiés"""
+        hash_field = self.FINGERPRINT_FIELDS[field]
+        fingerprint = content_fingerprint(value)
+        if fingerprint == getattr(self, hash_field):
+            return []
+        setattr(self, field, value)
+        setattr(self, hash_field, fingerprint)
+        return [field, hash_field]
+    
     def get_system_info_display(self):
         """Retourne les informations système formatées"""
         if isinstance(self.system_info, str):
@@ -68,6 +122,135 @@ class Computer(models.Model):
         self.save(update_fields=['last_seen'])
 
 
+class SoftwareProduct(models.Model):
+    """Produit logiciel du catalogue, dédupliqué sur l'ensemble du parc"""
+    
+    name = models.CharField(max_length=255, verbose_name="Nom")
+    publisher = models.CharField(max_length=255, verbose_name="Éditeur")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    
+    class Meta:
+        verbose_name = "Produit logiciel"
+        verbose_name_plural = "Produits logiciels"
+        ordering = ['name', 'publisher']
+        unique_together = ['name', 'publisher']
+    
+    def __str__(self):
+        return f"{self.name} ({self.publisher})"
+
+
+class SoftwareVersion(models.Model):
+    """Version d'un produit du catalogue"""
+    
+    product = models.ForeignKey(
+        SoftwareProduct,
+        on_delete=models.CASCADE,
+        related_name='versions',
+        verbose_name="Produit"
+    )
+    version = models.CharField(max_length=100, verbose_name="Version")
+    # Clé de tri de la version (voir versions.py)
+    version_key = models.CharField(max_length=255, blank=True, default='', editable=False, verbose_name="Clé de version")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    
+    class Meta:
+        verbose_name = "Version de produit"
+        verbose_name_plural = "Versions de produits"
+        ordering = ['product', 'version']
+        unique_together = ['product', 'version']
+        indexes = [
+            models.Index(fields=['product', 'version_key'], name='version_product_key_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.name} {self.version}"
+
+
+class SoftwarePresence(models.Model):
+    """Ensemble compressé des ordinateurs ayant une version du catalogue installée (voir presence.py)"""
+    
+    version = models.OneToOneField(
+        SoftwareVersion,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='presence',
+        verbose_name="Version"
+    )
+    product = models.ForeignKey(
+        SoftwareProduct,
+        on_delete=models.CASCADE,
+        related_name='presence',
+        verbose_name="Produit"
+    )
+    # Bitmap des identifiants d'ordinateurs (bit n : ordinateur n), compressé par zlib
+    bitmap = models.BinaryField(default=b'', verbose_name="Ordinateurs")
+    computer_count = models.PositiveIntegerField(default=0, verbose_name="Nombre d'ordinateurs")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="Dernière mise à jour")
+    
+    class Meta:
+        verbose_name = "Présence d'une version"
+        verbose_name_plural = "Présence des versions"
+    
+    def __str__(self):
+        return f"{self.version_id} : {self.computer_count} ordinateurs"
+
+
+class SoftwareRollup(models.Model):
+    """Nombre d'installations actives d'un produit du catalogue ou d'une de ses versions (voir rollups.py)"""
+    
+    product = models.ForeignKey(
+        SoftwareProduct,
+        on_delete=models.CASCADE,
+        related_name='rollups',
+        verbose_name="Produit"
+    )
+    # Vide : total du produit, toutes versions confondues. Pas d'index propre :
+    # la contrainte d'unicité partielle le remplace, sans détourner le tri des totaux
+    version = models.ForeignKey(
+        SoftwareVersion,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='rollups',
+        verbose_name="Version"
+    )
+    install_count = models.IntegerField(default=0, verbose_name="Installations")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="Dernière mise à jour")
+    
+    class Meta:
+        verbose_name = "Installations d'un produit"
+        verbose_name_plural = "Installations des produits"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['version'], condition=models.Q(version__isnull=False), name='rollup_version_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['product'], condition=models.Q(version__isnull=True), name='rollup_product_total_unique'
+            ),
+        ]
+        indexes = [
+            # Produits les plus installés, versions d'un produit les plus installées
+            models.Index(
+                fields=['-install_count', 'id'], condition=models.Q(version__isnull=True), name='rollup_product_count_idx'
+            ),
+            models.Index(
+                fields=['product', '-install_count', 'id'], condition=models.Q(version__isnull=False),
+                name='rollup_version_count_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} {self.version_id or '*'} : {self.install_count} installations"
+
+
+class ActiveSoftwareManager(models.Manager):
+    """Manager par défaut des logiciels : exclut les logiciels désinstallés"""
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
+
+
 class Software(models.Model):
     """Modèle pour les logiciels installés"""
     
@@ -79,11 +262,36 @@ class Software(models.Model):
     )
     name = models.CharField(max_length=255, verbose_name="Nom")
     version = models.CharField(max_length=100, verbose_name="Version")
+    # Clé de tri de la version, calculée à l'enregistrement (voir versions.py)
+    version_key = models.CharField(max_length=255, blank=True, default='', editable=False, verbose_name="Clé de version")
     publisher = models.CharField(max_length=255, verbose_name="Éditeur")
+    # Nom et éditeur normalisés, qui identifient le produit du catalogue (voir canonical.py)
+    canonical_name = models.CharField(max_length=255, blank=True, default='', editable=False, verbose_name="Nom canonique")
+    canonical_publisher = models.CharField(
+        max_length=255, blank=True, default='', editable=False, verbose_name="Éditeur canonique"
+    )
     install_date = models.CharField(max_length=50, verbose_name="Date d'installation")
     install_location = models.CharField(max_length=512, blank=True, default="", verbose_name="Emplacement d'installation")
     uninstall_string = models.TextField(blank=True, default="", verbose_name="Commande de désinstallation")
     source = models.CharField(max_length=50, blank=True, default="", verbose_name="Source")
+    
+    # Références au catalogue (renseignées à l'ingestion)
+    product = models.ForeignKey(
+        SoftwareProduct,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='installations',
+        verbose_name="Produit"
+    )
+    product_version = models.ForeignKey(
+        SoftwareVersion,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='installations',
+        verbose_name="Version du produit"
+    )
     detection_date = models.DateTimeField(default=timezone.now, verbose_name="Date de détection")
     
     # Métadonnées
@@ -91,45 +299,175 @@ class Software(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     
+    # Logiciels actifs uniquement ; all_objects inclut les logiciels désinstallés
+    objects = ActiveSoftwareManager()
+    all_objects = models.Manager()
+    
     class Meta:
         verbose_name = "Logiciel"
         verbose_name_plural = "Logiciels"
         ordering = ['name', 'version']
         unique_together = ['computer', 'name', 'version']
+        indexes = [
+            # Logiciels actifs (d'un ordinateur ou de tout le parc) dans l'ordre par
+            # défaut ; index partiels pour la même raison que sur Computer
+            models.Index(
+                fields=['computer', 'name', 'version'],
+                condition=models.Q(is_active=True),
+                name='software_computer_active_idx'
+            ),
+            models.Index(fields=['name', 'version'], condition=models.Q(is_active=True), name='software_active_name_idx'),
+            # Filtre par éditeur de l'admin
+            models.Index(fields=['publisher', 'name'], name='software_publisher_idx'),
+            # Filtres d'intervalle de versions (version__lt, ...) par produit ou par nom
+            models.Index(
+                fields=['product', 'version_key'], condition=models.Q(is_active=True), name='software_product_key_idx'
+            ),
+            models.Index(
+                fields=['name', 'version_key'], condition=models.Q(is_active=True), name='software_name_key_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} {self.version} sur {self.computer.hostname}"
     
+    # Champ brut -> champ calculé à l'enregistrement
+    DERIVED_FIELDS = {'version': 'version_key', 'name': 'canonical_name', 'publisher': 'canonical_publisher'}
+    
+    def refresh_derived_fields(self):
+        """Calcule la clé de version, le nom et l'éditeur canoniques depuis les valeurs brutes"""
+        self.version_key = version_key(self.version)
+        self.canonical_name = canonical_name(self.name)
+        self.canonical_publisher = canonical_publisher(self.publisher)
+    
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields, *(derived for field, derived in self.DERIVED_FIELDS.items() if field in update_fields)
+            }
+        super().save(*args, **kwargs)
+    
     @classmethod
     def get_or_create_software(cls, computer, software_data):
         """Crée ou met à jour un logiciel"""
-        software, created = cls.objects.get_or_create(
+        from .ingest import save_software
+        
+        software = cls.all_objects.filter(
             computer=computer,
             name=software_data.get('name', 'Unknown'),
             version=software_data.get('version', 'Unknown'),
-            defaults={
-                'publisher': software_data.get('publisher', 'Unknown'),
-                'install_date': software_data.get('install_date', 'Unknown'),
-                'install_location': software_data.get('install_location', '')[:512],
-                'uninstall_string': software_data.get('uninstall_string', ''),
-                'source': software_data.get('source', '')[:50],
-                'detection_date': timezone.now(),
-            }
-        )
+        ).first()
+        created = software is None
+        if created:
+            software = cls(
+                computer=computer,
+                name=software_data.get('name', 'Unknown'),
+                version=software_data.get('version', 'Unknown'),
+            )
         
-        if not created:
-            # Mettre à jour les informations existantes
-            software.publisher = software_data.get('publisher', 'Unknown')
-            software.install_date = software_data.get('install_date', 'Unknown')
-            software.install_location = (software_data.get('install_location', '') or '')[:512]
-            software.uninstall_string = software_data.get('uninstall_string', '') or ''
-            software.source = (software_data.get('source', '') or '')[:50]
-            software.detection_date = timezone.now()
-            software.save()
+        # Mettre à jour les informations existantes
+        software.publisher = software_data.get('publisher', 'Unknown')
+        software.install_date = software_data.get('install_date', 'Unknown')
+        software.install_location = (software_data.get('install_location', '') or '')[:512]
+        software.uninstall_string = software_data.get('uninstall_string', '') or ''
+        software.source = (software_data.get('source', '') or '')[:50]
+        software.detection_date = timezone.now()
+        software.is_active = True
+        save_software(software)
         
         return software, created
 
 
+class SoftwareInstallHistory(models.Model):
+    """Période de présence d'un logiciel sur un ordinateur"""
+    
+    computer = models.ForeignKey(
+        Computer,
+        on_delete=models.CASCADE,
+        related_name='software_history',
+        verbose_name="Ordinateur"
+    )
+    software = models.ForeignKey(
+        Software,
+        on_delete=models.CASCADE,
+        related_name='history',
+        verbose_name="Logiciel"
+    )
+    product = models.ForeignKey(
+        SoftwareProduct,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='history',
+        verbose_name="Produit"
+    )
+    name = models.CharField(max_length=255, verbose_name="Nom")
+    version = models.CharField(max_length=100, verbose_name="Version")
+    publisher = models.CharField(max_length=255, verbose_name="Éditeur")
+    valid_from = models.DateTimeField(verbose_name="Installé le")
+    valid_to = models.DateTimeField(null=True, blank=True, verbose_name="Désinstallé le")
+    
+    class Meta:
+        verbose_name = "Historique d'installation"
+        verbose_name_plural = "Historique des installations"
+        ordering = ['-valid_from']
+        indexes = [
+            models.Index(fields=['computer', 'valid_from'], name='history_computer_from_idx'),
+            models.Index(fields=['valid_from'], name='history_from_idx'),
+            models.Index(fields=['valid_to'], name='history_to_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} {self.version} sur {self.computer_id} ({self.valid_from} - {self.valid_to or '...'})"
+
+
+class ComputerSnapshot(models.Model):
+    """
+    Historique d'une section JSON d'un ordinateur (matériel, réseau).
+
+    Une image complète (keyframe) est stockée périodiquement ; entre deux
+    images, seule la différence avec l'état précédent est conservée.
+    """
+    
+    SECTIONS = [
+        ('hardware', 'Matériel'),
+        ('network', 'Réseau'),
+    ]
+    
+    # Section -> champ JSON de Computer
+    SECTION_FIELDS = {
+        'hardware': 'hardware_info',
+        'network': 'network_info',
+    }
+    
+    computer = models.ForeignKey(
+        Computer,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        verbose_name="Ordinateur"
+    )
+    section = models.CharField(max_length=20, choices=SECTIONS, verbose_name="Section")
+    sequence = models.PositiveIntegerField(verbose_name="Numéro")
+    base_sequence = models.PositiveIntegerField(verbose_name="Numéro de l'image complète de référence")
+    is_keyframe = models.BooleanField(default=False, verbose_name="Image complète")
+    data = models.JSONField(verbose_name="État complet ou différence")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Date")
+    
+    class Meta:
+        verbose_name = "Historique matériel/réseau"
+        verbose_name_plural = "Historiques matériel/réseau"
+        ordering = ['computer', 'section', 'sequence']
+        unique_together = ['computer', 'section', 'sequence']
+        indexes = [
+            models.Index(fields=['computer', 'section', 'created_at'], name='snapshot_computer_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.computer_id} - {self.section} #{self.sequence}"
+
+
 class InventoryLog(models.Model):
     """Modèle pour les logs d'inventaire"""
     
@@ -138,6 +476,7 @@ class InventoryLog(models.Model):
         ('change', 'Détection de changement'),
         ('error', 'Erreur'),
         ('sync', 'Synchronisation'),
+        ('summary', 'Résumé quotidien des scans'),
     ]
     
     computer = models.ForeignKey(
@@ -155,6 +494,13 @@ class InventoryLog(models.Model):
         verbose_name = "Log d'inventaire"
         verbose_name_plural = "Logs d'inventaire"
         ordering = ['-created_at']
+        indexes = [
+            # Logs d'un ordinateur, du plus récent au plus ancien
+            models.Index(fields=['computer', '-created_at'], name='log_computer_date_idx'),
+            # Filtre log_type, et purge par type et par date
+            models.Index(fields=['log_type', '-created_at'], name='log_type_date_idx'),
+            models.Index(fields=['-created_at'], name='log_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.computer.hostname} - {self.log_type} - {self.created_at}"
@@ -188,3 +534,169 @@ class InventoryLog(models.Model):
             message=message,
             details=details or {}
         )
+
+
+class IngestSpool(models.Model):
+    """File d'attente des inventaires reçus, traités par `manage.py process_ingest_spool`"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('processing', 'En cours de traitement'),
+        ('done', 'Traité'),
+        ('coalesced', 'Remplacé par un inventaire plus récent'),
+        ('error', 'Erreur'),
+    ]
+    
+    serial_number = models.CharField(max_length=255, verbose_name="Numéro de série")
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name="Inventaire brut")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    worker = models.CharField(max_length=64, blank=True, default="", verbose_name="Worker")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    error = models.TextField(blank=True, default="", verbose_name="Erreur")
+    received_at = models.DateTimeField(default=timezone.now, verbose_name="Date de réception")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="Date de prise en charge")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Date de traitement")
+    latency_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name="Latence (ms)")
+    
+    class Meta:
+        verbose_name = "Inventaire en attente"
+        verbose_name_plural = "Inventaires en attente"
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['status', 'received_at'], name='spool_status_received_idx'),
+            models.Index(fields=['serial_number', 'status'], name='spool_serial_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.serial_number} - {self.status} - {self.received_at}"
+
+
+class FleetStatistic(models.Model):
+    """Compteur du parc lu par le dashboard, maintenu au fil des ingestions (voir statistics.py)"""
+    
+    METRIC_CHOICES = [
+        ('total', 'Ordinateurs'),
+        ('active', 'Ordinateurs actifs'),
+        ('manufacturer', 'Ordinateurs par fabricant'),
+        ('model', 'Ordinateurs par modèle'),
+        ('last_seen_day', 'Ordinateurs par jour de dernière vue'),
+    ]
+    
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES, verbose_name="Statistique")
+    key = models.CharField(max_length=255, blank=True, default="", verbose_name="Clé")
+    value = models.IntegerField(default=0, verbose_name="Valeur")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="Dernière mise à jour")
+    
+    class Meta:
+        verbose_name = "Statistique du parc"
+        verbose_name_plural = "Statistiques du parc"
+        unique_together = ['metric', 'key']
+    
+    def __str__(self):
+        return f"{self.metric} {self.key} : {self.value}"
+
+
+class Vulnerability(models.Model):
+    """Vulnérabilité du catalogue local, importée par `manage.py import_vulnerabilities`"""
+    
+    SEVERITY_CHOICES = [
+        ('unknown', 'Inconnue'),
+        ('low', 'Faible'),
+        ('medium', 'Moyenne'),
+        ('high', 'Élevée'),
+        ('critical', 'Critique'),
+    ]
+    
+    identifier = models.CharField(max_length=64, unique=True, verbose_name="Identifiant")
+    summary = models.TextField(blank=True, default="", verbose_name="Description")
+    severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default='unknown', verbose_name="Sévérité")
+    cvss = models.FloatField(null=True, blank=True, verbose_name="Score CVSS")
+    published_at = models.DateTimeField(null=True, blank=True, verbose_name="Date de publication")
+    imported_at = models.DateTimeField(default=timezone.now, verbose_name="Date d'import")
+    
+    class Meta:
+        verbose_name = "Vulnérabilité"
+        verbose_name_plural = "Vulnérabilités"
+        ordering = ['identifier']
+    
+    def __str__(self):
+        return self.identifier
+
+
+class VulnerableRange(models.Model):
+    """
+    Intervalle de versions affectées d'un produit (équivalent d'une
+    configuration CPE versionStart* / versionEnd*). Les bornes sont comparées
+    par clé de version ; une borne vide n'est pas limitante.
+    """
+    
+    vulnerability = models.ForeignKey(
+        Vulnerability,
+        on_delete=models.CASCADE,
+        related_name='ranges',
+        verbose_name="Vulnérabilité"
+    )
+    # Nom du produit, comparé sans tenir compte de la casse ; éditeur vide : tous
+    product_name = models.CharField(max_length=255, verbose_name="Produit")
+    publisher = models.CharField(max_length=255, blank=True, default="", verbose_name="Éditeur")
+    version_start = models.CharField(max_length=100, blank=True, default="", verbose_name="Version de début")
+    start_inclusive = models.BooleanField(default=True, verbose_name="Début inclus")
+    version_end = models.CharField(max_length=100, blank=True, default="", verbose_name="Version de fin")
+    end_inclusive = models.BooleanField(default=False, verbose_name="Fin incluse")
+    start_key = models.CharField(max_length=255, blank=True, default="", editable=False, verbose_name="Clé de début")
+    end_key = models.CharField(max_length=255, blank=True, default="", editable=False, verbose_name="Clé de fin")
+    
+    class Meta:
+        verbose_name = "Intervalle de versions affectées"
+        verbose_name_plural = "Intervalles de versions affectées"
+    
+    def __str__(self):
+        return f"{self.product_name} [{self.version_start or '*'}, {self.version_end or '*'}]"
+    
+    def save(self, *args, **kwargs):
+        self.start_key = version_key(self.version_start)
+        self.end_key = version_key(self.version_end)
+        super().save(*args, **kwargs)
+
+
+class VulnerabilityFinding(models.Model):
+    """Logiciel installé affecté par une vulnérabilité (voir vulnerabilities.py)"""
+    
+    computer = models.ForeignKey(
+        Computer,
+        on_delete=models.CASCADE,
+        related_name='vulnerability_findings',
+        verbose_name="Ordinateur"
+    )
+    software = models.ForeignKey(
+        Software,
+        on_delete=models.CASCADE,
+        related_name='vulnerability_findings',
+        verbose_name="Logiciel"
+    )
+    vulnerability = models.ForeignKey(
+        Vulnerability,
+        on_delete=models.CASCADE,
+        related_name='findings',
+        verbose_name="Vulnérabilité"
+    )
+    product = models.ForeignKey(
+        SoftwareProduct,
+        on_delete=models.CASCADE,
+        related_name='vulnerability_findings',
+        verbose_name="Produit"
+    )
+    version = models.CharField(max_length=100, verbose_name="Version")
+    detected_at = models.DateTimeField(default=timezone.now, verbose_name="Date de détection")
+    
+    class Meta:
+        verbose_name = "Logiciel vulnérable"
+        verbose_name_plural = "Logiciels vulnérables"
+        unique_together = ['software', 'vulnerability']
+        indexes = [
+            models.Index(fields=['computer', 'vulnerability'], name='finding_computer_idx'),
+            models.Index(fields=['vulnerability', 'computer'], name='finding_vulnerability_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.vulnerability_id} : {self.software_id} sur {self.computer_id}"
@@ -0,0 +1,227 @@
+"""
+Pagination par curseur (keyset)
+
+Le curseur encode les valeurs des colonnes de tri de la dernière ligne
+retournée ; la page suivante est obtenue par une condition
+« (a, b) > (x, y) » servie par un index, au lieu d'un OFFSET dont le coût
+croît avec le numéro de page. Utilisée par les connexions GraphQL et, via
+KeysetPagination, par les listes de l'API REST.
+"""
+
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _cursor_value(value):
+    # Dates complètes (DjangoJSONEncoder tronque les microsecondes)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values):
+    payload = json.dumps(values, default=_cursor_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    """Valeurs de tri d'un curseur, ValueError s'il est invalide"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Curseur invalide")
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError("Curseur invalide")
+    # Valeurs scalaires uniquement (un objet ou une liste ne se compare pas à une colonne)
+    if not all(isinstance(value, (str, int, float)) for value in values):
+        raise ValueError("Curseur invalide")
+    return values
+
+
+def row_cursor(row, ordering):
+    """Curseur d'une ligne (instance de modèle ou dictionnaire de values())"""
+    names = [field.lstrip('-') for field in ordering]
+    if isinstance(row, dict):
+        return encode_cursor([row[name] for name in names])
+    return encode_cursor([getattr(row, name) for name in names])
+
+
+def keyset_condition(ordering, values, forward=True):
+    """Condition sélectionnant les lignes situées après (ou avant) les valeurs données"""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        descending = field.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    if len(ordering) > 1:
+        # Borne sur la première colonne : l'index est parcouru à partir du
+        # curseur au lieu d'être filtré depuis le début
+        name = ordering[0].lstrip('-')
+        lookup = 'lte' if ordering[0].startswith('-') == forward else 'gte'
+        condition &= Q(**{f'{name}__{lookup}': values[0]})
+    return condition
+
+
+def page_size(requested, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Taille de page demandée, bornée à `maximum`"""
+    if requested is None:
+        return default
+    if requested < 0:
+        raise ValueError("La taille de page doit être positive")
+    return min(requested, maximum)
+
+
+class KeysetPage:
+    """Page de résultats et informations de navigation"""
+
+    def __init__(self, rows, ordering, has_next, has_previous):
+        self.rows = rows
+        self.ordering = ordering
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def cursor(self, row):
+        return row_cursor(row, self.ordering)
+
+    @property
+    def start_cursor(self):
+        return self.cursor(self.rows[0]) if self.rows else None
+
+    @property
+    def end_cursor(self):
+        return self.cursor(self.rows[-1]) if self.rows else None
+
+
+def keyset_page(queryset, ordering, first=None, after=None, last=None, before=None,
+                default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Retourne une page de `queryset` triée selon `ordering`.
+
+    `ordering` doit se terminer par une colonne unique (id) pour que l'ordre
+    soit total. `first`/`after` avancent dans l'ordre de tri, `last`/`before`
+    reculent (Relay).
+    """
+    forward = last is None
+    size = page_size(first if forward else last, default, maximum)
+    cursor = after if forward else before
+
+    if forward:
+        queryset = queryset.order_by(*ordering)
+    else:
+        queryset = queryset.order_by(*[
+            field[1:] if field.startswith('-') else f'-{field}' for field in ordering
+        ])
+    if cursor:
+        # Les valeurs sont converties au type des colonnes par filter() :
+        # une valeur inconvertible (« abc » pour un id, date invalide) rend
+        # le curseur invalide
+        try:
+            queryset = queryset.filter(keyset_condition(ordering, decode_cursor(cursor, ordering), forward))
+        except (TypeError, ValueError, DjangoValidationError):
+            raise ValueError("Curseur invalide")
+
+    rows = list(queryset[:size + 1])
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if forward:
+        return KeysetPage(rows, ordering, has_next=has_more, has_previous=bool(cursor))
+    rows.reverse()
+    return KeysetPage(rows, ordering, has_next=bool(cursor), has_previous=has_more)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination des listes de l'API REST par curseur.
+
+    Le tri est donné par l'attribut `keyset_ordering` de la vue (['id'] par
+    défaut). `cursor` avance après une ligne, `before` recule avant une ligne,
+    `page_size` fixe la taille de page. Le total n'est compté que si
+    `count=1` est demandé (null sinon).
+    """
+
+    page_size = api_settings.PAGE_SIZE or DEFAULT_PAGE_SIZE
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    before_query_param = 'before'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    default_ordering = ['id']
+
+    def get_ordering(self, view):
+        return getattr(view, 'keyset_ordering', self.default_ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        params = request.query_params
+        try:
+            size = int(params[self.page_size_query_param]) if params.get(self.page_size_query_param) else None
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: "Taille de page invalide"})
+
+        after = params.get(self.cursor_query_param) or None
+        before = params.get(self.before_query_param) or None
+        try:
+            if before:
+                self.page = keyset_page(
+                    queryset, self.get_ordering(view), last=size or self.page_size, before=before,
+                    default=self.page_size, maximum=self.max_page_size
+                )
+            else:
+                self.page = keyset_page(
+                    queryset, self.get_ordering(view), first=size, after=after,
+                    default=self.page_size, maximum=self.max_page_size
+                )
+        except ValueError as e:
+            raise ValidationError({self.cursor_query_param: str(e)})
+
+        self.count = None
+        if params.get(self.count_query_param) in ('1', 'true', 'True'):
+            self.count = queryset.count()
+        return self.page.rows
+
+    def get_next_link(self):
+        if not self.page.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.before_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.page.end_cursor)
+
+    def get_previous_link(self):
+        if not self.page.has_previous or not self.page.rows:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return replace_query_param(url, self.before_query_param, self.page.start_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
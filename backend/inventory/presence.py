@@ -0,0 +1,169 @@
+"""
+Index de présence des logiciels : un bitmap d'ordinateurs par version du catalogue
+
+Chaque version du catalogue (SoftwareVersion) a un ensemble d'ordinateurs
+sur lesquels elle est installée, stocké sous forme de bitmap (bit n :
+ordinateur d'identifiant n) compressé par zlib. Les identifiants étant
+denses, 50 000 ordinateurs tiennent dans 6 Ko avant compression, et
+quelques centaines d'octets après pour un logiciel rare ou présent partout.
+
+L'ingestion des logiciels applique la différence de versions installées
+d'un ordinateur (bits ajoutés / retirés), après validation de la
+transaction. Les bitmaps ne sont pas modifiés à la suppression d'un
+ordinateur : les évaluations sont restreintes aux ordinateurs existants
+(voir compliance.py) et la commande `rebuild_presence_bitmaps` les
+reconstruit depuis la table Software.
+"""
+
+import zlib
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Software, SoftwarePresence, SoftwareVersion
+
+
+def encode_bitmap(value):
+    """Bitmap (entier) -> octets compressés"""
+    if not value:
+        return b''
+    return zlib.compress(value.to_bytes((value.bit_length() + 7) // 8, 'little'))
+
+
+def decode_bitmap(data):
+    """Octets compressés -> bitmap (entier)"""
+    if not data:
+        return 0
+    return int.from_bytes(zlib.decompress(bytes(data)), 'little')
+
+
+def bitmap_from_ids(ids):
+    """Bitmap d'un ensemble d'identifiants"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for object_id in ids:
+        data[object_id >> 3] |= 1 << (object_id & 7)
+    return int.from_bytes(data, 'little')
+
+
+def bitmap_ids(value, limit=None):
+    """Identifiants d'un bitmap par ordre croissant (les `limit` premiers)"""
+    ids = []
+    for index, byte in enumerate(value.to_bytes((value.bit_length() + 7) // 8, 'little')):
+        while byte:
+            if limit is not None and len(ids) >= limit:
+                return ids
+            low = byte & -byte
+            ids.append(index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+def apply_presence_changes(changes, now=None):
+    """
+    Applique {id version: (bits ajoutés, bits retirés)} aux bitmaps.
+
+    Les lignes sont verrouillées dans un ordre constant : pas d'interblocage
+    entre deux ingestions.
+    """
+    if not changes:
+        return
+    now = now or timezone.now()
+    products = dict(SoftwareVersion.objects.filter(id__in=changes).values_list('id', 'product_id'))
+    SoftwarePresence.objects.bulk_create(
+        [
+            SoftwarePresence(version_id=version_id, product_id=product_id, updated_at=now)
+            for version_id, product_id in products.items()
+        ],
+        ignore_conflicts=True
+    )
+    with transaction.atomic():
+        presences = SoftwarePresence.objects.select_for_update().filter(version_id__in=products).order_by('version_id')
+        to_update = []
+        for presence in presences:
+            added, removed = changes[presence.version_id]
+            current = decode_bitmap(presence.bitmap)
+            value = (current | added) & ~removed
+            if value == current:
+                continue
+            presence.bitmap = encode_bitmap(value)
+            presence.computer_count = value.bit_count()
+            presence.updated_at = now
+            to_update.append(presence)
+        SoftwarePresence.objects.bulk_update(to_update, ['bitmap', 'computer_count', 'updated_at'])
+
+
+def record_presence_changes(computer_id, added_version_ids, removed_version_ids):
+    """
+    Enregistre les versions installées et désinstallées d'un ordinateur ;
+    les bitmaps sont mis à jour après validation de la transaction en cours.
+    """
+    bit = 1 << computer_id
+    changes = {}
+    for version_id in added_version_ids:
+        if version_id is not None:
+            changes[version_id] = (bit, 0)
+    for version_id in removed_version_ids:
+        if version_id is not None:
+            changes[version_id] = (0, bit)
+    if changes:
+        transaction.on_commit(lambda: apply_presence_changes(changes))
+
+
+def installed_version_ids(software_list):
+    """Versions du catalogue des logiciels actifs d'une liste"""
+    return {software.product_version_id for software in software_list if software.is_active}
+
+
+def build_presence(version_id, product_id, computer_ids, now):
+    value = bitmap_from_ids(computer_ids)
+    return SoftwarePresence(
+        version_id=version_id,
+        product_id=product_id,
+        bitmap=encode_bitmap(value),
+        computer_count=value.bit_count(),
+        updated_at=now,
+    )
+
+
+@transaction.atomic
+def rebuild_presence_bitmaps():
+    """Reconstruit tous les bitmaps depuis la table Software, retourne le nombre de versions"""
+    now = timezone.now()
+    SoftwarePresence.objects.all().delete()
+    # Installations parcourues par version : un seul bitmap en mémoire à la fois
+    rows = Software.objects.filter(product_version__isnull=False).order_by('product_version_id').values_list(
+        'product_version_id', 'product_id', 'computer_id'
+    ).iterator(chunk_size=10000)
+    presences = []
+    count = 0
+    current = None
+    computer_ids = []
+    for version_id, product_id, computer_id in rows:
+        if current is not None and version_id != current[0]:
+            presences.append(build_presence(*current, computer_ids, now))
+            computer_ids = []
+        current = (version_id, product_id)
+        computer_ids.append(computer_id)
+        if len(presences) >= 500:
+            SoftwarePresence.objects.bulk_create(presences)
+            count += len(presences)
+            presences = []
+    if current is not None:
+        presences.append(build_presence(*current, computer_ids, now))
+    SoftwarePresence.objects.bulk_create(presences)
+    return count + len(presences)
+
+
+def product_bitmaps(product_ids):
+    """{id produit: [(clé de version, bitmap)]} des produits demandés, en une requête"""
+    bitmaps = defaultdict(list)
+    rows = SoftwarePresence.objects.filter(product_id__in=product_ids, computer_count__gt=0).values_list(
+        'product_id', 'version__version_key', 'bitmap'
+    )
+    for product_id, key, data in rows:
+        bitmaps[product_id].append((key, decode_bitmap(data)))
+    return bitmaps
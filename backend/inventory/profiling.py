@@ -0,0 +1,215 @@
+"""
+Profilage des requêtes à la demande et échantillonnage des requêtes lentes
+
+Pour chaque requête, le middleware mesure la durée totale ainsi que le nombre
+et la durée des requêtes SQL (un simple compteur, sans conserver le SQL). Un
+profil détaillé est établi lorsqu'il est demandé par l'en-tête `X-Profile`,
+ou pour une fraction des requêtes (taux d'échantillonnage). Il contient les
+requêtes SQL les plus lentes, les durées par résolveur GraphQL et,
+optionnellement, un profil cProfile.
+
+Les requêtes lentes et les requêtes profilées sont enregistrées dans un
+anneau de fichiers JSON de taille bornée.
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'TOKEN': '',
+    'SAMPLE_RATE': 0.0,
+    'SLOW_REQUEST_MS': 1000,
+    'RING_DIR': os.path.join(settings.BASE_DIR, 'logs', 'slow_requests'),
+    'RING_SIZE': 200,
+}
+
+# Nombre d'éléments conservés dans un profil détaillé
+TOP_SQL = 10
+TOP_RESOLVERS = 20
+TOP_CPROFILE = 40
+
+
+def profiling_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'INVENTORY_PROFILING', {})}
+
+
+class RequestProfile:
+    """Mesures collectées pendant une requête"""
+
+    def __init__(self, detailed=False, use_cprofile=False):
+        self.id = uuid.uuid4().hex
+        self.detailed = detailed
+        self.started_at = datetime.now(dt_timezone.utc)
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.slow_sql = []
+        self.resolvers = {}
+        self.profiler = cProfile.Profile() if use_cprofile else None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Enveloppe d'exécution SQL (connection.execute_wrapper)"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.sql_count += 1
+            self.sql_time += duration
+            if self.detailed:
+                self.slow_sql.append((duration, sql))
+                if len(self.slow_sql) > TOP_SQL * 4:
+                    self.slow_sql = sorted(self.slow_sql, reverse=True)[:TOP_SQL]
+
+    def add_resolver(self, path, duration):
+        count, total = self.resolvers.get(path, (0, 0.0))
+        self.resolvers[path] = (count + 1, total + duration)
+
+    def as_dict(self, request, response, duration):
+        record = {
+            'id': self.id,
+            'started_at': self.started_at.isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'graphql_operation': getattr(request, 'graphql_operation', None),
+            'duration_ms': round(duration * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+        }
+        if self.detailed:
+            record['slow_sql'] = [
+                {'ms': round(sql_duration * 1000, 2), 'sql': sql[:1000]}
+                for sql_duration, sql in sorted(self.slow_sql, reverse=True)[:TOP_SQL]
+            ]
+            record['resolvers'] = [
+                {'field': path, 'calls': count, 'ms': round(total * 1000, 2)}
+                for path, (count, total) in sorted(
+                    self.resolvers.items(), key=lambda item: item[1][1], reverse=True
+                )[:TOP_RESOLVERS]
+            ]
+        if self.profiler is not None:
+            output = io.StringIO()
+            pstats.Stats(self.profiler, stream=output).sort_stats('cumulative').print_stats(TOP_CPROFILE)
+            record['cprofile'] = output.getvalue()
+        return record
+
+
+def write_to_ring(record, ring_dir, ring_size):
+    """Enregistre un profil dans l'anneau et supprime les plus anciens au-delà de `ring_size`"""
+    os.makedirs(ring_dir, exist_ok=True)
+    name = f"{record['started_at'].replace(':', '').replace('-', '')}-{record['id']}.json"
+    with open(os.path.join(ring_dir, name), 'w', encoding='utf-8') as output:
+        json.dump(record, output, ensure_ascii=False, indent=2)
+
+    files = sorted(entry for entry in os.listdir(ring_dir) if entry.endswith('.json'))
+    for old in files[:-ring_size]:
+        try:
+            os.remove(os.path.join(ring_dir, old))
+        except OSError:
+            pass
+
+
+def read_ring(ring_dir=None, limit=None):
+    """Profils enregistrés, du plus récent au plus ancien"""
+    ring_dir = ring_dir or profiling_settings()['RING_DIR']
+    if not os.path.isdir(ring_dir):
+        return []
+    files = sorted((entry for entry in os.listdir(ring_dir) if entry.endswith('.json')), reverse=True)
+    records = []
+    for name in files[:limit]:
+        try:
+            with open(os.path.join(ring_dir, name), encoding='utf-8') as source:
+                records.append(json.load(source))
+        except (OSError, ValueError):
+            continue
+    return records
+
+
+def requested_profile(request, config):
+    """
+    Retourne (profil détaillé, cProfile) selon l'en-tête X-Profile et l'échantillonnage.
+
+    Le middleware s'exécute avant l'authentification DRF : seul un membre du
+    staff connecté par session est reconnu. Les clients authentifiés en HTTP
+    Basic utilisent `X-Profile-Token`.
+    """
+    mode = request.headers.get('X-Profile', '').strip().lower()
+    if mode:
+        user = getattr(request, 'user', None)
+        allowed = (
+            settings.DEBUG
+            or (user is not None and user.is_authenticated and user.is_staff)
+            or (config['TOKEN'] and hmac.compare_digest(
+                request.headers.get('X-Profile-Token', '').encode(), config['TOKEN'].encode()
+            ))
+        )
+        if allowed:
+            return True, mode == 'cprofile'
+    if config['SAMPLE_RATE'] and random.random() < config['SAMPLE_RATE']:
+        return True, False
+    return False, False
+
+
+class ProfilingMiddleware:
+    """Mesure chaque requête et enregistre les requêtes lentes ou profilées"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = profiling_settings()
+        detailed, use_cprofile = requested_profile(request, config)
+        profile = RequestProfile(detailed, use_cprofile)
+        request.inventory_profile = profile
+
+        start = time.perf_counter()
+        if profile.profiler is not None:
+            profile.profiler.enable()
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            if profile.profiler is not None:
+                profile.profiler.disable()
+        duration = time.perf_counter() - start
+
+        if detailed:
+            response['X-Profile-Id'] = profile.id
+            response['Server-Timing'] = (
+                f'total;dur={duration * 1000:.1f}, '
+                f'db;dur={profile.sql_time * 1000:.1f};desc="{profile.sql_count} SQL"'
+            )
+
+        if detailed or duration * 1000 >= config['SLOW_REQUEST_MS']:
+            try:
+                write_to_ring(profile.as_dict(request, response, duration), config['RING_DIR'], config['RING_SIZE'])
+            except OSError:
+                logger.exception("Impossible d'enregistrer le profil de la requête")
+        return response
+
+
+class ResolverTimingMiddleware:
+    """Middleware graphene : durée de chaque résolveur, ajouté uniquement aux requêtes profilées"""
+
+    def resolve(self, next, root, info, **args):
+        start = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            profile = getattr(info.context, 'inventory_profile', None)
+            if profile is not None:
+                profile.add_resolver(f'{info.parent_type.name}.{info.field_name}', time.perf_counter() - start)
@@ -0,0 +1,156 @@
+"""
+Analyse statique du coût des requêtes GraphQL
+
+Le coût d'un document est estimé avant exécution : chaque champ objet coûte
+1, multiplié par le nombre d'éléments attendu lorsqu'il retourne une liste
+(taille de page `first`/`last` pour les connexions, `limit` s'il existe,
+GRAPHQL_LIST_SIZE_ESTIMATE sinon). Les champs scalaires et d'introspection
+sont gratuits. La profondeur et le coût sont comparés au budget de la classe
+du client (GRAPHQL_QUERY_BUDGETS).
+"""
+
+from django.conf import settings
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, GraphQLObjectType,
+    InlineFragmentNode, get_named_type, get_nullable_type, get_operation_ast, is_list_type,
+)
+from graphql.execution.values import get_argument_values
+
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+DEFAULT_BUDGETS = {
+    'anonymous': {'max_depth': 8, 'max_cost': 5000},
+    'authenticated': {'max_depth': 12, 'max_cost': 50000},
+    'staff': {'max_depth': 15, 'max_cost': 500000},
+}
+DEFAULT_LIST_SIZE = 100
+# Plus grand plafond appliqué par les résolveurs à l'argument `limit`
+# (historique des changements, conformité)
+MAX_LIST_LIMIT = 10000
+
+
+class QueryCost:
+    """Coût et profondeur estimés d'une opération"""
+
+    def __init__(self, cost=0, depth=0):
+        self.cost = cost
+        self.depth = depth
+
+
+def is_connection(graphql_type):
+    return (
+        isinstance(graphql_type, GraphQLObjectType)
+        and 'edges' in graphql_type.fields
+        and 'pageInfo' in graphql_type.fields
+    )
+
+
+class CostAnalyzer:
+    """Parcourt les sélections d'une opération en résolvant les fragments"""
+
+    def __init__(self, schema, document, variables=None, list_size=DEFAULT_LIST_SIZE):
+        self.schema = schema
+        self.variables = variables or {}
+        self.list_size = list_size
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+
+    def arguments(self, field_def, node):
+        try:
+            return get_argument_values(field_def, node, self.variables)
+        except GraphQLError:
+            # Variables invalides : l'exécution signalera l'erreur
+            return {}
+
+    def multiplier(self, parent_type, field_def, node):
+        """Nombre d'éléments attendus pour un champ"""
+        field_type = get_nullable_type(field_def.type)
+        if is_connection(get_named_type(field_type)):
+            args = self.arguments(field_def, node)
+            size = args.get('first') if args.get('first') is not None else args.get('last')
+            # Bornes des résolveurs : une taille négative ne doit pas réduire le coût total
+            return max(1, min(size, MAX_PAGE_SIZE)) if size is not None else DEFAULT_PAGE_SIZE
+        if not is_list_type(field_type):
+            return 1
+        if is_connection(parent_type):
+            # edges : la taille de page est déjà comptée sur la connexion
+            return 1
+        limit = self.arguments(field_def, node).get('limit')
+        return max(0, min(limit, MAX_LIST_LIMIT)) if limit is not None else self.list_size
+
+    def selection_set(self, parent_type, selection_set):
+        result = QueryCost()
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                if name.startswith('__') or selection.selection_set is None:
+                    continue
+                field_def = getattr(parent_type, 'fields', {}).get(name)
+                if field_def is None:
+                    continue
+                child = self.selection_set(get_named_type(field_def.type), selection.selection_set)
+                result.cost += self.multiplier(parent_type, field_def, selection) * (1 + child.cost)
+                result.depth = max(result.depth, child.depth + 1)
+                continue
+
+            if isinstance(selection, InlineFragmentNode):
+                fragment_type, fragment_selection = selection.type_condition, selection.selection_set
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+                fragment_type, fragment_selection = fragment.type_condition, fragment.selection_set
+            else:
+                continue
+            target = self.schema.get_type(fragment_type.name.value) if fragment_type else parent_type
+            child = self.selection_set(target, fragment_selection)
+            result.cost += child.cost
+            result.depth = max(result.depth, child.depth)
+        return result
+
+
+def analyze_cost(schema, document, operation_name=None, variables=None):
+    """Coût et profondeur estimés de l'opération demandée d'un document validé"""
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return QueryCost()
+    analyzer = CostAnalyzer(
+        schema, document, variables,
+        getattr(settings, 'GRAPHQL_LIST_SIZE_ESTIMATE', DEFAULT_LIST_SIZE)
+    )
+    return analyzer.selection_set(schema.get_root_type(operation.operation), operation.selection_set)
+
+
+def client_class(request):
+    """Classe du client pour le choix du budget"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    if user.is_staff:
+        return 'staff'
+    return 'authenticated'
+
+
+def query_budget(request):
+    budgets = {**DEFAULT_BUDGETS, **getattr(settings, 'GRAPHQL_QUERY_BUDGETS', {})}
+    return budgets[client_class(request)]
+
+
+def check_query_cost(request, schema, document, operation_name=None, variables=None):
+    """Retourne une GraphQLError si la requête dépasse le budget du client, None sinon"""
+    budget = query_budget(request)
+    estimate = analyze_cost(schema, document, operation_name, variables)
+    if estimate.depth > budget['max_depth']:
+        return GraphQLError(
+            f"Requête trop profonde : {estimate.depth} niveaux (maximum {budget['max_depth']})",
+            extensions={'code': 'QUERY_TOO_DEEP', 'depth': estimate.depth, 'maxDepth': budget['max_depth']}
+        )
+    if estimate.cost > budget['max_cost']:
+        return GraphQLError(
+            f"Requête trop coûteuse : coût estimé {estimate.cost} (maximum {budget['max_cost']})",
+            extensions={'code': 'QUERY_TOO_EXPENSIVE', 'cost': estimate.cost, 'maxCost': budget['max_cost']}
+        )
+    return None
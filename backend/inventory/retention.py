@@ -0,0 +1,158 @@
+"""
+Conservation des logs d'inventaire
+
+La durée de conservation est définie par type de log dans
+INVENTORY_LOG_RETENTION_DAYS. Les scans de routine plus anciens que leur durée
+de conservation ne sont pas simplement supprimés : ils sont d'abord regroupés
+en un log 'summary' par ordinateur et par jour. Tout le travail est fait par
+lots courts pour ne pas bloquer la base.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import InventoryLog
+
+DEFAULT_RETENTION_DAYS = {
+    'scan': 7,
+    'sync': 30,
+    'error': 90,
+    'change': 365,
+    'summary': 365,
+}
+
+# Compteurs des logs de scan additionnés dans le résumé quotidien
+SUMMARY_COUNTERS = ['software_created', 'software_updated', 'software_deactivated']
+
+
+def retention_days():
+    """Durées de conservation par type de log (None : conservation illimitée)"""
+    return {**DEFAULT_RETENTION_DAYS, **getattr(settings, 'INVENTORY_LOG_RETENTION_DAYS', {})}
+
+
+def day_start(value):
+    """Début (heure locale) du jour d'une date"""
+    local = timezone.localtime(value)
+    return timezone.make_aware(datetime.combine(local.date(), datetime.min.time()))
+
+
+def merge_summary(summary, scans):
+    """Ajoute des logs de scan (dictionnaires id/created_at/details) à un résumé"""
+    summary['scans'] = summary.get('scans', 0) + len(scans)
+    first = min(scan['created_at'] for scan in scans).isoformat()
+    last = max(scan['created_at'] for scan in scans).isoformat()
+    summary['first_scan'] = min(summary.get('first_scan', first), first)
+    summary['last_scan'] = max(summary.get('last_scan', last), last)
+
+    sources = summary.setdefault('sources', {})
+    for scan in scans:
+        details = scan['details'] if isinstance(scan['details'], dict) else {}
+        source = details.get('source', 'inconnue')
+        sources[source] = sources.get(source, 0) + 1
+        for counter in SUMMARY_COUNTERS:
+            summary[counter] = summary.get(counter, 0) + (details.get(counter) or 0)
+    return summary
+
+
+@transaction.atomic
+def rollup_scan_batch(cutoff, batch_size=1000):
+    """
+    Regroupe un lot des plus anciens scans antérieurs à `cutoff` dans les
+    résumés quotidiens, puis les supprime. Retourne le nombre de scans traités.
+    """
+    scans = list(
+        InventoryLog.objects.filter(log_type='scan', created_at__lt=cutoff)
+        .order_by('created_at')
+        .values('id', 'computer_id', 'created_at', 'details')[:batch_size]
+    )
+    if not scans:
+        return 0
+
+    groups = {}
+    for scan in scans:
+        groups.setdefault((scan['computer_id'], day_start(scan['created_at'])), []).append(scan)
+
+    # Un jour peut être réparti sur plusieurs lots : on complète le résumé existant
+    existing = {
+        (summary.computer_id, summary.created_at): summary
+        for summary in InventoryLog.objects.filter(
+            log_type='summary',
+            computer_id__in={computer_id for computer_id, _ in groups},
+            created_at__in={day for _, day in groups},
+        )
+    }
+
+    to_update = []
+    for (computer_id, day), group in groups.items():
+        summary = existing.get((computer_id, day))
+        if summary is not None:
+            merge_summary(summary.details, group)
+            summary.message = f"Résumé des scans du {day.date():%d/%m/%Y} : {summary.details['scans']} scans"
+            to_update.append(summary)
+            continue
+
+        details = merge_summary({'date': day.date().isoformat()}, group)
+        summary = InventoryLog.objects.create(
+            computer_id=computer_id,
+            log_type='summary',
+            message=f"Résumé des scans du {day.date():%d/%m/%Y} : {details['scans']} scans",
+            details=details,
+        )
+        # created_at est renseigné automatiquement à la création
+        InventoryLog.objects.filter(pk=summary.pk).update(created_at=day)
+
+    if to_update:
+        InventoryLog.objects.bulk_update(to_update, ['message', 'details'])
+    InventoryLog.objects.filter(id__in=[scan['id'] for scan in scans]).delete()
+    return len(scans)
+
+
+def delete_batch(log_type, cutoff, batch_size=1000):
+    """Supprime un lot de logs d'un type antérieurs à `cutoff`, retourne le nombre supprimé"""
+    ids = list(
+        InventoryLog.objects.filter(log_type=log_type, created_at__lt=cutoff)
+        .order_by('created_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    return InventoryLog.objects.filter(id__in=ids).delete()[0]
+
+
+def prune_logs(now=None, batch_size=1000, pause=0.0, retention=None):
+    """
+    Applique la politique de conservation, retourne {type: nombre de logs traités}.
+
+    Les scans sont regroupés en résumés quotidiens ; les autres types sont
+    supprimés. `pause` (secondes) est observée entre deux lots.
+    """
+    now = now or timezone.now()
+    retention = retention or retention_days()
+    processed = {}
+
+    for log_type, days in retention.items():
+        if days is None:
+            continue
+        cutoff = now - timedelta(days=days)
+        if log_type == 'scan':
+            # Les résumés couvrent des journées entières
+            cutoff = day_start(cutoff)
+            step = lambda: rollup_scan_batch(cutoff, batch_size)
+        else:
+            step = lambda: delete_batch(log_type, cutoff, batch_size)
+
+        total = 0
+        while True:
+            count = step()
+            total += count
+            if count < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        processed[log_type] = total
+
+    return processed
@@ -0,0 +1,144 @@
+"""
+Nombre d'installations des logiciels par produit et par version du catalogue
+
+Les revues de licences (« produits les plus installés », « versions de
+7-Zip sur le parc ») lisent des compteurs pré-calculés (SoftwareRollup) au
+lieu de regrouper la table Software à chaque appel. Un produit est identifié
+par son nom et son éditeur canoniques : il y a une ligne par version du
+catalogue et une ligne de total par produit (version vide).
+
+L'ingestion applique la différence entre les installations actives d'un
+ordinateur avant et après la synchronisation, dans la même transaction ; la
+suppression d'un ordinateur retire ses installations. La commande
+`reconcile_software_rollups` recalcule périodiquement tous les compteurs
+depuis la table Software et corrige ceux qui ont dérivé.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Computer, Software, SoftwareRollup
+
+
+def rollup_counts(software_list):
+    """Counter {(id produit, id version): installations} des logiciels actifs d'une liste"""
+    return Counter(
+        (software.product_id, software.product_version_id)
+        for software in software_list if software.is_active and software.product_version_id is not None
+    )
+
+
+def apply_rollup_changes(changes, now=None):
+    """
+    Applique {(id produit, id version ou None): différence} aux compteurs.
+
+    Les lignes manquantes sont créées à zéro, puis toutes les lignes sont
+    verrouillées dans un ordre constant : pas d'interblocage entre deux
+    ingestions.
+    """
+    now = now or timezone.now()
+    SoftwareRollup.objects.bulk_create(
+        [
+            SoftwareRollup(product_id=product_id, version_id=version_id, updated_at=now)
+            for product_id, version_id in changes
+        ],
+        ignore_conflicts=True
+    )
+    version_ids = {version_id for _, version_id in changes if version_id is not None}
+    product_ids = {product_id for product_id, version_id in changes if version_id is None}
+    rollups = SoftwareRollup.objects.select_for_update().filter(
+        Q(version_id__in=version_ids) | Q(version__isnull=True, product_id__in=product_ids)
+    ).order_by('id')
+    to_update = []
+    for rollup in rollups:
+        rollup.install_count += changes[(rollup.product_id, rollup.version_id)]
+        rollup.updated_at = now
+        to_update.append(rollup)
+    SoftwareRollup.objects.bulk_update(to_update, ['install_count', 'updated_at'])
+
+
+def update_software_rollups(before, after):
+    """
+    Applique le passage des installations `before` aux installations `after`
+    (résultats de `rollup_counts`) aux compteurs des versions et des produits.
+
+    Aucune requête n'est exécutée si les installations sont identiques, ce
+    qui est le cas de la plupart des synchronisations.
+    """
+    deltas = Counter(after)
+    deltas.subtract(before)
+    changes = Counter()
+    for (product_id, version_id), delta in deltas.items():
+        changes[(product_id, version_id)] += delta
+        changes[(product_id, None)] += delta
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if changes:
+        apply_rollup_changes(changes)
+
+
+@receiver(pre_delete, sender=Computer)
+def computer_deleted(sender, instance, **kwargs):
+    # Les logiciels sont supprimés en cascade, sans signal par ligne
+    installed = Counter(dict(
+        ((row['product_id'], row['product_version_id']), row['count'])
+        for row in Software.objects.filter(computer=instance, product_version__isnull=False).order_by().values(
+            'product_id', 'product_version_id'
+        ).annotate(count=Count('id'))
+    ))
+    update_software_rollups(installed, Counter())
+
+
+def expected_rollups():
+    """Compteurs calculés depuis la table Software"""
+    expected = Counter()
+    rows = Software.objects.filter(product_version__isnull=False).order_by().values(
+        'product_id', 'product_version_id'
+    ).annotate(count=Count('id'))
+    for row in rows:
+        expected[(row['product_id'], row['product_version_id'])] += row['count']
+        expected[(row['product_id'], None)] += row['count']
+    return +expected
+
+
+@transaction.atomic
+def reconcile_software_rollups(now=None):
+    """
+    Recalcule tous les compteurs depuis la table Software, corrige ceux qui ont
+    dérivé et supprime ceux qui sont à zéro. Retourne le nombre de compteurs
+    qui avaient dérivé.
+    """
+    now = now or timezone.now()
+    # Verrouillage avant le comptage : une ingestion en cours attend la fin de
+    # la réconciliation pour appliquer ses différences sur les compteurs recalculés
+    current = {
+        (rollup.product_id, rollup.version_id): rollup
+        for rollup in SoftwareRollup.objects.select_for_update().order_by('id')
+    }
+    expected = expected_rollups()
+    drifted = sum(
+        1 for key in set(current) | set(expected)
+        if (current[key].install_count if key in current else 0) != expected[key]
+    )
+
+    to_create = []
+    to_update = []
+    for (product_id, version_id), install_count in expected.items():
+        rollup = current.pop((product_id, version_id), None)
+        if rollup is None:
+            to_create.append(SoftwareRollup(
+                product_id=product_id, version_id=version_id, install_count=install_count, updated_at=now
+            ))
+        elif rollup.install_count != install_count:
+            rollup.install_count = install_count
+            rollup.updated_at = now
+            to_update.append(rollup)
+
+    SoftwareRollup.objects.bulk_create(to_create, batch_size=500)
+    SoftwareRollup.objects.bulk_update(to_update, ['install_count', 'updated_at'], batch_size=500)
+    SoftwareRollup.objects.filter(id__in=[rollup.id for rollup in current.values()]).delete()
+    return drifted
@@ -4,8 +4,23 @@ Schéma GraphQL pour l'API d'inventaire
 
 import graphene
 from graphene_django import DjangoObjectType
+from django.conf import settings
 from django.utils import timezone
-from .models import Computer, Software, InventoryLog
+from .models import (
+    Computer, Software, InventoryLog, SoftwareProduct, SoftwareVersion, SoftwareInstallHistory,
+    ComputerSnapshot, Vulnerability, VulnerableRange, VulnerabilityFinding, SoftwareRollup
+)
+from .ingest import ingest_inventory, ingest_software, save_software, touch_inventory
+from .spool import enqueue_inventory
+from .history import software_as_of, software_changes
+from .snapshots import record_changes, reconstruct
+from .statistics import fleet_counters, update_fleet_statistics
+from .loaders import get_loaders
+from .search import search
+from .compliance import evaluate
+from .presence import bitmap_ids
+from .filters import ComputerFilter, SoftwareFilter, SoftwareRollupFilter
+from .pagination import keyset_page
 
 
 class ComputerType(DjangoObjectType):
@@ -14,6 +29,12 @@ class ComputerType(DjangoObjectType):
     class Meta:
         model = Computer
         fields = '__all__'
+    
+    def resolve_software_list(self, info):
+        return get_loaders(info).software_by_computer.load(self.id)
+    
+    def resolve_logs(self, info):
+        return get_loaders(info).logs_by_computer.load(self.id)
 
 
 class SoftwareType(DjangoObjectType):
@@ -22,6 +43,119 @@ class SoftwareType(DjangoObjectType):
     class Meta:
         model = Software
         fields = '__all__'
+    
+    def resolve_computer(self, info):
+        return get_loaders(info).computer.load(self.computer_id)
+
+
+class SoftwareProductType(DjangoObjectType):
+    """Type GraphQL pour les produits du catalogue"""
+    
+    class Meta:
+        model = SoftwareProduct
+        fields = ('id', 'name', 'publisher', 'versions', 'created_at')
+
+
+class SoftwareVersionType(DjangoObjectType):
+    """Type GraphQL pour les versions du catalogue"""
+    
+    class Meta:
+        model = SoftwareVersion
+        fields = ('id', 'product', 'version', 'created_at')
+
+
+class SoftwareRollupType(DjangoObjectType):
+    """Type GraphQL pour les nombres d'installations (version vide : total du produit)"""
+    
+    class Meta:
+        model = SoftwareRollup
+        fields = ('id', 'product', 'version', 'install_count', 'updated_at')
+
+
+class SoftwareInstallHistoryType(DjangoObjectType):
+    """Type GraphQL pour l'historique des installations"""
+    
+    class Meta:
+        model = SoftwareInstallHistory
+        fields = ('id', 'computer', 'product', 'name', 'version', 'publisher', 'valid_from', 'valid_to')
+
+
+class VulnerabilityType(DjangoObjectType):
+    """Type GraphQL pour les vulnérabilités du catalogue local"""
+    
+    class Meta:
+        model = Vulnerability
+        fields = ('id', 'identifier', 'summary', 'severity', 'cvss', 'published_at', 'imported_at', 'ranges')
+
+
+class VulnerableRangeType(DjangoObjectType):
+    """Type GraphQL pour les intervalles de versions affectées"""
+    
+    class Meta:
+        model = VulnerableRange
+        fields = (
+            'id', 'product_name', 'publisher', 'version_start', 'start_inclusive', 'version_end', 'end_inclusive',
+        )
+
+
+class VulnerabilityFindingType(DjangoObjectType):
+    """Type GraphQL pour les logiciels vulnérables détectés"""
+    
+    class Meta:
+        model = VulnerabilityFinding
+        fields = ('id', 'computer', 'software', 'vulnerability', 'product', 'version', 'detected_at')
+    
+    def resolve_computer(self, info):
+        return get_loaders(info).computer.load(self.computer_id)
+
+
+class ComputerSnapshotType(DjangoObjectType):
+    """Type GraphQL pour l'historique du matériel et du réseau"""
+    
+    class Meta:
+        model = ComputerSnapshot
+        fields = ('id', 'computer', 'section', 'sequence', 'is_keyframe', 'created_at')
+
+
+class ComputerSectionStateType(graphene.ObjectType):
+    """État reconstitué d'une section d'un ordinateur à une date donnée"""
+    section = graphene.String()
+    recorded_at = graphene.DateTime()
+    data = graphene.JSONString()
+
+
+class ComputerSearchHitType(graphene.ObjectType):
+    """Ordinateur trouvé par la recherche"""
+    id = graphene.Int()
+    hostname = graphene.String()
+    serial_number = graphene.String()
+    current_user = graphene.String()
+    manufacturer = graphene.String()
+    model = graphene.String()
+    score = graphene.Float()
+
+
+class ProductSearchHitType(graphene.ObjectType):
+    """Produit du catalogue trouvé par la recherche"""
+    id = graphene.Int()
+    name = graphene.String()
+    publisher = graphene.String()
+    score = graphene.Float()
+
+
+class SearchResultsType(graphene.ObjectType):
+    """Résultats classés d'une recherche, et ordinateurs ayant les produits trouvés"""
+    query = graphene.String()
+    computers = graphene.List(ComputerSearchHitType)
+    products = graphene.List(ProductSearchHitType)
+    installed_on = graphene.List(ComputerSearchHitType)
+
+
+class ComplianceResultType(graphene.ObjectType):
+    """Ordinateurs satisfaisant une expression de conformité"""
+    expression = graphene.String()
+    count = graphene.Int()
+    computers = graphene.List(ComputerType)
 
 
 class InventoryLogType(DjangoObjectType):
@@ -30,6 +164,57 @@ class InventoryLogType(DjangoObjectType):
     class Meta:
         model = InventoryLog
         fields = '__all__'
+    
+    def resolve_computer(self, info):
+        return get_loaders(info).computer.load(self.computer_id)
+
+
+class ComputerConnection(graphene.relay.Connection):
+    """Page d'ordinateurs (pagination par curseur)"""
+    
+    class Meta:
+        node = ComputerType
+
+
+class SoftwareConnection(graphene.relay.Connection):
+    """Page de logiciels (pagination par curseur)"""
+    
+    class Meta:
+        node = SoftwareType
+
+
+class VulnerabilityFindingConnection(graphene.relay.Connection):
+    """Page de logiciels vulnérables (pagination par curseur)"""
+    
+    class Meta:
+        node = VulnerabilityFindingType
+
+
+class SoftwareRollupConnection(graphene.relay.Connection):
+    """Page de nombres d'installations (pagination par curseur)"""
+    
+    class Meta:
+        node = SoftwareRollupType
+
+
+class InventoryLogConnection(graphene.relay.Connection):
+    """Page de logs (pagination par curseur)"""
+    
+    class Meta:
+        node = InventoryLogType
+
+
+def build_connection(connection_type, page):
+    """Construit une connexion Relay à partir d'une page keyset"""
+    return connection_type(
+        edges=[connection_type.Edge(node=row, cursor=page.cursor(row)) for row in page.rows],
+        page_info=graphene.relay.PageInfo(
+            has_next_page=page.has_next,
+            has_previous_page=page.has_previous,
+            start_cursor=page.start_cursor,
+            end_cursor=page.end_cursor,
+        )
+    )
 
 
 class ComputerInput(graphene.InputObjectType):
@@ -44,6 +229,25 @@ class ComputerInput(graphene.InputObjectType):
     networkInfo = graphene.JSONString()
 
 
+class FingerprintInput(graphene.InputObjectType):
+    """Input GraphQL pour les empreintes de contenu calculées par l'agent"""
+    systemHash = graphene.String()
+    hardwareHash = graphene.String()
+    networkHash = graphene.String()
+    softwareHash = graphene.String()
+
+
+class ComputerFingerprintType(graphene.ObjectType):
+    """Empreintes de contenu d'un ordinateur, sans les données JSON"""
+    id = graphene.ID()
+    serial_number = graphene.String()
+    system_hash = graphene.String()
+    hardware_hash = graphene.String()
+    network_hash = graphene.String()
+    software_hash = graphene.String()
+    last_seen = graphene.DateTime()
+
+
 class SoftwareInput(graphene.InputObjectType):
     """Input GraphQL pour les logiciels"""
     computerId = graphene.Int(required=True)
@@ -82,7 +286,7 @@ class CreateComputerMutation(graphene.Mutation):
     def mutate(self, info, input):
         try:
             # Créer l'ordinateur
-            computer = Computer.objects.create(
+            computer = Computer(
                 hostname=input.hostname,
                 serial_number=input.serialNumber,
                 manufacturer=input.manufacturer or "Unknown",
@@ -92,6 +296,13 @@ class CreateComputerMutation(graphene.Mutation):
                 hardware_info=input.hardwareInfo or {},
                 network_info=input.networkInfo or {}
             )
+            computer.refresh_fingerprints()
+            computer.save()
+            update_fleet_statistics((), fleet_counters(computer))
+            record_changes(computer, {
+                'hardware_info': computer.hardware_info,
+                'network_info': computer.network_info,
+            }, computer.created_at, created=True)
             
             # Créer un log
             InventoryLog.log_scan(
@@ -127,8 +338,9 @@ class UpdateComputerMutation(graphene.Mutation):
     
     def mutate(self, info, id, input):
         try:
-            # Récupérer l'ordinateur
-            computer = Computer.objects.get(id=id)
+            # Récupérer l'ordinateur (sans charger les champs JSON)
+            computer = Computer.objects.defer(*Computer.FINGERPRINT_FIELDS).get(id=id)
+            counters = fleet_counters(computer)
             
             # Mettre à jour l'ordinateur
             computer.hostname = input.hostname
@@ -136,16 +348,29 @@ class UpdateComputerMutation(graphene.Mutation):
             computer.manufacturer = input.manufacturer or computer.manufacturer
             computer.model = input.model or computer.model
             computer.current_user = input.currentUser or computer.current_user
+            computer.last_seen = timezone.now()
+            update_fields = [
+                'hostname', 'serial_number', 'manufacturer', 'model',
+                'current_user', 'last_seen', 'updated_at'
+            ]
             
+            # Les champs JSON ne sont réécrits que si leur contenu a changé ;
+            # l'état précédent du matériel et du réseau est historisé
+            record_changes(computer, {
+                field: value for field, value in (
+                    ('hardware_info', input.hardwareInfo),
+                    ('network_info', input.networkInfo),
+                ) if value
+            }, computer.last_seen)
             if input.systemInfo:
-                computer.system_info = input.systemInfo
+                update_fields += computer.update_section('system_info', input.systemInfo)
             if input.hardwareInfo:
-                computer.hardware_info = input.hardwareInfo
+                update_fields += computer.update_section('hardware_info', input.hardwareInfo)
             if input.networkInfo:
-                computer.network_info = input.networkInfo
+                update_fields += computer.update_section('network_info', input.networkInfo)
             
-            computer.update_last_seen()
-            computer.save()
+            computer.save(update_fields=update_fields)
+            update_fleet_statistics(counters, fleet_counters(computer))
             
             # Créer un log
             InventoryLog.log_scan(
@@ -234,8 +459,8 @@ class UpdateSoftwareMutation(graphene.Mutation):
     
     def mutate(self, info, id, input):
         try:
-            # Récupérer le logiciel
-            software = Software.objects.get(id=id)
+            # Récupérer le logiciel (y compris désinstallé)
+            software = Software.all_objects.get(id=id)
             
             # Mettre à jour le logiciel
             software.name = input.name
@@ -246,7 +471,8 @@ class UpdateSoftwareMutation(graphene.Mutation):
             software.uninstall_string = input.uninstallString or software.uninstall_string
             software.source = input.source or software.source
             software.detection_date = input.detectionDate or timezone.now()
-            software.save()
+            # Catalogue, historique, présence, installations et vulnérabilités suivent la modification
+            save_software(software)
             
             return UpdateSoftwareMutation(
                 software=software,
@@ -273,69 +499,286 @@ class BulkCreateSoftwareMutation(graphene.Mutation):
     class Arguments:
         computer_id = graphene.Int(required=True)
         items = graphene.List(SoftwareItemInput, required=True)
+        # Liste complète : les logiciels absents sont désactivés
+        complete = graphene.Boolean(default_value=False)
 
     created = graphene.Int()
     updated = graphene.Int()
+    deactivated = graphene.Int()
     success = graphene.Boolean()
     errors = graphene.List(graphene.String)
 
-    def mutate(self, info, computer_id, items):
+    def mutate(self, info, computer_id, items, complete=False):
         try:
             computer = Computer.objects.get(id=computer_id)
         except Computer.DoesNotExist:
-            return BulkCreateSoftwareMutation(created=0, updated=0, success=False, errors=["Ordinateur non trouvé"]) 
-
-        created_count = 0
-        updated_count = 0
-        errors = []
-
-        for it in items:
-            try:
-                data = {
-                    'name': (it.name or 'Unknown')[:255],
-                    'version': (it.version or 'Unknown')[:100],
-                    'publisher': (it.publisher or 'Unknown')[:255],
-                    'install_date': it.installDate or 'Unknown',
-                    'install_location': (it.installLocation or '')[:512],
-                    'uninstall_string': it.uninstallString or '',
-                    'source': (it.source or '')[:50],
-                    'detection_date': it.detectionDate or timezone.now(),
-                }
-                _, created = Software.get_or_create_software(computer, data)
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
-            except Exception as e:
-                errors.append(str(e))
+            return BulkCreateSoftwareMutation(created=0, updated=0, deactivated=0, success=False, errors=["Ordinateur non trouvé"]) 
+
+        try:
+            result = ingest_software(computer, items, complete=complete)
+        except Exception as e:
+            return BulkCreateSoftwareMutation(created=0, updated=0, deactivated=0, success=False, errors=[str(e)])
 
         return BulkCreateSoftwareMutation(
-            created=created_count,
-            updated=updated_count,
-            success=(len(errors) == 0),
-            errors=errors
+            created=len(result.created),
+            updated=len(result.updated),
+            deactivated=len(result.deactivated_ids),
+            success=True,
+            errors=[]
+        )
+
+
+class SyncInventoryMutation(graphene.Mutation):
+    """Mutation pour synchroniser un inventaire complet (ordinateur + logiciels) en un seul appel"""
+
+    class Arguments:
+        input = ComputerInput(required=True)
+        software = graphene.List(graphene.NonNull(SoftwareItemInput))
+
+    computer_id = graphene.ID()
+    created = graphene.Boolean()
+    software_created = graphene.Int()
+    software_updated = graphene.Int()
+    software_deactivated = graphene.Int()
+    unchanged = graphene.Boolean()
+    # Vrai si l'inventaire a été mis en file d'attente (traitement différé)
+    queued = graphene.Boolean()
+    success = graphene.Boolean()
+    errors = graphene.List(graphene.String)
+
+    def mutate(self, info, input, software=None):
+        try:
+            if getattr(settings, 'INVENTORY_INGEST_MODE', 'sync') == 'spool':
+                enqueue_inventory(input, software)
+                return SyncInventoryMutation(queued=True, success=True, errors=[])
+
+            result = ingest_inventory(input, software)
+        except Exception as e:
+            return SyncInventoryMutation(success=False, errors=[str(e)])
+
+        return SyncInventoryMutation(
+            computer_id=result.computer.id,
+            created=result.created,
+            software_created=result.software_created,
+            software_updated=result.software_updated,
+            software_deactivated=result.software_deactivated,
+            unchanged=result.unchanged,
+            queued=False,
+            success=True,
+            errors=[]
         )
 
 
+class TouchInventoryMutation(graphene.Mutation):
+    """Mutation légère : met à jour last_seen si les empreintes n'ont pas changé"""
+
+    class Arguments:
+        serial_number = graphene.String(required=True)
+        fingerprints = FingerprintInput(required=True)
+
+    matched = graphene.Boolean()
+    success = graphene.Boolean()
+    errors = graphene.List(graphene.String)
+
+    def mutate(self, info, serial_number, fingerprints):
+        try:
+            matched = touch_inventory(serial_number, {
+                'system_hash': fingerprints.systemHash,
+                'hardware_hash': fingerprints.hardwareHash,
+                'network_hash': fingerprints.networkHash,
+                'software_hash': fingerprints.softwareHash,
+            })
+        except Exception as e:
+            return TouchInventoryMutation(matched=False, success=False, errors=[str(e)])
+
+        return TouchInventoryMutation(matched=matched, success=True, errors=[])
+
+
+# Nombre maximal de périodes retournées par softwareChanges
+HISTORY_MAX_RESULTS = 10000
+
+# Nombre maximal de résultats par section d'une recherche
+SEARCH_MAX_RESULTS = 100
+
+# Nombre maximal d'ordinateurs listés par compliance
+COMPLIANCE_MAX_RESULTS = 10000
+
+# Tri des connexions, terminé par une colonne unique pour un ordre total
+COMPUTER_CONNECTION_ORDERING = ['id']
+SOFTWARE_CONNECTION_ORDERING = ['id']
+LOG_CONNECTION_ORDERING = ['-created_at', '-id']
+FINDING_CONNECTION_ORDERING = ['-id']
+ROLLUP_CONNECTION_ORDERING = ['-install_count', 'id']
+
+# Niveaux de softwareRollupConnection : total par produit ou détail par version
+ROLLUP_LEVELS = ('product', 'version')
+
+LEGACY_LIST_DEPRECATION = "Liste non paginée : utiliser {}"
+
+# Nombre maximal d'éléments des listes non paginées (argument `limit`)
+DEFAULT_LIST_MAX_RESULTS = 1000
+
+
+def legacy_list_limit(limit):
+    """Nombre d'éléments d'une liste non paginée, borné par GRAPHQL_LIST_MAX_RESULTS"""
+    maximum = getattr(settings, 'GRAPHQL_LIST_MAX_RESULTS', DEFAULT_LIST_MAX_RESULTS)
+    return maximum if limit is None else max(0, min(limit, maximum))
+
+# Arguments de softwareConnection -> filtres de SoftwareFilter
+SOFTWARE_VERSION_ARGUMENTS = {
+    'version_lt': 'version__lt',
+    'version_lte': 'version__lte',
+    'version_gt': 'version__gt',
+    'version_gte': 'version__gte',
+}
+
+
+def software_filter_data(arguments):
+    """Données de SoftwareFilter (ou SoftwareRollupFilter) pour les arguments de softwareConnection"""
+    data = {SOFTWARE_VERSION_ARGUMENTS.get(name, name): value for name, value in arguments.items()}
+    between = data.pop('version_between', None)
+    if between is not None:
+        data['version__between'] = ','.join(between)
+    return data
+
+
 class Query(graphene.ObjectType):
     """Queries GraphQL"""
     
     # Queries pour les ordinateurs
-    all_computers = graphene.List(ComputerType)
+    all_computers = graphene.List(
+        ComputerType, limit=graphene.Int(), deprecation_reason=LEGACY_LIST_DEPRECATION.format('computerConnection')
+    )
+    computer_connection = graphene.relay.ConnectionField(
+        ComputerConnection,
+        hostname=graphene.String(),
+        manufacturer=graphene.String(),
+        model=graphene.String(),
+        current_user=graphene.String(),
+        is_active=graphene.Boolean(),
+        last_seen_after=graphene.DateTime(),
+        last_seen_before=graphene.DateTime(),
+        search=graphene.String()
+    )
     computer = graphene.Field(ComputerType, id=graphene.ID())
     computer_by_serial = graphene.Field(ComputerType, serial_number=graphene.String())
+    computer_fingerprint = graphene.Field(ComputerFingerprintType, serial_number=graphene.String(required=True))
+    
+    # Queries pour l'historique du matériel et du réseau
+    computer_snapshot = graphene.Field(
+        ComputerSectionStateType,
+        computer_id=graphene.Int(required=True),
+        section=graphene.String(required=True),
+        at=graphene.DateTime()
+    )
+    computer_snapshots = graphene.List(
+        ComputerSnapshotType,
+        computer_id=graphene.Int(required=True),
+        section=graphene.String()
+    )
     
     # Queries pour les logiciels
-    all_software = graphene.List(SoftwareType)
+    all_software = graphene.List(
+        SoftwareType, limit=graphene.Int(), deprecation_reason=LEGACY_LIST_DEPRECATION.format('softwareConnection')
+    )
+    software_connection = graphene.relay.ConnectionField(
+        SoftwareConnection,
+        computer_id=graphene.Int(),
+        product_id=graphene.Int(),
+        name=graphene.String(),
+        publisher=graphene.String(),
+        include_inactive=graphene.Boolean(default_value=False),
+        version_lt=graphene.String(),
+        version_lte=graphene.String(),
+        version_gt=graphene.String(),
+        version_gte=graphene.String(),
+        version_between=graphene.List(graphene.String)
+    )
     software = graphene.Field(SoftwareType, id=graphene.ID())
     computer_software = graphene.List(SoftwareType, computer_id=graphene.Int())
     
+    # Queries pour le catalogue
+    software_products = graphene.List(SoftwareProductType, name=graphene.String())
+    computers_with_product = graphene.List(
+        ComputerType,
+        product_id=graphene.Int(required=True),
+        version_id=graphene.Int()
+    )
+    
+    # Nombres d'installations pré-calculés, du plus installé au moins installé
+    software_rollup_connection = graphene.relay.ConnectionField(
+        SoftwareRollupConnection,
+        level=graphene.String(default_value='product'),
+        product_id=graphene.Int(),
+        name=graphene.String(),
+        publisher=graphene.String(),
+        min_count=graphene.Int(),
+        version_lt=graphene.String(),
+        version_lte=graphene.String(),
+        version_gt=graphene.String(),
+        version_gte=graphene.String(),
+        version_between=graphene.List(graphene.String)
+    )
+    
+    # Queries pour l'historique des installations
+    software_as_of = graphene.List(
+        SoftwareInstallHistoryType,
+        computer_id=graphene.Int(required=True),
+        at=graphene.DateTime(required=True)
+    )
+    software_changes = graphene.List(
+        SoftwareInstallHistoryType,
+        since=graphene.DateTime(required=True),
+        until=graphene.DateTime(),
+        computer_id=graphene.Int(),
+        limit=graphene.Int(default_value=1000)
+    )
+    
+    # Recherche plein texte (ordinateurs, catalogue)
+    search = graphene.Field(
+        SearchResultsType,
+        query=graphene.String(required=True),
+        limit=graphene.Int(default_value=20)
+    )
+    
+    # Conformité du parc (index de présence des logiciels)
+    compliance = graphene.Field(
+        ComplianceResultType,
+        expression=graphene.String(required=True),
+        limit=graphene.Int(default_value=100)
+    )
+    
+    # Vulnérabilités (catalogue local) et logiciels vulnérables
+    vulnerability = graphene.Field(VulnerabilityType, identifier=graphene.String(required=True))
+    vulnerability_finding_connection = graphene.relay.ConnectionField(
+        VulnerabilityFindingConnection,
+        computer_id=graphene.Int(),
+        product_id=graphene.Int(),
+        vulnerability=graphene.String(),
+        severity=graphene.String()
+    )
+    
     # Queries pour les logs
-    all_logs = graphene.List(InventoryLogType)
+    all_logs = graphene.List(
+        InventoryLogType, limit=graphene.Int(), deprecation_reason=LEGACY_LIST_DEPRECATION.format('logConnection')
+    )
+    log_connection = graphene.relay.ConnectionField(
+        InventoryLogConnection,
+        computer_id=graphene.Int(),
+        log_type=graphene.String(),
+        since=graphene.DateTime(),
+        until=graphene.DateTime()
+    )
     computer_logs = graphene.List(InventoryLogType, computer_id=graphene.Int())
     
-    def resolve_all_computers(self, info):
-        return Computer.objects.all()
+    def resolve_all_computers(self, info, limit=None):
+        return get_loaders(info).queue_computers(Computer.objects.all()[:legacy_list_limit(limit)])
+    
+    def resolve_computer_connection(self, info, first=None, after=None, last=None, before=None, **filters):
+        queryset = ComputerFilter(data=filters, queryset=Computer.objects.all()).qs
+        page = keyset_page(queryset, COMPUTER_CONNECTION_ORDERING, first, after, last, before)
+        get_loaders(info).queue_computers(page.rows)
+        return build_connection(ComputerConnection, page)
     
     def resolve_computer(self, info, id):
         return Computer.objects.get(id=id)
@@ -343,20 +786,134 @@ class Query(graphene.ObjectType):
     def resolve_computer_by_serial(self, info, serial_number):
         return Computer.objects.get(serial_number=serial_number)
     
-    def resolve_all_software(self, info):
-        return Software.objects.all()
+    def resolve_computer_fingerprint(self, info, serial_number):
+        fingerprint = Computer.objects.filter(serial_number=serial_number).values(
+            'id', 'serial_number', 'system_hash', 'hardware_hash',
+            'network_hash', 'software_hash', 'last_seen'
+        ).first()
+        return ComputerFingerprintType(**fingerprint) if fingerprint else None
+    
+    def resolve_all_software(self, info, limit=None):
+        return get_loaders(info).queue_software(Software.objects.all()[:legacy_list_limit(limit)])
+    
+    def resolve_software_connection(self, info, first=None, after=None, last=None, before=None,
+                                    computer_id=None, include_inactive=False, **filters):
+        queryset = Software.all_objects.all() if include_inactive else Software.objects.all()
+        if computer_id:
+            queryset = queryset.filter(computer_id=computer_id)
+        filterset = SoftwareFilter(data=software_filter_data(filters), queryset=queryset)
+        if not filterset.is_valid():
+            raise ValueError('; '.join(
+                f"{field} : {' '.join(errors)}" for field, errors in filterset.errors.items()
+            ))
+        page = keyset_page(filterset.qs, SOFTWARE_CONNECTION_ORDERING, first, after, last, before)
+        get_loaders(info).queue_software(page.rows)
+        return build_connection(SoftwareConnection, page)
+    
+    def resolve_software_rollup_connection(self, info, first=None, after=None, last=None, before=None,
+                                           level='product', **filters):
+        if level not in ROLLUP_LEVELS:
+            raise ValueError(f"Niveau inconnu : {level} ({', '.join(ROLLUP_LEVELS)})")
+        queryset = SoftwareRollup.objects.filter(
+            version__isnull=level == 'product', install_count__gt=0
+        ).select_related('product', 'version')
+        filterset = SoftwareRollupFilter(data=software_filter_data(filters), queryset=queryset)
+        if not filterset.is_valid():
+            raise ValueError('; '.join(
+                f"{field} : {' '.join(errors)}" for field, errors in filterset.errors.items()
+            ))
+        page = keyset_page(filterset.qs, ROLLUP_CONNECTION_ORDERING, first, after, last, before)
+        return build_connection(SoftwareRollupConnection, page)
     
     def resolve_software(self, info, id):
         return Software.objects.get(id=id)
     
     def resolve_computer_software(self, info, computer_id):
-        return Software.objects.filter(computer_id=computer_id)
+        return get_loaders(info).queue_software(Software.objects.filter(computer_id=computer_id))
+    
+    def resolve_software_products(self, info, name=None):
+        queryset = SoftwareProduct.objects.all()
+        if name:
+            queryset = queryset.filter(name__istartswith=name)
+        return queryset
+    
+    def resolve_computers_with_product(self, info, product_id, version_id=None):
+        installations = Software.objects.filter(product_id=product_id)
+        if version_id:
+            installations = installations.filter(product_version_id=version_id)
+        return get_loaders(info).queue_computers(
+            Computer.objects.filter(id__in=installations.values('computer_id'))
+        )
+    
+    def resolve_computer_snapshot(self, info, computer_id, section, at=None):
+        data, recorded_at = reconstruct(computer_id, section, at)
+        if recorded_at is None:
+            return None
+        return ComputerSectionStateType(section=section, recorded_at=recorded_at, data=data)
+    
+    def resolve_computer_snapshots(self, info, computer_id, section=None):
+        queryset = ComputerSnapshot.objects.filter(computer_id=computer_id)
+        if section:
+            queryset = queryset.filter(section=section)
+        return queryset.order_by('-created_at', '-sequence')
+    
+    def resolve_software_as_of(self, info, computer_id, at):
+        return software_as_of(computer_id, at)
+    
+    def resolve_software_changes(self, info, since, until=None, computer_id=None, limit=1000):
+        return software_changes(since, until, computer_id)[:min(limit, HISTORY_MAX_RESULTS)]
+    
+    def resolve_search(self, info, query, limit=20):
+        return search(query, max(1, min(limit, SEARCH_MAX_RESULTS)))
+    
+    def resolve_compliance(self, info, expression, limit=100):
+        result = evaluate(expression)
+        ids = bitmap_ids(result, max(0, min(limit, COMPLIANCE_MAX_RESULTS)))
+        return ComplianceResultType(
+            expression=expression,
+            count=result.bit_count(),
+            computers=get_loaders(info).queue_computers(Computer.objects.filter(id__in=ids).order_by('id')),
+        )
+    
+    def resolve_vulnerability(self, info, identifier):
+        return Vulnerability.objects.filter(identifier=identifier).first()
+    
+    def resolve_vulnerability_finding_connection(self, info, first=None, after=None, last=None, before=None,
+                                                 computer_id=None, product_id=None, vulnerability=None,
+                                                 severity=None):
+        queryset = VulnerabilityFinding.objects.select_related('vulnerability', 'software', 'product')
+        if computer_id:
+            queryset = queryset.filter(computer_id=computer_id)
+        if product_id:
+            queryset = queryset.filter(product_id=product_id)
+        if vulnerability:
+            queryset = queryset.filter(vulnerability__identifier=vulnerability)
+        if severity:
+            queryset = queryset.filter(vulnerability__severity=severity)
+        page = keyset_page(queryset, FINDING_CONNECTION_ORDERING, first, after, last, before)
+        get_loaders(info).queue_findings(page.rows)
+        return build_connection(VulnerabilityFindingConnection, page)
+    
+    def resolve_all_logs(self, info, limit=None):
+        return get_loaders(info).queue_logs(InventoryLog.objects.all()[:legacy_list_limit(limit)])
     
-    def resolve_all_logs(self, info):
-        return InventoryLog.objects.all()
+    def resolve_log_connection(self, info, first=None, after=None, last=None, before=None,
+                               computer_id=None, log_type=None, since=None, until=None):
+        queryset = InventoryLog.objects.all()
+        if computer_id:
+            queryset = queryset.filter(computer_id=computer_id)
+        if log_type:
+            queryset = queryset.filter(log_type=log_type)
+        if since:
+            queryset = queryset.filter(created_at__gte=since)
+        if until:
+            queryset = queryset.filter(created_at__lt=until)
+        page = keyset_page(queryset, LOG_CONNECTION_ORDERING, first, after, last, before)
+        get_loaders(info).queue_logs(page.rows)
+        return build_connection(InventoryLogConnection, page)
     
     def resolve_computer_logs(self, info, computer_id):
-        return InventoryLog.objects.filter(computer_id=computer_id)
+        return get_loaders(info).queue_logs(InventoryLog.objects.filter(computer_id=computer_id))
 
 
 class Mutation(graphene.ObjectType):
@@ -367,6 +924,8 @@ class Mutation(graphene.ObjectType):
     create_software = CreateSoftwareMutation.Field()
     update_software = UpdateSoftwareMutation.Field()
     bulk_create_software = BulkCreateSoftwareMutation.Field()
+    sync_inventory = SyncInventoryMutation.Field()
+    touch_inventory = TouchInventoryMutation.Field()
 
 
 # Créer le schéma
@@ -0,0 +1,257 @@
+"""
+Recherche plein texte sur les ordinateurs et le catalogue des logiciels
+
+Sous SQLite, un index FTS5 à trigrammes (table `inventory_search`, créée par
+la migration 0012) contient un document par ordinateur (nom d'hôte ; numéro
+de série, utilisateur, fabricant, modèle) et un document par produit du
+catalogue (nom ; éditeur). Une recherche de sous-chaîne (« anydesk »)
+devient une recherche dans l'index, classée par bm25, au lieu d'un
+LIKE '%x%' sur toute la table.
+
+Les logiciels ne sont pas indexés ligne par ligne : les produits trouvés
+sont résolus en ordinateurs par l'index de `Software.product`.
+
+L'index est mis à jour à l'enregistrement et à la suppression d'un
+ordinateur, et à la création d'un produit du catalogue. Sans FTS5 (autre
+base de données, SQLite trop ancien) ou pour un terme de moins de trois
+caractères, la recherche se replie sur des filtres icontains (servis sous
+PostgreSQL par des index pg_trgm).
+"""
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Computer, Software, SoftwareProduct
+
+SEARCH_TABLE = 'inventory_search'
+
+# Longueur minimale d'un terme servi par l'index à trigrammes
+MIN_TERM_LENGTH = 3
+
+# Poids bm25 des colonnes title et body
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+# Nombre maximal de lignes classées en Python lorsque l'index est indisponible
+MAX_MATCHES = 10000
+
+# Champs d'un ordinateur présents dans l'index
+COMPUTER_SEARCH_FIELDS = ['hostname', 'serial_number', 'current_user', 'manufacturer', 'model']
+PRODUCT_SEARCH_FIELDS = ['name', 'publisher']
+
+# Type de document -> parité du rowid (ordinateur : 2 × id, produit : 2 × id + 1)
+COMPUTER = 0
+PRODUCT = 1
+
+_available = {}
+
+
+def search_index_available():
+    """Vrai si l'index FTS5 existe sur la base courante"""
+    alias = connection.alias
+    if alias not in _available:
+        _available[alias] = (
+            connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _available[alias]
+
+
+def document_rowid(kind, object_id):
+    return object_id * 2 + kind
+
+
+def search_terms(query):
+    return [term for term in (query or '').split() if term]
+
+
+def match_expression(terms):
+    """Expression MATCH : chaque terme est une sous-chaîne recherchée (ET implicite)"""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def computer_document(computer):
+    return (
+        computer.hostname,
+        ' '.join([computer.serial_number, computer.current_user, computer.manufacturer, computer.model]),
+    )
+
+
+def index_computer(computer):
+    """(Ré)indexe un ordinateur"""
+    if not search_index_available():
+        return
+    rowid = document_rowid(COMPUTER, computer.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+            [rowid, *computer_document(computer)]
+        )
+
+
+def remove_computer(computer_id):
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [document_rowid(COMPUTER, computer_id)])
+
+
+def index_products(product_ids):
+    """Indexe les produits du catalogue qui ne le sont pas encore (les produits ne sont jamais modifiés)"""
+    product_ids = list(product_ids)
+    if not product_ids or not search_index_available():
+        return
+    rowids = [document_rowid(PRODUCT, product_id) for product_id in product_ids]
+    with connection.cursor() as cursor:
+        placeholders = ', '.join(['%s'] * len(rowids))
+        cursor.execute(f'SELECT rowid FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', rowids)
+        indexed = {row[0] for row in cursor.fetchall()}
+        rows = [
+            (document_rowid(PRODUCT, product_id), name, publisher)
+            for product_id, name, publisher in SoftwareProduct.objects.filter(id__in=product_ids).values_list(
+                'id', 'name', 'publisher'
+            )
+            if document_rowid(PRODUCT, product_id) not in indexed
+        ]
+        if rows:
+            cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+
+def rebuild_search_index():
+    """Reconstruit entièrement l'index, retourne le nombre de documents"""
+    if not search_index_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) "
+            f"SELECT id * 2, hostname, serial_number || ' ' || current_user || ' ' || manufacturer || ' ' || model "
+            f"FROM {Computer._meta.db_table}"
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) "
+            f"SELECT id * 2 + 1, name, publisher FROM {SoftwareProduct._meta.db_table}"
+        )
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+@receiver(post_save, sender=Computer)
+def computer_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or set(update_fields) & set(COMPUTER_SEARCH_FIELDS):
+        index_computer(instance)
+
+
+@receiver(post_delete, sender=Computer)
+def computer_deleted(sender, instance, **kwargs):
+    remove_computer(instance.pk)
+
+
+def ranked_ids(kind, terms, limit):
+    """[(id, score)] des documents d'un type, du plus pertinent au moins pertinent"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({SEARCH_TABLE}, %s, %s) AS score FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid %% 2 = %s ORDER BY score LIMIT %s',
+            [TITLE_WEIGHT, BODY_WEIGHT, match_expression(terms), kind, limit]
+        )
+        # bm25 est négatif : plus il est bas, plus le document est pertinent
+        return [(rowid // 2, round(-score, 4)) for rowid, score in cursor.fetchall()]
+
+
+def contains_filter(fields, terms):
+    condition = Q()
+    for term in terms:
+        term_condition = Q()
+        for field in fields:
+            term_condition |= Q(**{f'{field}__icontains': term})
+        condition &= term_condition
+    return condition
+
+
+def fallback_score(title, terms):
+    """Classement sans index : titre égal, puis préfixe, puis contenant les termes"""
+    title = title.lower()
+    score = 0.0
+    for term in terms:
+        term = term.lower()
+        if title == term:
+            score += 3
+        elif title.startswith(term):
+            score += 2
+        elif term in title:
+            score += 1
+    return score
+
+
+def use_index(terms):
+    return search_index_available() and all(len(term) >= MIN_TERM_LENGTH for term in terms)
+
+
+def ranked_rows(queryset, kind, fields, title_field, terms, limit):
+    """Lignes values() correspondant aux termes, classées, avec leur score"""
+    if use_index(terms):
+        scores = dict(ranked_ids(kind, terms, limit))
+        rows = {row['id']: row for row in queryset.filter(id__in=scores).values('id', *fields)}
+        return [{**rows[object_id], 'score': score} for object_id, score in scores.items() if object_id in rows]
+
+    rows = [
+        {**row, 'score': fallback_score(row[title_field], terms)}
+        for row in queryset.filter(contains_filter(fields, terms)).values('id', *fields)[:MAX_MATCHES]
+    ]
+    rows.sort(key=lambda row: (-row['score'], row[title_field]))
+    return rows[:limit]
+
+
+def search_computers(query, limit=20):
+    """Ordinateurs dont le nom, le numéro de série, l'utilisateur, le fabricant ou le modèle contient la requête"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    return ranked_rows(Computer.objects.all(), COMPUTER, COMPUTER_SEARCH_FIELDS, 'hostname', terms, limit)
+
+
+def search_products(query, limit=20):
+    """Produits du catalogue dont le nom ou l'éditeur contient la requête"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    return ranked_rows(SoftwareProduct.objects.all(), PRODUCT, PRODUCT_SEARCH_FIELDS, 'name', terms, limit)
+
+
+def matching_computer_ids(query):
+    """Identifiants (non classés) des ordinateurs correspondant à la requête, pour les filtres"""
+    terms = search_terms(query)
+    if not terms:
+        return Computer.objects.values('id')
+    if use_index(terms):
+        # Sous-requête non bornée : toutes les correspondances, sans liste de paramètres
+        return RawSQL(
+            f'SELECT rowid / 2 FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND rowid %% 2 = %s',
+            [match_expression(terms), COMPUTER]
+        )
+    return Computer.objects.filter(contains_filter(COMPUTER_SEARCH_FIELDS, terms)).values('id')
+
+
+def computers_with_products(product_ids, limit=100):
+    """Ordinateurs sur lesquels au moins un des produits est installé"""
+    installations = Software.objects.filter(product_id__in=product_ids).values('computer_id')
+    return list(
+        Computer.objects.filter(id__in=installations)
+        .order_by('hostname')
+        .values('id', 'hostname', 'serial_number', 'current_user')[:limit]
+    )
+
+
+def search(query, limit=20):
+    """Ordinateurs et produits correspondant à la requête, et ordinateurs ayant ces produits"""
+    products = search_products(query, limit)
+    return {
+        'query': query,
+        'computers': search_computers(query, limit),
+        'products': products,
+        'installed_on': computers_with_products([product['id'] for product in products], limit),
+    }
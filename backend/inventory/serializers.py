@@ -0,0 +1,157 @@
+"""
+Sérialiseurs de l'API REST
+
+Les listes sont lues avec values() : seules les colonnes demandées sont
+sélectionnées et aucune instance de modèle n'est construite. Les gros champs
+(JSON, commande de désinstallation) ne sont retournés que sur demande, avec
+`expand=` (ajoutés aux colonnes par défaut) ou `fields=` (liste exacte des
+colonnes). Le détail d'un objet utilise un ModelSerializer complet.
+"""
+
+from rest_framework import serializers
+
+from .models import Computer, Software, InventoryLog, Vulnerability, VulnerableRange
+
+
+def split_param(value):
+    """Liste d'un paramètre « a,b,c »"""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Sérialiseur de lignes values() en lecture seule.
+
+    Les lignes sont déjà projetées sur les colonnes voulues : elles sont
+    retournées telles quelles, le rendu JSON se charge des dates.
+    """
+
+    # Colonnes retournées par défaut
+    default_fields = []
+    # Colonnes disponibles uniquement via `fields=`
+    extra_fields = []
+    # Gros champs, disponibles via `expand=` ou `fields=`
+    expandable_fields = []
+
+    @classmethod
+    def selected_fields(cls, query_params, required=('id',)):
+        """
+        Colonnes à lire selon `fields=` et `expand=`, ValidationError si
+        inconnues. Les colonnes `required` (clé, tri) sont toujours incluses.
+        """
+        requested = split_param(query_params.get('fields'))
+        expand = split_param(query_params.get('expand'))
+        allowed = set(cls.default_fields) | set(cls.extra_fields) | set(cls.expandable_fields)
+        unknown = [field for field in requested if field not in allowed]
+        unknown += [field for field in expand if field not in cls.expandable_fields]
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Champs inconnus : {', '.join(unknown)}"})
+
+        fields = requested or list(cls.default_fields)
+        fields += [field for field in expand if field not in fields]
+        return [field for field in required if field not in fields] + fields
+
+    def to_representation(self, row):
+        return row
+
+
+class ComputerListSerializer(ValuesSerializer):
+    default_fields = [
+        'id', 'hostname', 'serial_number', 'manufacturer', 'model', 'current_user',
+        'last_seen', 'is_active', 'created_at', 'updated_at',
+    ]
+    extra_fields = ['system_hash', 'hardware_hash', 'network_hash', 'software_hash']
+    expandable_fields = ['system_info', 'hardware_info', 'network_info']
+
+
+class ComputerSerializer(serializers.ModelSerializer):
+    """Détail d'un ordinateur ; les empreintes sont recalculées à l'enregistrement"""
+
+    class Meta:
+        model = Computer
+        fields = '__all__'
+        read_only_fields = [
+            'system_hash', 'hardware_hash', 'network_hash', 'software_hash', 'created_at', 'updated_at',
+        ]
+
+    def create(self, validated_data):
+        computer = Computer(**validated_data)
+        computer.refresh_fingerprints()
+        computer.save()
+        return computer
+
+    def update(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.refresh_fingerprints()
+        instance.save()
+        return instance
+
+
+class SoftwareListSerializer(ValuesSerializer):
+    default_fields = [
+        'id', 'computer_id', 'name', 'version', 'publisher', 'install_date', 'install_location',
+        'source', 'detection_date', 'is_active',
+    ]
+    extra_fields = [
+        'product_id', 'product_version_id', 'version_key', 'canonical_name', 'canonical_publisher', 'created_at',
+        'updated_at',
+    ]
+    expandable_fields = ['uninstall_string']
+
+
+class SoftwareSerializer(serializers.ModelSerializer):
+    """Détail d'un logiciel"""
+
+    class Meta:
+        model = Software
+        fields = '__all__'
+        read_only_fields = ['product', 'product_version', 'created_at', 'updated_at']
+
+
+class InventoryLogListSerializer(ValuesSerializer):
+    default_fields = ['id', 'computer_id', 'log_type', 'message', 'created_at']
+    expandable_fields = ['details']
+
+
+class InventoryLogSerializer(serializers.ModelSerializer):
+    """Détail d'un log"""
+
+    class Meta:
+        model = InventoryLog
+        fields = '__all__'
+
+
+class VulnerabilityListSerializer(ValuesSerializer):
+    default_fields = ['id', 'identifier', 'severity', 'cvss', 'published_at', 'imported_at']
+    expandable_fields = ['summary']
+
+
+class VulnerableRangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VulnerableRange
+        fields = ['product_name', 'publisher', 'version_start', 'start_inclusive', 'version_end', 'end_inclusive']
+
+
+class VulnerabilitySerializer(serializers.ModelSerializer):
+    """Détail d'une vulnérabilité avec ses intervalles de versions affectées"""
+    
+    ranges = VulnerableRangeSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Vulnerability
+        fields = '__all__'
+
+
+class VulnerabilityFindingListSerializer(ValuesSerializer):
+    # identifier, severity et hostname sont annotés par la vue
+    default_fields = [
+        'id', 'computer_id', 'hostname', 'software_id', 'product_id', 'version',
+        'vulnerability_id', 'identifier', 'severity', 'detected_at',
+    ]
+
+
+class SoftwareRollupListSerializer(ValuesSerializer):
+    # name, publisher, version_number et version_key sont annotés par la vue (vides pour un total de produit)
+    default_fields = ['id', 'product_id', 'version_id', 'name', 'publisher', 'version_number', 'install_count']
+    extra_fields = ['version_key', 'updated_at']
@@ -0,0 +1,134 @@
+"""
+Historique compressé des sections matériel/réseau des ordinateurs
+
+Chaque modification d'une section est enregistrée dans ComputerSnapshot sous
+forme de différence de type JSON Patch (RFC 6902 : opérations add, remove,
+replace) avec l'état précédent. Une image complète est stockée toutes les
+INVENTORY_SNAPSHOT_KEYFRAME_INTERVAL modifications pour borner le coût de
+reconstruction.
+"""
+
+import copy
+
+from django.conf import settings
+
+from .models import ComputerSnapshot
+
+
+def _escape(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def diff(old, new, path=''):
+    """Calcule les opérations transformant `old` en `new`"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in sorted(old.keys() - new.keys(), key=str):
+            ops.append({'op': 'remove', 'path': f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                ops += diff(old[key], value, child)
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            ops += diff(old_item, new_item, f"{path}/{index}")
+        return ops
+
+    if type(old) is type(new) and old == new:
+        return []
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def apply_patch(document, ops):
+    """Applique des opérations calculées par `diff` et retourne le nouveau document"""
+    document = copy.deepcopy(document)
+    for op in ops:
+        tokens = [_unescape(token) for token in op['path'].split('/')[1:]]
+        if not tokens:
+            document = copy.deepcopy(op.get('value'))
+            continue
+
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        key = int(tokens[-1]) if isinstance(parent, list) else tokens[-1]
+
+        if op['op'] == 'remove':
+            del parent[key]
+        else:
+            parent[key] = copy.deepcopy(op['value'])
+    return document
+
+
+def record_snapshot(computer, section, previous, current, now):
+    """Enregistre le nouvel état d'une section (image complète ou différence)"""
+    last = (
+        ComputerSnapshot.objects.filter(computer=computer, section=section)
+        .order_by('-sequence')
+        .values('sequence', 'base_sequence')
+        .first()
+    )
+    interval = getattr(settings, 'INVENTORY_SNAPSHOT_KEYFRAME_INTERVAL', 20)
+
+    if last is None or last['sequence'] + 1 - last['base_sequence'] >= interval:
+        sequence = last['sequence'] + 1 if last else 1
+        return ComputerSnapshot.objects.create(
+            computer=computer,
+            section=section,
+            sequence=sequence,
+            base_sequence=sequence,
+            is_keyframe=True,
+            data=current,
+            created_at=now,
+        )
+
+    return ComputerSnapshot.objects.create(
+        computer=computer,
+        section=section,
+        sequence=last['sequence'] + 1,
+        base_sequence=last['base_sequence'],
+        is_keyframe=False,
+        data=diff(previous or {}, current),
+        created_at=now,
+    )
+
+
+def reconstruct(computer_id, section, at=None):
+    """Reconstitue l'état d'une section à une date donnée (dernier état si None)"""
+    snapshots = ComputerSnapshot.objects.filter(computer_id=computer_id, section=section)
+    target = snapshots.filter(created_at__lte=at) if at is not None else snapshots
+    last = target.order_by('-sequence').values('sequence', 'base_sequence', 'created_at').first()
+    if last is None:
+        return None, None
+
+    state = {}
+    chain = snapshots.filter(
+        sequence__gte=last['base_sequence'], sequence__lte=last['sequence']
+    ).order_by('sequence').values_list('is_keyframe', 'data')
+    for is_keyframe, data in chain:
+        state = data if is_keyframe else apply_patch(state, data)
+    return state, last['created_at']
+
+
+def record_changes(computer, sections, now, created=False):
+    """
+    Enregistre les sections suivies de `sections` ({champ: valeur}) qui
+    diffèrent de celles stockées. À appeler avant `Computer.update_section`,
+    ou après l'enregistrement d'un nouvel ordinateur avec `created=True`.
+    """
+    for section, field in ComputerSnapshot.SECTION_FIELDS.items():
+        if field not in sections:
+            continue
+        if created:
+            record_snapshot(computer, section, None, sections[field], now)
+        elif computer.section_changed(field, sections[field]):
+            record_snapshot(computer, section, getattr(computer, field), sections[field], now)
@@ -0,0 +1,147 @@
+"""
+File d'attente d'ingestion : les inventaires sont enregistrés bruts à la
+réception puis traités par lots par `manage.py process_ingest_spool`
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import IngestSpool
+from .ingest import ingest_inventory
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_inventory(computer_data, software_items=None):
+    """Enregistre un inventaire reçu dans la file d'attente"""
+    serial_number = computer_data.get('serialNumber')
+    if not serial_number:
+        raise ValueError("Numéro de série manquant")
+
+    return IngestSpool.objects.create(
+        serial_number=serial_number,
+        payload={
+            'input': dict(computer_data),
+            'software': [dict(item) for item in software_items] if software_items is not None else None,
+        }
+    )
+
+
+def requeue_stale(timeout_minutes=10):
+    """Remet en attente les inventaires pris en charge par un worker qui ne les a pas terminés"""
+    return IngestSpool.objects.filter(
+        status='processing',
+        claimed_at__lt=timezone.now() - timedelta(minutes=timeout_minutes)
+    ).update(status='pending', worker='')
+
+
+def claim_batch(batch_size):
+    """
+    Réserve un lot d'inventaires en attente pour ce worker.
+
+    Le lot contient au plus `batch_size` numéros de série distincts, les plus
+    anciens d'abord ; tous les inventaires en attente d'un numéro sont
+    réservés ensemble, afin de pouvoir les fusionner. Un numéro de série dont
+    des inventaires sont en cours de traitement par un autre worker est
+    ignoré : un inventaire ancien ne peut pas être appliqué après un plus
+    récent. Retourne les inventaires groupés par numéro de série, du plus
+    ancien au plus récent.
+    """
+    busy = IngestSpool.objects.filter(status='processing').values('serial_number')
+    serials = [
+        row['serial_number']
+        for row in IngestSpool.objects.filter(status='pending').exclude(serial_number__in=busy)
+        .values('serial_number').annotate(first_received=Min('received_at')).order_by('first_received')[:batch_size]
+    ]
+    if not serials:
+        return {}
+
+    token = uuid.uuid4().hex
+    IngestSpool.objects.filter(status='pending', serial_number__in=serials).update(
+        status='processing', worker=token, claimed_at=timezone.now()
+    )
+    # Deux workers ont pu choisir le même numéro de série entre la sélection et
+    # la réservation : celui qui constate la réservation d'un autre la lui laisse
+    contested = set(
+        IngestSpool.objects.filter(status='processing', serial_number__in=serials)
+        .exclude(worker=token).values_list('serial_number', flat=True)
+    )
+    if contested:
+        IngestSpool.objects.filter(worker=token, status='processing', serial_number__in=contested).update(
+            status='pending', worker='', claimed_at=None
+        )
+
+    groups = {}
+    for entry in IngestSpool.objects.filter(worker=token, status='processing').order_by('received_at', 'id'):
+        groups.setdefault(entry.serial_number, []).append(entry)
+    return groups
+
+
+def coalesce(entries):
+    """
+    Fusionne les inventaires d'un même ordinateur.
+
+    Les données de l'ordinateur du plus récent sont retenues, avec la liste de
+    logiciels la plus récente disponible.
+    """
+    latest = entries[-1]
+    computer_data = latest.payload.get('input') or {}
+    software_items = None
+    for entry in reversed(entries):
+        if entry.payload.get('software') is not None:
+            software_items = entry.payload['software']
+            break
+    return computer_data, software_items
+
+
+def process_group(entries, max_attempts=3):
+    """Traite les inventaires réservés d'un même ordinateur, retourne le nombre d'inventaires fusionnés"""
+    close_old_connections()
+    latest = entries[-1]
+    superseded = [entry.id for entry in entries[:-1]]
+    now = timezone.now()
+
+    try:
+        computer_data, software_items = coalesce(entries)
+        ingest_inventory(computer_data, software_items, source='spool', seen_at=latest.received_at)
+    except Exception as e:
+        logger.exception(f"Échec du traitement de l'inventaire {latest.serial_number}")
+        attempts = latest.attempts + 1
+        IngestSpool.objects.filter(id__in=[entry.id for entry in entries]).update(
+            status='pending' if attempts < max_attempts else 'error',
+            worker='',
+            attempts=attempts,
+            error=str(e)
+        )
+        return 0
+
+    processed_at = timezone.now()
+    latency = processed_at - latest.received_at
+    IngestSpool.objects.filter(id=latest.id).update(
+        status='done',
+        processed_at=processed_at,
+        latency_ms=int(latency.total_seconds() * 1000),
+        error=''
+    )
+    if superseded:
+        IngestSpool.objects.filter(id__in=superseded).update(status='coalesced', processed_at=now)
+    return len(superseded)
+
+
+def purge_processed(older_than_hours=24, batch_size=1000):
+    """Supprime par lots les inventaires traités plus anciens que le délai donné"""
+    cutoff = timezone.now() - timedelta(hours=older_than_hours)
+    deleted = 0
+    while True:
+        ids = list(
+            IngestSpool.objects.filter(status__in=['done', 'coalesced'], processed_at__lt=cutoff)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IngestSpool.objects.filter(id__in=ids).delete()[0]
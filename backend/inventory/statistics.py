@@ -0,0 +1,205 @@
+"""
+Statistiques du parc maintenues au fil de l'eau
+
+Le dashboard lit des compteurs pré-calculés (FleetStatistic) au lieu de
+compter et de regrouper la table Computer à chaque appel. Chaque création,
+modification ou suppression d'un ordinateur applique la différence entre les
+compteurs de son état précédent et ceux de son nouvel état (+1 / -1).
+
+Les ordinateurs vus récemment sont comptés par jour (heure locale) de
+dernière vue : seul le premier scan de la journée d'un ordinateur modifie les
+compteurs, les suivants ne coûtent aucune écriture supplémentaire. La
+commande `reconcile_fleet_statistics` recalcule périodiquement tous les
+compteurs depuis la table Computer et regroupe les jours anciens.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Computer, FleetStatistic
+
+TOTAL = 'total'
+ACTIVE = 'active'
+MANUFACTURER = 'manufacturer'
+MODEL = 'model'
+LAST_SEEN_DAY = 'last_seen_day'
+
+# Jours de dernière vue antérieurs à la fenêtre du dashboard, regroupés par la réconciliation
+OLDER_DAYS_KEY = 'older'
+
+# Fenêtre des ordinateurs « vus récemment », en jours calendaires (aujourd'hui compris)
+RECENT_DAYS = 7
+
+# Nombre de fabricants et de modèles retournés par le dashboard
+TOP_COUNT = 5
+
+# Champs lus pour calculer les compteurs d'un ordinateur
+COUNTED_FIELDS = ['manufacturer', 'model', 'is_active', 'last_seen']
+
+
+def day_key(value):
+    """Clé du jour (heure locale) d'une date"""
+    return timezone.localdate(value).isoformat()
+
+
+def fleet_counters(computer):
+    """Compteurs auxquels contribue un ordinateur (aucun pour None)"""
+    if computer is None:
+        return ()
+    counters = [
+        (TOTAL, ''),
+        (MANUFACTURER, computer.manufacturer[:255]),
+        (MODEL, computer.model[:255]),
+        (LAST_SEEN_DAY, day_key(computer.last_seen)),
+    ]
+    if computer.is_active:
+        counters.append((ACTIVE, ''))
+    return tuple(counters)
+
+
+def increment(metric, key, delta, now=None):
+    now = now or timezone.now()
+    counters = FleetStatistic.objects.filter(metric=metric, key=key)
+    if counters.update(value=F('value') + delta, updated_at=now):
+        return
+    if metric == LAST_SEEN_DAY and key != OLDER_DAYS_KEY and delta < 0:
+        # Jour déjà regroupé par la réconciliation
+        increment(metric, OLDER_DAYS_KEY, delta, now)
+        return
+    FleetStatistic.objects.bulk_create(
+        [FleetStatistic(metric=metric, key=key, value=0, updated_at=now)], ignore_conflicts=True
+    )
+    counters.update(value=F('value') + delta, updated_at=now)
+
+
+def update_fleet_statistics(before, after):
+    """
+    Applique le passage d'un ordinateur des compteurs `before` aux compteurs
+    `after` (résultats de `fleet_counters`).
+
+    Aucune requête n'est exécutée si les compteurs sont identiques, ce qui est
+    le cas de la plupart des scans.
+    """
+    deltas = Counter(after)
+    deltas.subtract(before)
+    changes = [(counter, delta) for counter, delta in deltas.items() if delta]
+    if not changes:
+        return
+    now = timezone.now()
+    # Ordre constant des mises à jour : pas d'interblocage entre deux ingestions
+    for (metric, key), delta in sorted(changes):
+        increment(metric, key, delta, now)
+
+
+@receiver(post_delete, sender=Computer)
+def computer_deleted(sender, instance, **kwargs):
+    update_fleet_statistics(fleet_counters(instance), ())
+
+
+def first_recent_day(now):
+    """Premier jour de la fenêtre des ordinateurs « vus récemment »"""
+    return timezone.localdate(now) - timedelta(days=RECENT_DAYS - 1)
+
+
+def expected_counters(now=None):
+    """Compteurs calculés depuis la table Computer"""
+    now = now or timezone.now()
+    computers = Computer.objects.order_by()
+    expected = Counter()
+    expected[(TOTAL, '')] = computers.count()
+    expected[(ACTIVE, '')] = computers.filter(is_active=True).count()
+    for field in (MANUFACTURER, MODEL):
+        for row in computers.values(field).annotate(count=Count('id')):
+            expected[(field, row[field][:255])] += row['count']
+
+    window_start = first_recent_day(now)
+    days = computers.annotate(day=TruncDate('last_seen')).values('day').annotate(count=Count('id'))
+    for row in days:
+        key = row['day'].isoformat() if row['day'] >= window_start else OLDER_DAYS_KEY
+        expected[(LAST_SEEN_DAY, key)] += row['count']
+    return +expected
+
+
+def folded_key(metric, key, window_start):
+    """Clé d'un compteur après regroupement des jours antérieurs à `window_start` (ISO)"""
+    if metric == LAST_SEEN_DAY and key != OLDER_DAYS_KEY and key < window_start:
+        return OLDER_DAYS_KEY
+    return key
+
+
+@transaction.atomic
+def reconcile_fleet_statistics(now=None):
+    """
+    Recalcule tous les compteurs depuis la table Computer et corrige ceux qui
+    ont dérivé. Les jours de dernière vue sortis de la fenêtre du dashboard
+    sont regroupés. Retourne le nombre de compteurs qui avaient dérivé.
+    """
+    now = now or timezone.now()
+    window_start = first_recent_day(now).isoformat()
+    # Verrouillage avant le comptage : une ingestion en cours attend la fin de
+    # la réconciliation pour appliquer ses différences sur les compteurs recalculés
+    current = {
+        (statistic.metric, statistic.key): statistic
+        for statistic in FleetStatistic.objects.select_for_update()
+    }
+    expected = expected_counters(now)
+
+    maintained = Counter()
+    for (metric, key), statistic in current.items():
+        maintained[(metric, folded_key(metric, key, window_start))] += statistic.value
+    drifted = sum(1 for counter in set(maintained) | set(expected) if maintained[counter] != expected[counter])
+
+    to_create = []
+    to_update = []
+    for counter, value in expected.items():
+        statistic = current.pop(counter, None)
+        if statistic is None:
+            to_create.append(FleetStatistic(metric=counter[0], key=counter[1], value=value, updated_at=now))
+        elif statistic.value != value:
+            statistic.value = value
+            statistic.updated_at = now
+            to_update.append(statistic)
+
+    FleetStatistic.objects.bulk_create(to_create)
+    FleetStatistic.objects.bulk_update(to_update, ['value', 'updated_at'])
+    # Compteurs à zéro et jours regroupés
+    FleetStatistic.objects.filter(id__in=[statistic.id for statistic in current.values()]).delete()
+    return drifted
+
+
+def top_counts(counts, field):
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:TOP_COUNT]
+    return [{field: key, 'count': count} for key, count in ranked]
+
+
+def dashboard_statistics(now=None):
+    """Statistiques du dashboard, lues en une seule requête"""
+    now = now or timezone.now()
+    window_start = first_recent_day(now).isoformat()
+
+    counts = {TOTAL: {}, ACTIVE: {}, MANUFACTURER: {}, MODEL: {}, LAST_SEEN_DAY: {}}
+    updated_at = None
+    for metric, key, value, statistic_updated_at in FleetStatistic.objects.filter(value__gt=0).values_list(
+        'metric', 'key', 'value', 'updated_at'
+    ):
+        counts[metric][key] = value
+        updated_at = max(updated_at or statistic_updated_at, statistic_updated_at)
+
+    return {
+        'total_computers': counts[TOTAL].get('', 0),
+        'active_computers': counts[ACTIVE].get('', 0),
+        'recent_computers': sum(
+            value for key, value in counts[LAST_SEEN_DAY].items()
+            if key != OLDER_DAYS_KEY and key >= window_start
+        ),
+        'top_manufacturers': top_counts(counts[MANUFACTURER], 'manufacturer'),
+        'top_models': top_counts(counts[MODEL], 'model'),
+        'updated_at': updated_at,
+    }
@@ -1,3 +1,1008 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+
+from . import ingest
+from .canonical import canonical_name, canonical_publisher, product_family
+from .catalog import canonicalize_software, software_catalog
+from .compliance import evaluate
+from .fingerprints import content_fingerprint
+from .graphql_view import PERSISTED_QUERY_NOT_FOUND, query_hash
+from .history import software_as_of, software_changes
+from .ingest import ingest_inventory, ingest_software, save_software, touch_inventory
+from .models import (
+    Computer, ComputerSnapshot, Software, IngestSpool, InventoryLog, SoftwareInstallHistory, SoftwareRollup, Vulnerability,
+    VulnerabilityFinding,
+)
+from .pagination import keyset_condition, keyset_page
+from .presence import bitmap_ids
+from .profiling import requested_profile
+from .retention import day_start, prune_logs
+from .rollups import reconcile_software_rollups
+from .schema import schema
+from .search import search
+from .serializers import ComputerListSerializer
+from .snapshots import apply_patch, diff, reconstruct
+from .spool import claim_batch, coalesce, enqueue_inventory, process_group, requeue_stale
+from .statistics import dashboard_statistics, reconcile_fleet_statistics
+from .versions import version_key
+from .views import SOFTWARE_LIST_FIELDS
+from .vulnerabilities import import_vulnerabilities
+
+
+@skipUnless(connection.vendor == 'sqlite', "Plans d'exécution vérifiés sur SQLite")
+class QueryPlanTests(TestCase):
+    """Vérifie que les requêtes fréquentes utilisent les index prévus"""
+
+    @classmethod
+    def setUpTestData(cls):
+        computer = Computer.objects.create(
+            hostname='pc-01', serial_number='SN-01', manufacturer='Dell',
+            model='Latitude', current_user='user'
+        )
+        Software.objects.create(
+            computer=computer, name='Firefox', version='1.0', publisher='Mozilla', install_date=''
+        )
+        InventoryLog.log_scan(computer)
+        cls.computer = computer
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} absent du plan :\n{plan}")
+
+    def test_computer_default_ordering(self):
+        self.assertUsesIndex(Computer.objects.all(), 'computer_updated_idx')
+
+    def test_computer_dashboard_counts(self):
+        # Forme des requêtes count() du dashboard : sans tri, clé primaire seule
+        since = timezone.now() - timedelta(days=7)
+        active = Computer.objects.filter(is_active=True).order_by().values('pk')
+        self.assertUsesIndex(active, 'computer_active_seen_idx')
+        self.assertUsesIndex(active.filter(last_seen__gte=since), 'computer_active_seen_idx')
+        recent = Computer.objects.filter(last_seen__gte=since).order_by().values('pk')
+        self.assertUsesIndex(recent, 'computer_last_seen_idx')
+
+    def test_computer_dashboard_groupings(self):
+        by_manufacturer = Computer.objects.values('manufacturer').annotate(count=Count('id')).order_by('-count')
+        self.assertUsesIndex(by_manufacturer, 'computer_manufacturer_idx')
+        by_model = Computer.objects.values('model').annotate(count=Count('id')).order_by('-count')
+        self.assertUsesIndex(by_model, 'computer_model_idx')
+
+    def test_software_active_listing(self):
+        self.assertUsesIndex(Software.objects.all(), 'software_active_name_idx')
+
+    def test_software_by_computer(self):
+        self.assertUsesIndex(
+            Software.objects.filter(computer=self.computer), 'software_computer_active_idx'
+        )
+
+    def test_software_by_publisher(self):
+        self.assertUsesIndex(
+            Software.all_objects.filter(publisher='Mozilla'), 'software_publisher_idx'
+        )
+
+    def test_software_version_range(self):
+        software = Software.objects.filter(
+            product_id=1, version_key__gt='', version_key__lt=version_key('120.0.6099')
+        ).order_by().values('id')
+        self.assertUsesIndex(software, 'software_product_key_idx')
+
+    def test_software_rollups(self):
+        ordering = ['-install_count', 'id']
+        top_products = SoftwareRollup.objects.filter(version__isnull=True, install_count__gt=0).order_by(*ordering)
+        self.assertUsesIndex(top_products.values('id')[:100], 'rollup_product_count_idx')
+        versions = SoftwareRollup.objects.filter(product_id=1, version__isnull=False, install_count__gt=0)
+        self.assertUsesIndex(versions.order_by(*ordering).values('id')[:100], 'rollup_version_count_idx')
+
+    def test_logs_by_computer(self):
+        self.assertUsesIndex(
+            InventoryLog.objects.filter(computer=self.computer), 'log_computer_date_idx'
+        )
+
+    def test_logs_by_type(self):
+        self.assertUsesIndex(InventoryLog.objects.filter(log_type='scan'), 'log_type_date_idx')
+
+    def test_logs_listing(self):
+        self.assertUsesIndex(InventoryLog.objects.all(), 'log_created_idx')
+
+    def test_keyset_pages(self):
+        # Page suivante d'une liste REST : recherche dans l'index à partir du curseur
+        computers = Computer.objects.filter(
+            keyset_condition(['updated_at', 'id'], [timezone.now(), 1])
+        ).order_by('updated_at', 'id').values('id')
+        self.assertUsesIndex(computers, 'computer_updated_idx')
+        logs = InventoryLog.objects.filter(
+            keyset_condition(['-created_at', '-id'], [timezone.now(), 1])
+        ).order_by('-created_at', '-id')
+        self.assertUsesIndex(logs, 'log_created_idx')
+
+
+class IngestTests(TestCase):
+    """Vérifie la synchronisation d'un inventaire complet"""
+
+    computer = {'serialNumber': 'SN-1', 'hostname': 'pc-1', 'systemInfo': {'os': 'Windows 11'}}
+
+    def item(self, name, version='1.0', **fields):
+        return {'name': name, 'version': version, 'publisher': 'Éditeur', **fields}
+
+    def test_first_sync_creates_computer_and_software(self):
+        result = ingest_inventory(self.computer, [self.item('A'), self.item('B', '2.0')])
+        self.assertTrue(result.created)
+        self.assertEqual(result.software_created, 2)
+        computer = Computer.objects.get(serial_number='SN-1')
+        self.assertEqual(computer.system_info, {'os': 'Windows 11'})
+        self.assertEqual(
+            sorted(computer.software_list.values_list('name', 'version')), [('A', '1.0'), ('B', '2.0')]
+        )
+        self.assertEqual(InventoryLog.objects.filter(computer=computer).count(), 1)
+
+    def test_unchanged_inventory_only_updates_last_seen(self):
+        ingest_inventory(self.computer, [self.item('A')])
+        last_seen = Computer.objects.get().last_seen
+        # Point de sauvegarde, verrou de l'ordinateur et mise à jour de last_seen (déjà vu aujourd'hui)
+        with self.assertNumQueries(4):
+            result = ingest_inventory(self.computer, [self.item('A')])
+        self.assertTrue(result.unchanged)
+        self.assertGreater(Computer.objects.get().last_seen, last_seen)
+        self.assertEqual(InventoryLog.objects.count(), 1)
+
+    def test_only_modified_software_is_written(self):
+        ingest_inventory(self.computer, [self.item('A'), self.item('B')])
+        untouched = Software.objects.get(name='B').updated_at
+
+        result = ingest_inventory(self.computer, [
+            self.item('A', installLocation='C:\\A'), self.item('B'), self.item('C'),
+        ])
+        self.assertEqual([software.name for software in result.software.updated], ['A'])
+        self.assertEqual([software.name for software in result.software.created], ['C'])
+        self.assertEqual(result.software_deactivated, 0)
+        self.assertEqual(Software.objects.get(name='A').install_location, 'C:\\A')
+        self.assertEqual(Software.objects.get(name='B').updated_at, untouched)
+
+    def test_missing_software_is_deactivated_then_reactivated(self):
+        ingest_inventory(self.computer, [self.item('A'), self.item('B')])
+        software_id = Software.objects.get(name='B').id
+
+        result = ingest_inventory(self.computer, [self.item('A')])
+        self.assertEqual(result.software.deactivated_ids, [software_id])
+        self.assertEqual(list(Software.objects.values_list('name', flat=True)), ['A'])
+        self.assertFalse(Software.all_objects.get(id=software_id).is_active)
+
+        result = ingest_inventory(self.computer, [self.item('A'), self.item('B')])
+        self.assertEqual([software.id for software in result.software.updated], [software_id])
+        self.assertEqual(result.software_created, 0)
+        self.assertTrue(Software.objects.filter(id=software_id).exists())
+        self.assertEqual(
+            [period.valid_to is None for period in SoftwareInstallHistory.objects.filter(software_id=software_id).order_by('id')],
+            [False, True]
+        )
+
+    def test_concurrent_first_sync_updates_the_created_computer(self):
+        ingest_inventory(self.computer, [self.item('A')])
+        # L'autre requête a créé l'ordinateur après notre recherche
+        with mock.patch('inventory.ingest.locked_computer', side_effect=[None, ingest.locked_computer('SN-1')]):
+            result = ingest_inventory({**self.computer, 'hostname': 'pc-1b'}, [self.item('A'), self.item('B')])
+        self.assertFalse(result.created)
+        self.assertEqual(result.software_created, 1)
+        self.assertEqual(Computer.objects.get().hostname, 'pc-1b')
+
+
+class BulkSoftwareTests(TestCase):
+    """Vérifie que la synchronisation des logiciels est ensembliste"""
+
+    def setUp(self):
+        software_catalog.clear()
+        self.computer = Computer.objects.create(serial_number='SN-1', hostname='pc-1', manufacturer='Dell', model='XPS')
+
+    def items(self, prefix, count, **fields):
+        return [
+            {'name': f'{prefix} {i}', 'version': '1.0', 'publisher': 'Éditeur', **fields} for i in range(count)
+        ]
+
+    def test_query_count_does_not_depend_on_software_count(self):
+        # Premier appel : chargement de l'index des vulnérabilités
+        ingest_software(self.computer, self.items('Amorce', 1))
+        with CaptureQueriesContext(connection) as created:
+            ingest_software(self.computer, self.items('Outil', 5))
+        with CaptureQueriesContext(connection) as updated:
+            ingest_software(self.computer, self.items('Outil', 5, installLocation='D:\\'))
+
+        # Dix fois plus de logiciels, dans un seul lot (SQLite limite le nombre de paramètres par requête)
+        with self.assertNumQueries(len(created)):
+            ingest_software(self.computer, self.items('Utilitaire', 50))
+        with self.assertNumQueries(len(updated)):
+            result = ingest_software(self.computer, self.items('Utilitaire', 50, installLocation='D:\\'))
+        self.assertEqual(len(result.updated), 50)
+        self.assertEqual(Software.objects.filter(computer=self.computer, install_location='D:\\').count(), 55)
+
+    def test_unchanged_software_is_not_written(self):
+        ingest_software(self.computer, self.items('Outil', 5))
+        result = ingest_software(self.computer, self.items('Outil', 5))
+        self.assertEqual((result.created, result.updated, result.deactivated_ids), ([], [], []))
+
+
+class DeactivationTests(TestCase):
+    """Vérifie la désactivation des logiciels absents d'une liste complète"""
+
+    def setUp(self):
+        self.computer = Computer.objects.create(serial_number='SN-1', hostname='pc-1', manufacturer='Dell', model='XPS')
+        ingest_software(self.computer, [
+            {'name': name, 'version': '1.0', 'publisher': 'Éditeur'} for name in ('A', 'B', 'C', 'D')
+        ], complete=True)
+
+    def test_missing_software_is_deactivated_in_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = ingest_software(
+                self.computer, [{'name': 'A', 'version': '1.0', 'publisher': 'Éditeur'}], complete=True
+            )
+        self.assertEqual(len(result.deactivated_ids), 3)
+        statement = f'UPDATE {connection.ops.quote_name(Software._meta.db_table)} '
+        software_updates = [query['sql'] for query in queries if query['sql'].startswith(statement)]
+        self.assertEqual(len(software_updates), 1)
+
+    def test_default_manager_hides_inactive_software(self):
+        ingest_software(self.computer, [{'name': 'A', 'version': '1.0', 'publisher': 'Éditeur'}], complete=True)
+        self.assertEqual(list(Software.objects.values_list('name', flat=True)), ['A'])
+        self.assertEqual(list(self.computer.software_list.values_list('name', flat=True)), ['A'])
+        self.assertEqual(Software.all_objects.filter(is_active=False).count(), 3)
+        # Une liste partielle ne désactive rien
+        ingest_software(self.computer, [{'name': 'B', 'version': '1.0', 'publisher': 'Éditeur'}])
+        self.assertEqual(sorted(Software.objects.values_list('name', flat=True)), ['A', 'B'])
+
+
+class FingerprintTests(TestCase):
+    """Vérifie la détection des scans sans changement par les empreintes"""
+
+    system_info = {'os': 'Windows 11', 'build': '22631'}
+
+    def ingest(self, **kwargs):
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1', 'systemInfo': self.system_info}, **kwargs)
+        return Computer.objects.get(serial_number='SN-1')
+
+    def test_section_fingerprint_follows_content(self):
+        computer = self.ingest()
+        self.assertEqual(computer.system_hash, content_fingerprint(self.system_info))
+        self.assertFalse(computer.section_changed('system_info', {'build': '22631', 'os': 'Windows 11'}))
+        self.assertTrue(computer.section_changed('system_info', {'os': 'Windows 10'}))
+
+    def test_matching_fingerprint_seen_today_is_a_single_update(self):
+        computer = self.ingest()
+        with self.assertNumQueries(1):
+            self.assertTrue(touch_inventory('SN-1', {'system_hash': computer.system_hash}))
+        self.assertGreater(Computer.objects.get().last_seen, computer.last_seen)
+
+    def test_matching_fingerprint_first_seen_today_updates_counters(self):
+        computer = self.ingest(seen_at=timezone.now() - timedelta(days=1))
+        self.assertTrue(touch_inventory('SN-1', {'system_hash': computer.system_hash}))
+        self.assertGreaterEqual(Computer.objects.get().last_seen, day_start(timezone.now()))
+        self.assertEqual(reconcile_fleet_statistics(), 0)
+
+    def test_mismatch_requires_full_inventory(self):
+        computer = self.ingest()
+        self.assertFalse(touch_inventory('SN-1', {'system_hash': content_fingerprint({'os': 'Windows 10'})}))
+        self.assertFalse(touch_inventory('SN-2', {'system_hash': computer.system_hash}))
+        with self.assertNumQueries(0):
+            self.assertFalse(touch_inventory('SN-1', {'system_hash': ''}))
+        self.assertEqual(Computer.objects.get().last_seen, computer.last_seen)
+
+
+class HistoryTests(TestCase):
+    """Vérifie les requêtes à date de l'historique des installations"""
+
+    def ingest(self, *names):
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1'}, [
+            {'name': name, 'version': '1.0', 'publisher': 'Éditeur'} for name in names
+        ])
+        return timezone.now()
+
+    def test_as_of_and_changes(self):
+        first = self.ingest('A', 'B')
+        second = self.ingest('A')
+        third = self.ingest('A', 'C')
+        computer_id = Computer.objects.get().id
+
+        def installed(at):
+            return [period.name for period in software_as_of(computer_id, at)]
+
+        self.assertEqual(installed(first - timedelta(days=1)), [])
+        self.assertEqual(installed(first), ['A', 'B'])
+        self.assertEqual(installed(second), ['A'])
+        self.assertEqual(installed(third), ['A', 'C'])
+
+        changes = software_changes(first, computer_id=computer_id)
+        self.assertEqual([(period.name, period.valid_to is None) for period in changes], [('C', True), ('B', False)])
+        self.assertEqual([period.name for period in software_changes(first, second)], ['B'])
+
+
+class SnapshotTests(TestCase):
+    """Vérifie la reconstruction des sections depuis les images complètes et les différences"""
+
+    def test_patch_round_trip(self):
+        old = {'disks': [{'size': 256}, {'size': 512}], 'a/b': 1, 'c~d': {'x': 1}, 'gone': True}
+        new = {'disks': [{'size': 256}, {'size': 1024}, {'size': 2048}], 'a/b': 2, 'c~d': {'x': 1, 'y': [1]}}
+        self.assertEqual(apply_patch(old, diff(old, new)), new)
+        self.assertEqual(diff(new, new), [])
+
+    @override_settings(INVENTORY_SNAPSHOT_KEYFRAME_INTERVAL=3)
+    def test_reconstruct_across_keyframes(self):
+        start = timezone.now() - timedelta(days=10)
+        states = [
+            {'cpu': 'i5', 'ram_gb': 8 + i, 'disks': [{'size': 256}] * (1 + i % 2)} for i in range(7)
+        ]
+        for day, state in enumerate(states):
+            ingest_inventory({'serialNumber': 'SN-1', 'hardwareInfo': state}, seen_at=start + timedelta(days=day))
+        computer_id = Computer.objects.get().id
+
+        snapshots = ComputerSnapshot.objects.filter(computer_id=computer_id, section='hardware').order_by('sequence')
+        self.assertEqual(
+            list(snapshots.values_list('is_keyframe', flat=True)), [True, False, False, True, False, False, True]
+        )
+        for day, state in enumerate(states):
+            self.assertEqual(reconstruct(computer_id, 'hardware', start + timedelta(days=day, hours=1))[0], state)
+        self.assertEqual(reconstruct(computer_id, 'hardware', start - timedelta(days=1)), (None, None))
+        self.assertEqual(reconstruct(computer_id, 'hardware')[0], states[-1])
+
+
+    def test_admin_edits_are_recorded(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        form = {
+            'hostname': 'pc-1', 'serial_number': 'SN-1', 'manufacturer': 'Dell', 'model': 'XPS', 'current_user': 'jdupont',
+            'system_info': '{"os": "Windows"}', 'hardware_info': '{"ram_gb": 8}', 'network_info': '{"ip": "10.0.0.1"}',
+            'is_active': 'on',
+        }
+        response = self.client.post('/admin/inventory/computer/add/', form)
+        self.assertEqual(response.status_code, 302)
+        computer = Computer.objects.get()
+        self.assertFalse(computer.section_changed('hardware_info', {'ram_gb': 8}))
+
+        response = self.client.post(
+            f'/admin/inventory/computer/{computer.id}/change/', {**form, 'hardware_info': '{"ram_gb": 16}'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Computer.objects.get().section_changed('hardware_info', {'ram_gb': 16}))
+        snapshots = ComputerSnapshot.objects.filter(computer=computer, section='hardware').order_by('sequence')
+        self.assertEqual(snapshots.count(), 2)
+        self.assertEqual(reconstruct(computer.id, 'hardware')[0], {'ram_gb': 16})
+
+class RetentionTests(TestCase):
+    """Vérifie le regroupement des anciens scans en résumés quotidiens"""
+
+    def setUp(self):
+        self.computer = Computer.objects.create(serial_number='SN-1', hostname='pc-1', manufacturer='Dell', model='XPS')
+        self.day = day_start(timezone.now() - timedelta(days=10))
+
+    def log(self, log_type, created_at, **details):
+        log = InventoryLog.objects.create(computer=self.computer, log_type=log_type, message='', details=details)
+        InventoryLog.objects.filter(pk=log.pk).update(created_at=created_at)
+
+    def test_day_split_across_batches_is_merged(self):
+        for hour, source in [(9, 'graphql'), (10, 'graphql'), (11, 'spool')]:
+            self.log('scan', self.day + timedelta(hours=hour), source=source, software_created=1, software_updated=2)
+        self.log('scan', self.day + timedelta(days=1, hours=9), source='graphql')
+        self.log('scan', timezone.now())
+        self.log('sync', self.day)
+
+        processed = prune_logs(batch_size=2, retention={'scan': 7, 'sync': 5})
+        self.assertEqual(processed, {'scan': 4, 'sync': 1})
+
+        summaries = InventoryLog.objects.filter(log_type='summary').order_by('created_at')
+        self.assertEqual([summary.created_at for summary in summaries], [self.day, self.day + timedelta(days=1)])
+        details = summaries[0].details
+        self.assertEqual(details['scans'], 3)
+        self.assertEqual(details['sources'], {'graphql': 2, 'spool': 1})
+        self.assertEqual((details['software_created'], details['software_updated']), (3, 6))
+        self.assertEqual(parse_datetime(details['first_scan']), self.day + timedelta(hours=9))
+        self.assertEqual(parse_datetime(details['last_scan']), self.day + timedelta(hours=11))
+        self.assertEqual(list(InventoryLog.objects.values_list('log_type', flat=True)).count('scan'), 1)
+
+
+class BatchLoaderTests(TestCase):
+    """Vérifie les listes GraphQL non paginées : relations chargées par lots et nombre d'éléments borné"""
+
+    query = """
+        {
+            allSoftware { name computer { hostname logs { message } } }
+            allComputers { hostname softwareList { name computer { serialNumber } } }
+        }
+    """
+
+    def add_computers(self, start, count):
+        for i in range(start, start + count):
+            computer = Computer.objects.create(serial_number=f'SN-{i}', hostname=f'pc-{i}')
+            Software.objects.bulk_create([
+                Software(computer=computer, name=f'Logiciel {j}', version='1.0', publisher='Éditeur') for j in range(3)
+            ])
+            InventoryLog.objects.create(computer=computer, log_type='scan', message='Scan')
+
+    def execute(self):
+        result = schema.execute(self.query, context_value=SimpleNamespace())
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_query_count_does_not_depend_on_result_size(self):
+        self.add_computers(0, 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.execute()
+
+        self.add_computers(2, 20)
+        with self.assertNumQueries(len(queries)):
+            data = self.execute()
+        self.assertEqual(len(data['allSoftware']), 66)
+        self.assertEqual(data['allSoftware'][0]['computer']['logs'], [{'message': 'Scan'}])
+
+
+    @override_settings(GRAPHQL_LIST_MAX_RESULTS=10)
+    def test_legacy_lists_are_capped(self):
+        self.add_computers(0, 5)
+        result = schema.execute('{ allSoftware { name } allComputers(limit: 2) { hostname } }')
+        self.assertEqual(len(result.data['allSoftware']), 10)
+        self.assertEqual(len(result.data['allComputers']), 2)
+        result = schema.execute('{ allSoftware(limit: 100) { name } }')
+        self.assertEqual(len(result.data['allSoftware']), 10)
+
+class KeysetPaginationTests(TestCase):
+    """Vérifie le parcours par curseur, y compris entre lignes de même date"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            Computer.objects.create(serial_number=f'SN-{i}', hostname=f'pc-{i}')
+        # Trois dates pour sept ordinateurs : le tri repose sur id entre ex aequo
+        moment = timezone.now()
+        for computer in Computer.objects.all():
+            Computer.objects.filter(pk=computer.pk).update(updated_at=moment - timedelta(minutes=computer.pk % 3))
+        cls.expected = list(Computer.objects.order_by('updated_at', 'id').values_list('id', flat=True))
+
+    def test_forward_and_backward_pages(self):
+        ordering = ['updated_at', 'id']
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(Computer.objects.all(), ordering, first=2, after=cursor)
+            seen += [computer.id for computer in page.rows]
+            if not page.has_next:
+                break
+            cursor = page.end_cursor
+        self.assertEqual(seen, self.expected)
+
+        page = keyset_page(Computer.objects.all(), ordering, last=3, before=page.start_cursor)
+        self.assertEqual([computer.id for computer in page.rows], self.expected[3:6])
+        self.assertTrue(page.has_previous)
+        self.assertTrue(page.has_next)
+
+        descending = keyset_page(Computer.objects.all(), ['-updated_at', '-id'], first=4)
+        page = keyset_page(Computer.objects.all(), ['-updated_at', '-id'], first=4, after=descending.end_cursor)
+        self.assertEqual([computer.id for computer in descending.rows + page.rows], self.expected[::-1])
+
+    def test_rest_next_links(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin'))
+        seen, url = [], '/api/computers/?page_size=3'
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [computer['id'] for computer in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(client.get('/api/computers/?cursor=invalide').status_code, 400)
+
+    def test_rest_rejects_malformed_cursor_values(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin'))
+        for url in ['/api/computers/', '/api/logs/']:
+            for values in [[{'a': 1}, {'b': 2}], [[1], [2]], ['2024-13-45', 'abc']]:
+                cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+                response = client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 400, (url, values))
+                self.assertEqual(client.get(url, {'before': cursor}).status_code, 400)
+
+
+class PersistedQueryTests(TestCase):
+    """Vérifie le protocole des requêtes persistées"""
+
+    query = '{ computerConnection(first: 1) { edges { node { hostname } } } }'
+
+    def setUp(self):
+        cache.clear()
+        Computer.objects.create(serial_number='SN-1', hostname='pc-1')
+
+    def post(self, **body):
+        return self.client.post('/graphql/', json.dumps(body), content_type='application/json').json()
+
+    def test_unknown_hash_is_registered_with_the_full_query(self):
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(self.query)}}
+        response = self.post(extensions=extensions)
+        self.assertEqual(response['errors'][0]['message'], PERSISTED_QUERY_NOT_FOUND)
+
+        expected = {'computerConnection': {'edges': [{'node': {'hostname': 'pc-1'}}]}}
+        self.assertEqual(self.post(query=self.query, extensions=extensions)['data'], expected)
+        self.assertEqual(self.post(extensions=extensions)['data'], expected)
+        response = self.client.get('/graphql/', {'extensions': json.dumps(extensions)}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['data'], expected)
+
+    def test_hash_must_match_the_query(self):
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash('{ __typename }')}}
+        response = self.post(query=self.query, extensions=extensions)
+        self.assertNotIn('data', response)
+        self.assertEqual(len(response['errors']), 1)
+        self.assertEqual(self.post(extensions=extensions)['errors'][0]['message'], PERSISTED_QUERY_NOT_FOUND)
+
+
+@override_settings(GRAPHQL_QUERY_BUDGETS={
+    'anonymous': {'max_depth': 4, 'max_cost': 50},
+    'authenticated': {'max_depth': 6, 'max_cost': 20000},
+    'staff': {'max_depth': 8, 'max_cost': 200000},
+})
+class QueryBudgetTests(TestCase):
+    """Vérifie le rejet des requêtes hors budget selon la classe du client"""
+
+    # Coûts estimés 2060 et 103000 (softwareList compte pour GRAPHQL_LIST_SIZE_ESTIMATE éléments)
+    expensive = '{ computerConnection(first: 20) { edges { node { softwareList { name } } } } }'
+    very_expensive = '{ computerConnection(first: 1000) { edges { node { softwareList { name } } } } }'
+    # Profondeur 5
+    deep = '{ allSoftware(limit: 1) { computer { softwareList { computer { logs { message } } } } } }'
+
+    def post(self, query):
+        return self.client.post('/graphql/', {'query': query}, content_type='application/json').json()
+
+    def error_code(self, query):
+        errors = self.post(query).get('errors')
+        return errors[0]['extensions']['code'] if errors else None
+
+    def test_budget_depends_on_client_class(self):
+        self.assertEqual(self.error_code(self.expensive), 'QUERY_TOO_EXPENSIVE')
+        self.assertEqual(self.error_code(self.deep), 'QUERY_TOO_DEEP')
+        self.assertIsNone(self.error_code('{ computerConnection(first: 5) { edges { node { hostname } } } }'))
+
+        user = User.objects.create_user('agent')
+        self.client.force_login(user)
+        self.assertIsNone(self.error_code(self.expensive))
+        self.assertIsNone(self.error_code(self.deep))
+        self.assertEqual(self.error_code(self.very_expensive), 'QUERY_TOO_EXPENSIVE')
+
+        user.is_staff = True
+        user.save()
+        self.assertIsNone(self.error_code(self.very_expensive))
+
+    def test_negative_sizes_do_not_offset_the_cost(self):
+        user = User.objects.create_user('admin', is_staff=True)
+        self.client.force_login(user)
+        # Un alias de coût négatif ne doit pas compenser un champ hors budget
+        expensive = 'b: allComputers(limit: 1000) { softwareList { computer { logs { computer { id } } } } }'
+        for negative in [
+            'a: allComputers(limit: -1000000) { softwareList { computer { id } } }',
+            'a: computerConnection(last: -1000000) { edges { node { softwareList { computer { id } } } } }',
+        ]:
+            self.assertEqual(self.error_code(f'{{ {negative} {expensive} }}'), 'QUERY_TOO_EXPENSIVE')
+
+
+class RestListTests(TestCase):
+    """Vérifie les listes projetées et paginées de l'API REST"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('admin')
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1', 'systemInfo': {'os': 'Windows 11'}}, [
+            {'name': f'Logiciel {i}', 'version': '1.0', 'publisher': 'Éditeur', 'uninstallString': 'msiexec /x'}
+            for i in range(5)
+        ])
+        cls.computer = Computer.objects.get()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_computer_software_action_is_paginated(self):
+        url = f'/api/computers/{self.computer.id}/software/'
+        names, params = [], {'page_size': 2}
+        while True:
+            response = self.client.get(url, params).json()
+            names += [software['name'] for software in response['software_list']]
+            if not response['has_next']:
+                break
+            params['cursor'] = response['next_cursor']
+        self.assertEqual(names, [f'Logiciel {i}' for i in range(5)])
+        self.assertEqual(set(response['software_list'][0]), set(SOFTWARE_LIST_FIELDS))
+
+        # Total connu sans requête lorsque la première page contient tout
+        self.assertEqual(self.client.get(url).json()['software_count'], 5)
+        self.assertIsNone(self.client.get(url, {'page_size': 2}).json()['software_count'])
+        self.assertEqual(self.client.get(url, {'page_size': 2, 'count': 1}).json()['software_count'], 5)
+        self.assertEqual(self.client.get(url, {'page_size': 'x'}).status_code, 400)
+
+
+    def test_fields_and_expand_select_columns(self):
+        response = self.client.get('/api/computers/', {'fields': 'hostname'}).json()
+        # Clé et colonnes de tri toujours incluses
+        self.assertEqual(set(response['results'][0]), {'id', 'updated_at', 'hostname'})
+
+        row = self.client.get('/api/computers/', {'expand': 'system_info'}).json()['results'][0]
+        self.assertEqual(set(row), set(ComputerListSerializer.default_fields) | {'system_info'})
+        self.assertEqual(row['system_info'], {'os': 'Windows 11'})
+
+        rows = self.client.get('/api/software/').json()['results']
+        self.assertNotIn('uninstall_string', rows[0])
+        rows = self.client.get('/api/software/', {'expand': 'uninstall_string'}).json()['results']
+        self.assertEqual(rows[0]['uninstall_string'], 'msiexec /x')
+        detail = self.client.get(f"/api/software/{rows[0]['id']}/").json()
+        self.assertEqual(detail['uninstall_string'], 'msiexec /x')
+
+        self.assertEqual(self.client.get('/api/computers/', {'fields': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/computers/', {'expand': 'hostname'}).status_code, 400)
+
+class SpoolTests(TestCase):
+    """Vérifie la réservation, la fusion et la reprise des inventaires en file d'attente"""
+
+    def enqueue(self, serial_number, software=None, **computer_data):
+        return enqueue_inventory({'serialNumber': serial_number, **computer_data}, software)
+
+    def test_coalesce_keeps_latest_computer_and_software(self):
+        self.enqueue('SN-1', [{'name': 'Ancien', 'version': '1'}], hostname='pc-old')
+        self.enqueue('SN-1', [{'name': 'Récent', 'version': '2'}], hostname='pc-mid')
+        self.enqueue('SN-1', None, hostname='pc-new')
+        computer_data, software = coalesce(claim_batch(10)['SN-1'])
+        self.assertEqual(computer_data['hostname'], 'pc-new')
+        self.assertEqual(software, [{'name': 'Récent', 'version': '2'}])
+
+    def test_batch_is_limited_to_distinct_serials(self):
+        for _ in range(5):
+            self.enqueue('SN-1')
+        self.enqueue('SN-2')
+        self.enqueue('SN-3')
+        groups = claim_batch(2)
+        self.assertEqual(sorted(groups), ['SN-1', 'SN-2'])
+        self.assertEqual(len(groups['SN-1']), 5)
+
+    def test_serial_being_processed_is_not_claimed(self):
+        self.enqueue('SN-1', hostname='pc-1')
+        first = claim_batch(10)
+        # Inventaire plus récent reçu pendant le traitement du premier
+        self.enqueue('SN-1', hostname='pc-1-renamed')
+        self.assertEqual(claim_batch(10), {})
+
+        process_group(first['SN-1'])
+        second = claim_batch(10)
+        self.assertEqual([entry.payload['input']['hostname'] for entry in second['SN-1']], ['pc-1-renamed'])
+        process_group(second['SN-1'])
+        self.assertEqual(Computer.objects.get(serial_number='SN-1').hostname, 'pc-1-renamed')
+        self.assertEqual(
+            set(InventoryLog.objects.filter(log_type='scan').values_list('message', flat=True)),
+            {"Inventaire synchronisé via la file d'ingestion"}
+        )
+
+    def test_failed_group_is_retried_then_marked_as_error(self):
+        entry = IngestSpool.objects.create(serial_number='SN-1', payload={'input': {}})
+        for status in ('pending', 'error'):
+            with self.assertLogs('inventory.spool', 'ERROR'):
+                process_group(claim_batch(10)['SN-1'], max_attempts=2)
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, status)
+        self.assertEqual(entry.attempts, 2)
+        self.assertEqual(claim_batch(10), {})
+
+    def test_stale_claims_are_requeued(self):
+        self.enqueue('SN-1')
+        claim_batch(10)
+        self.assertEqual(requeue_stale(timeout_minutes=10), 0)
+        IngestSpool.objects.update(claimed_at=timezone.now() - timedelta(minutes=11))
+        self.assertEqual(requeue_stale(timeout_minutes=10), 1)
+        self.assertEqual(len(claim_batch(10)['SN-1']), 1)
+
+
+class VersionKeyTests(TestCase):
+    """Vérifie l'ordre des clés de version"""
+
+    def test_version_order(self):
+        versions = [
+            '1.2-dev', '1.2a1', '1.2.0-beta.2', '1.2rc1', '1.2', '1.2u5', '1.2.1', '1.10',
+            '1.10.0.1 (x64)', 'v2.0', '120.0.6099.71', '120.0.6099.130',
+        ]
+        keys = [version_key(version) for version in versions]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(version_key('1.2.0'), version_key('1.2'))
+        self.assertLess(version_key('1.1.1'), version_key('1.1.1k'))
+        self.assertEqual(version_key('Unknown'), '')
+
+
+class CanonicalNameTests(TestCase):
+    """Vérifie la normalisation des noms et éditeurs et le regroupement dans le catalogue"""
+
+    def test_canonical_values(self):
+        self.assertEqual(canonical_name('7-Zip 23.01 (x64)'), '7-Zip')
+        self.assertEqual(canonical_name('Java 8 Update 301 (64-bit)'), 'Java 8')
+        self.assertEqual(
+            canonical_name('Microsoft Visual C++ 2015-2022 Redistributable (x64) - 14.36.32532'),
+            'Microsoft Visual C++ 2015-2022 Redistributable'
+        )
+        # Version de gamme conservée, correctif et build retirés
+        self.assertEqual(canonical_name('Python 3.11.7 (64-bit)'), 'Python 3.11')
+        self.assertEqual(canonical_name('Python 3.11.7 Core Interpreter (64-bit)'), 'Python 3.11 Core Interpreter')
+        self.assertEqual(canonical_name('Microsoft .NET Framework 4.8'), 'Microsoft .NET Framework 4.8')
+        self.assertEqual(canonical_name('Microsoft .NET Framework 4.8.1'), 'Microsoft .NET Framework 4.8')
+        self.assertEqual(canonical_name('Microsoft .NET Runtime - 8.0.0 (x64)'), 'Microsoft .NET Runtime 8.0')
+        self.assertEqual(canonical_name('Java(TM) SE Development Kit 17.0.9 (64-bit)'), 'Java SE Development Kit 17')
+        self.assertEqual(canonical_name('Python Launcher'), 'Python Launcher')
+        self.assertEqual(product_family('Python 3.11'), 'Python')
+        self.assertEqual(canonical_publisher('Microsoft Corp.'), 'Microsoft')
+        self.assertEqual(canonical_publisher('Intel(R) Corporation'), 'Intel')
+        self.assertEqual(canonical_publisher('AnyDesk Software GmbH'), 'AnyDesk')
+
+    def test_variants_share_a_product(self):
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1'}, [
+            {'name': '7-Zip 23.01 (x64)', 'version': '23.01', 'publisher': 'Igor Pavlov'},
+        ])
+        ingest_inventory({'serialNumber': 'SN-2', 'hostname': 'pc-2'}, [
+            {'name': '7-Zip 22.01', 'version': '22.01', 'publisher': 'Igor Pavlov '},
+        ])
+        self.assertEqual(Software.objects.values('product_id').distinct().count(), 1)
+        self.assertEqual(Software.objects.first().product.name, '7-Zip')
+        # Valeurs déjà canoniques : rien à rattacher
+        self.assertEqual(canonicalize_software(), (0, 0))
+
+
+class FleetStatisticsTests(TestCase):
+    """Vérifie que les compteurs maintenus à l'ingestion ne dérivent pas"""
+
+    def test_incremental_counters_match_reconcile(self):
+        now = timezone.now()
+        for i in range(6):
+            ingest_inventory({
+                'serialNumber': f'SN-{i}', 'hostname': f'pc-{i}',
+                'manufacturer': ['Dell', 'HP'][i % 2], 'model': f'M{i % 3}',
+            }, seen_at=now - timedelta(days=i * 3))
+        # Changement de fabricant et nouveau jour de dernière vue
+        ingest_inventory({'serialNumber': 'SN-5', 'manufacturer': 'Lenovo'})
+        Computer.objects.get(serial_number='SN-4').delete()
+
+        statistics = dashboard_statistics()
+        self.assertEqual(statistics['total_computers'], 5)
+        self.assertEqual(statistics['recent_computers'], 4)
+        self.assertEqual(statistics['top_manufacturers'][0], {'manufacturer': 'Dell', 'count': 2})
+        self.assertEqual(reconcile_fleet_statistics(), 0)
+
+    def test_recent_window_covers_seven_calendar_days(self):
+        now = timezone.now()
+        for days in (6, 7):
+            ingest_inventory({'serialNumber': f'SN-{days}'}, seen_at=now - timedelta(days=days))
+        self.assertEqual(dashboard_statistics(now)['recent_computers'], 1)
+        self.assertEqual(reconcile_fleet_statistics(now), 0)
+        self.assertEqual(dashboard_statistics(now)['recent_computers'], 1)
+
+
+class SoftwareRollupTests(TestCase):
+    """Vérifie que les nombres d'installations maintenus à l'ingestion ne dérivent pas"""
+
+    def counts(self):
+        return sorted(
+            (rollup.product.name, rollup.version.version if rollup.version else '*', rollup.install_count)
+            for rollup in SoftwareRollup.objects.filter(install_count__gt=0).select_related('product', 'version')
+        )
+
+    def test_incremental_counts_match_reconcile(self):
+        for i in range(4):
+            ingest_inventory({'serialNumber': f'SN-{i}', 'hostname': f'pc-{i}'}, [
+                {'name': f'7-Zip {22 + i % 2}.01 (x64)', 'version': f'{22 + i % 2}.01', 'publisher': 'Igor Pavlov'},
+                {'name': 'Google Chrome', 'version': '120.0', 'publisher': 'Google LLC'},
+            ])
+        # Mise à jour, désinstallation et suppression d'un ordinateur
+        ingest_inventory({'serialNumber': 'SN-0', 'hostname': 'pc-0'}, [
+            {'name': '7-Zip 23.01 (x64)', 'version': '23.01', 'publisher': 'Igor Pavlov'},
+        ])
+        Computer.objects.get(serial_number='SN-3').delete()
+
+        self.assertEqual(self.counts(), [
+            ('7-Zip', '*', 3), ('7-Zip', '22.01', 1), ('7-Zip', '23.01', 2),
+            ('Google Chrome', '*', 2), ('Google Chrome', '120.0', 2),
+        ])
+        self.assertEqual(reconcile_software_rollups(), 0)
+
+
+class SaveSoftwareTests(TestCase):
+    """Vérifie que les modifications hors synchronisation tiennent à jour les index dérivés"""
+
+    def setUp(self):
+        # Les identifiants mis en cache après validation disparaissent avec la transaction du test
+        self.addCleanup(software_catalog.clear)
+
+    def test_edit_and_delete_keep_derived_state(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1'}, [
+                {'name': 'Google Chrome', 'version': '120.0', 'publisher': 'Google LLC'},
+                {'name': 'Google Chrome (x64)', 'version': '120.0', 'publisher': 'Google LLC'},
+            ])
+        computer_id = Computer.objects.get().id
+        software = Software.objects.get(name='Google Chrome (x64)')
+
+        # La version 120.0 reste présente : un autre logiciel y est rattaché
+        software.version = '121.0'
+        with self.captureOnCommitCallbacks(execute=True):
+            save_software(software)
+        self.assertEqual(software.product_version.version, '121.0')
+        self.assertEqual(bitmap_ids(evaluate('"Google Chrome" < 121')), [computer_id])
+        self.assertEqual(bitmap_ids(evaluate('"Google Chrome" >= 121')), [computer_id])
+        self.assertEqual(
+            [(period.version, period.valid_to is None) for period in software.history.order_by('id')],
+            [('120.0', False), ('121.0', True)]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            save_software(Software.objects.get(name='Google Chrome'), delete=True)
+        self.assertEqual(bitmap_ids(evaluate('"Google Chrome" < 121')), [])
+        self.assertEqual(reconcile_software_rollups(), 0)
+
+    def test_rest_create_update_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1'}, [
+                {'name': 'Google Chrome', 'version': '120.0', 'publisher': 'Google LLC'},
+            ])
+        computer_id = Computer.objects.get().id
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/software/', {
+                'computer': computer_id, 'name': 'Google Chrome (x64)', 'version': '120.0', 'publisher': 'Google LLC',
+                'install_date': '2024-01-15',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        software_id = response.data['id']
+        self.assertEqual(Software.objects.get(id=software_id).product_version.version, '120.0')
+
+        # Désactivation d'un des deux logiciels : la version reste installée
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f'/api/software/{software_id}/', {'is_active': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(bitmap_ids(evaluate('"Google Chrome" = 120.0')), [computer_id])
+        self.assertFalse(SoftwareInstallHistory.objects.filter(software_id=software_id, valid_to__isnull=True).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete(f'/api/software/{Software.objects.get(name="Google Chrome").id}/')
+        self.assertEqual(bitmap_ids(evaluate('"Google Chrome"')), [])
+        self.assertEqual(reconcile_software_rollups(), 0)
+
+
+    def test_admin_edit_and_bulk_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1'}, [
+                {'name': 'Google Chrome', 'version': '120.0', 'publisher': 'Google LLC'},
+                {'name': 'Google Chrome (x64)', 'version': '120.0', 'publisher': 'Google LLC'},
+            ])
+        computer_id = Computer.objects.get().id
+        software = Software.objects.get(name='Google Chrome (x64)')
+        self.client.force_login(User.objects.create_superuser('admin'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/admin/inventory/software/{software.id}/change/', {
+                'computer': computer_id, 'name': software.name, 'version': '121.0', 'publisher': 'Google LLC',
+                'install_date': 'Unknown', 'is_active': 'on',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Software.objects.get(id=software.id).product_version.version, '121.0')
+        self.assertEqual(bitmap_ids(evaluate('"Google Chrome" >= 121')), [computer_id])
+        self.assertEqual(bitmap_ids(evaluate('"Google Chrome" < 121')), [computer_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/inventory/software/', {
+                'action': 'delete_selected', 'post': 'yes',
+                '_selected_action': list(Software.objects.values_list('id', flat=True)),
+            })
+        self.assertFalse(Software.all_objects.exists())
+        self.assertEqual(bitmap_ids(evaluate('"Google Chrome"')), [])
+        self.assertEqual(reconcile_software_rollups(), 0)
+
+class SearchTests(TestCase):
+    """Vérifie que l'index de recherche suit les ingestions"""
+
+    def test_search_follows_ingest(self):
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'compta-pc01', 'currentUser': 'jdupont'}, [
+            {'name': 'AnyDesk', 'version': '8.0', 'publisher': 'AnyDesk Software GmbH'},
+        ])
+        results = search('anydesk')
+        self.assertEqual([product['name'] for product in results['products']], ['AnyDesk'])
+        self.assertEqual([computer['hostname'] for computer in results['installed_on']], ['compta-pc01'])
+        self.assertEqual([computer['hostname'] for computer in search('dupont')['computers']], ['compta-pc01'])
+
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'rh-pc02'})
+        self.assertEqual(search('compta')['computers'], [])
+        self.assertEqual([computer['hostname'] for computer in search('rh')['computers']], ['rh-pc02'])
+
+
+    def test_filter_is_not_capped(self):
+        for number in range(3):
+            ingest_inventory({'serialNumber': f'SN-{number}', 'hostname': f'compta-pc{number}'})
+        ingest_inventory({'serialNumber': 'SN-9', 'hostname': 'rh-pc09'})
+        self.client.force_login(User.objects.create_user('user'))
+        with mock.patch('inventory.search.MAX_MATCHES', 1):
+            response = self.client.get('/api/computers/', {'search': 'compta'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(computer['hostname'] for computer in response.json()['results']), ['compta-pc0', 'compta-pc1', 'compta-pc2'])
+
+class PresenceTests(TestCase):
+    """Vérifie que les bitmaps de présence suivent les ingestions"""
+
+    def ingest(self, serial_number, software):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_inventory({'serialNumber': serial_number, 'hostname': serial_number}, [
+                {'name': name, 'version': version, 'publisher': 'Éditeur'} for name, version in software
+            ])
+        return Computer.objects.get(serial_number=serial_number).id
+
+    def test_compliance_follows_ingest(self):
+        first = self.ingest('SN-1', [('EDR', '2.1'), ('Chrome', '119.0')])
+        second = self.ingest('SN-2', [('Chrome', '120.1')])
+        self.assertEqual(bitmap_ids(evaluate('NOT "EDR"')), [second])
+        self.assertEqual(bitmap_ids(evaluate('"Chrome" >= 120 OR "EDR" < 2.10')), [first, second])
+
+        # Désinstallation de l'agent : l'ordinateur devient non conforme
+        self.ingest('SN-1', [('Chrome', '119.0')])
+        self.assertEqual(bitmap_ids(evaluate('NOT "EDR" AND "Chrome"')), [first, second])
+
+
+class VulnerabilityTests(TestCase):
+    """Vérifie le rapprochement des logiciels installés et du catalogue des vulnérabilités"""
+
+    def findings(self):
+        return sorted(VulnerabilityFinding.objects.values_list('computer__hostname', 'vulnerability__identifier'))
+
+    def test_findings_follow_import_and_ingest(self):
+        chrome = {'name': 'Google Chrome', 'publisher': 'Google LLC'}
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1'}, [{**chrome, 'version': '119.0.6045.105'}])
+        import_vulnerabilities([{
+            'id': 'CVE-2023-6345',
+            'severity': 'critical',
+            'affected': [{'product': 'google chrome', 'publisher': 'Google', 'versionEndExcluding': '119.0.6045.199'}],
+        }])
+        self.assertEqual(self.findings(), [('pc-1', 'CVE-2023-6345')])
+
+        # Nouvel ordinateur rapproché à l'ingestion, mise à jour corrigeant la vulnérabilité
+        ingest_inventory({'serialNumber': 'SN-2', 'hostname': 'pc-2'}, [{**chrome, 'version': '118.0'}])
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1'}, [{**chrome, 'version': '120.0.6099.71'}])
+        self.assertEqual(self.findings(), [('pc-2', 'CVE-2023-6345')])
+
+    def test_versioned_product_line_matches_family_advisories(self):
+        ingest_inventory({'serialNumber': 'SN-1', 'hostname': 'pc-1'}, [
+            {'name': 'Python 3.11.4 (64-bit)', 'version': '3.11.4', 'publisher': 'Python Software Foundation'},
+        ])
+        import_vulnerabilities([{
+            'id': 'CVE-2023-40217',
+            'severity': 'medium',
+            'affected': [{'product': 'python', 'versionStartIncluding': '3.11.0', 'versionEndExcluding': '3.11.5'}],
+        }])
+        self.assertEqual(self.findings(), [('pc-1', 'CVE-2023-40217')])
+
+    def test_long_identifiers_are_rejected(self):
+        prefix = 'GHSA-' + 'x' * 59
+        with self.assertRaisesMessage(ValueError, 'identifiant de plus de 64 caractères'):
+            import_vulnerabilities([{'id': prefix + '1'}, {'id': prefix + '2'}])
+        import_vulnerabilities([{'id': prefix}])
+        self.assertEqual(list(Vulnerability.objects.values_list('identifier', flat=True)), [prefix])
+
+
+class ProfilingTests(TestCase):
+    """Vérifie l'autorisation du profilage à la demande"""
+
+    config = {'TOKEN': 'secret', 'SAMPLE_RATE': 0.0}
+
+    def requested(self, user=None, **headers):
+        request = RequestFactory().get('/api/computers/', headers={'X-Profile': 'cprofile', **headers})
+        request.user = user or AnonymousUser()
+        return requested_profile(request, self.config)
+
+    @override_settings(DEBUG=False)
+    def test_token_or_staff_session(self):
+        self.assertEqual(self.requested(), (False, False))
+        self.assertEqual(self.requested(**{'X-Profile-Token': 'secrets'}), (False, False))
+        self.assertEqual(self.requested(**{'X-Profile-Token': 'é'}), (False, False))
+        self.assertEqual(self.requested(**{'X-Profile-Token': 'secret'}), (True, True))
+        self.assertEqual(self.requested(User.objects.create_user('staff', is_staff=True)), (True, True))
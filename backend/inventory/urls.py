@@ -10,7 +10,13 @@ from . import views
 router = DefaultRouter()
 router.register(r'computers', views.ComputerViewSet)
 router.register(r'software', views.SoftwareViewSet)
+router.register(r'products', views.SoftwareProductViewSet, basename='product')
 router.register(r'logs', views.InventoryLogViewSet)
+router.register(r'search', views.SearchViewSet, basename='search')
+router.register(r'compliance', views.ComplianceViewSet, basename='compliance')
+router.register(r'vulnerabilities', views.VulnerabilityViewSet)
+router.register(r'findings', views.VulnerabilityFindingViewSet)
+router.register(r'rollups', views.SoftwareRollupViewSet)
 
 app_name = 'inventory'
 
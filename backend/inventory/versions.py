@@ -0,0 +1,103 @@
+"""
+Clés de tri des versions de logiciels
+
+`Software.version` est un texte libre (« 120.0.6099.130 », « 8u301 »,
+« 2.1.0-beta2 », « 1.1.1k », « 7.2 (x64) »). `version_key` le convertit en
+une chaîne dont l'ordre lexicographique est l'ordre des versions ; elle est
+stockée dans une colonne indexée (`version_key`) pour que les filtres
+« version < 120.0.6099 » deviennent des parcours d'intervalle de l'index.
+
+Format de la clé :
+
+- chaque segment numérique sur 12 chiffres, séparés par « . », les zéros
+  finaux supprimés (1.2 = 1.2.0) ;
+- une pré-version (dev, alpha, beta, rc) ajoute « ! » et son rang, une
+  post-version (patch, update, service pack, lettre finale) ajoute « + » ;
+- « # » termine la clé.
+
+Comme « ! » < « # » < « + » < « . », on obtient
+1.2-beta < 1.2-rc1 < 1.2 < 1.2u5 < 1.2.1. Une version sans aucun chiffre
+(« Unknown ») a une clé vide, exclue des filtres d'intervalle.
+"""
+
+import re
+
+SEGMENT_DIGITS = 12
+MAX_SEGMENT = 10 ** SEGMENT_DIGITS - 1
+
+# Longueur de la colonne version_key
+MAX_KEY_LENGTH = 255
+
+PRE_RELEASE = '!'
+POST_RELEASE = '+'
+SEPARATOR = '.'
+TERMINATOR = '#'
+
+# Étiquettes de pré-version -> rang
+PRE_RELEASE_TAGS = {
+    'dev': 1, 'snapshot': 1, 'nightly': 1,
+    'a': 2, 'alpha': 2,
+    'b': 3, 'beta': 3,
+    'c': 4, 'pre': 4, 'preview': 4, 'rc': 4,
+}
+
+# Étiquettes de post-version (correctif, mise à jour Java « 8u301 », service pack, build)
+POST_RELEASE_TAGS = {'p', 'patch', 'post', 'sp', 'u', 'update', 'r', 'rev', 'build', 'hotfix', 'fix'}
+
+# Particularités des éditeurs retirées avant l'analyse : métadonnées semver,
+# texte entre parenthèses ou crochets, architecture
+IGNORED_PATTERNS = [
+    re.compile(r'\+.*$'),
+    re.compile(r'\(.*?\)|\[.*?\]'),
+    re.compile(r'\b(?:x86[-_]64|x64|x86|amd64|arm64|aarch64|win32|win64|i[3-6]86|(?:32|64)[- ]?bits?)\b'),
+]
+PREFIX_PATTERN = re.compile(r'^\s*(?:version|ver|v)\.?\s*(?=\d)')
+TOKEN_PATTERN = re.compile(r'\d+|[a-z]+')
+
+
+def segment(number):
+    return str(min(number, MAX_SEGMENT)).zfill(SEGMENT_DIGITS)
+
+
+def trim_zeros(numbers):
+    while numbers and numbers[-1] == 0:
+        numbers = numbers[:-1]
+    return numbers
+
+
+def version_key(version):
+    """Clé de tri d'une version (chaîne vide si elle ne contient aucun chiffre)"""
+    text = (version or '').strip().lower()
+    for pattern in IGNORED_PATTERNS:
+        text = pattern.sub(' ', text)
+    text = PREFIX_PATTERN.sub('', text)
+    tokens = TOKEN_PATTERN.findall(text)
+
+    release = []
+    tag = None
+    tag_numbers = []
+    for index, token in enumerate(tokens):
+        if token.isdigit():
+            if tag is None:
+                release.append(int(token))
+            else:
+                tag_numbers.append(int(token))
+        elif tag is not None or not release:
+            # Une seule étiquette ; un texte avant le premier chiffre est ignoré
+            continue
+        elif token in PRE_RELEASE_TAGS and not (len(token) == 1 and index == len(tokens) - 1):
+            tag = PRE_RELEASE + str(PRE_RELEASE_TAGS[token])
+        elif token in POST_RELEASE_TAGS:
+            tag = POST_RELEASE + '0'
+        elif len(token) == 1 and index == len(tokens) - 1:
+            # Lettre finale de correctif (OpenSSL 1.1.1k)
+            tag = POST_RELEASE + '1'
+            tag_numbers.append(ord(token) - ord('a') + 1)
+    if not release:
+        return ''
+
+    release = trim_zeros(release) or [0]
+    key = SEPARATOR.join(segment(number) for number in release)
+    if tag is not None:
+        key += tag + ''.join(SEPARATOR + segment(number) for number in trim_zeros(tag_numbers))
+    return (key + TERMINATOR)[:MAX_KEY_LENGTH]
@@ -2,129 +2,529 @@
 Vues Django REST Framework
 """
 
+import hashlib
+import json
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django_filters import rest_framework as filters
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db.models import F
+from django_filters.rest_framework import DjangoFilterBackend
+from django.core.serializers.json import DjangoJSONEncoder
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags, quote_etag
+
+from .models import (
+    Computer, Software, InventoryLog, SoftwareProduct, SoftwareVersion, ComputerSnapshot, Vulnerability,
+    VulnerabilityFinding, SoftwareRollup,
+)
+from .history import software_as_of, software_changes
+from .ingest import save_software
+from .snapshots import record_changes, reconstruct
+from .compliance import ExpressionError, compliance
+from .filters import ComputerFilter, SoftwareFilter, SoftwareRollupFilter
+from .pagination import keyset_page
+from .search import search
+from .serializers import (
+    ComputerSerializer, ComputerListSerializer, SoftwareSerializer, SoftwareListSerializer,
+    InventoryLogSerializer, InventoryLogListSerializer, VulnerabilitySerializer, VulnerabilityListSerializer,
+    VulnerabilityFindingListSerializer, SoftwareRollupListSerializer,
+)
+from .statistics import dashboard_statistics, fleet_counters, update_fleet_statistics
+
+# Colonnes retournées pour l'historique des installations
+HISTORY_FIELDS = ['id', 'computer_id', 'product_id', 'name', 'version', 'publisher', 'valid_from', 'valid_to']
+
+# Nombre maximal de périodes retournées par /api/software/changes/
+HISTORY_MAX_RESULTS = 10000
+
+# Colonnes et tri (total, servi par un index) des listes imbriquées d'un ordinateur
+SOFTWARE_LIST_FIELDS = ['id', 'name', 'version', 'publisher', 'install_date', 'detection_date']
+COMPUTER_SOFTWARE_ORDERING = ['name', 'version']
+LOG_LIST_FIELDS = ['id', 'log_type', 'message', 'details', 'created_at']
+COMPUTER_LOGS_ORDERING = ['-created_at', '-id']
+
+TRUE_VALUES = ('1', 'true', 'True')
+
+# Nombre maximal de résultats par section de /api/search/
+SEARCH_MAX_RESULTS = 100
+
+# Nombre maximal d'ordinateurs listés par /api/compliance/
+COMPLIANCE_MAX_RESULTS = 10000
+
+# Niveaux de /api/rollups/ : total par produit ou détail par version
+ROLLUP_LEVELS = ('product', 'version')
+
+
+def parse_datetime_param(value):
+    """Convertit un paramètre de requête en datetime (ISO 8601), None si absent ou invalide"""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
 
-from .models import Computer, Software, InventoryLog
+def filter_date_range(queryset, field, params):
+    """Filtre `field` sur les paramètres `since` / `until` (ISO 8601), ValueError s'ils sont invalides"""
+    for param, lookup in (('since', 'gte'), ('until', 'lt')):
+        if params.get(param):
+            value = parse_datetime_param(params[param])
+            if value is None:
+                raise ValueError(f"Paramètre '{param}' invalide")
+            queryset = queryset.filter(**{f'{field}__{lookup}': value})
+    return queryset
 
 
-class ComputerFilter(filters.FilterSet):
-    """Filtres pour les ordinateurs"""
+def nested_page(request, queryset, ordering, fields):
+    """
+    Page d'une liste projetée sur `fields`, paginée par curseur.
+
+    Le total n'est compté que sur demande (`count=1`), sauf lorsque la première
+    page contient toutes les lignes : il est alors connu sans requête
+    supplémentaire. Retourne (page, total ou None).
+    """
+    params = request.query_params
+    cursor = params.get('cursor') or None
+    try:
+        size = int(params['page_size']) if params.get('page_size') else None
+    except ValueError:
+        raise ValueError("Paramètre 'page_size' invalide")
+    page = keyset_page(queryset.values(*fields), ordering, first=size, after=cursor)
+
+    if not cursor and not page.has_next:
+        count = len(page.rows)
+    elif params.get('count') in TRUE_VALUES:
+        count = queryset.count()
+    else:
+        count = None
+    return page, count
+
+
+class ValuesListMixin:
+    """
+    Listes lues avec values() : seules les colonnes de `list_serializer_class`
+    (`fields=`, `expand=`) et les colonnes de tri sont sélectionnées. Les
+    autres actions utilisent `serializer_class` et des instances complètes.
+
+    Les listes sont paginées par curseur dans l'ordre `keyset_ordering`
+    (KeysetPagination) ; le paramètre `ordering` n'est pas proposé.
+    """
+    
+    list_serializer_class = None
+    keyset_ordering = ['id']
+    filter_backends = [DjangoFilterBackend]
     
-    hostname = filters.CharFilter(lookup_expr='icontains')
-    manufacturer = filters.CharFilter(lookup_expr='icontains')
-    model = filters.CharFilter(lookup_expr='icontains')
-    current_user = filters.CharFilter(lookup_expr='icontains')
-    is_active = filters.BooleanFilter()
-    last_seen_after = filters.DateTimeFilter(field_name='last_seen', lookup_expr='gte')
-    last_seen_before = filters.DateTimeFilter(field_name='last_seen', lookup_expr='lte')
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return self.list_serializer_class
+        return super().get_serializer_class()
     
-    class Meta:
-        model = Computer
-        fields = ['hostname', 'manufacturer', 'model', 'current_user', 'is_active']
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            fields = self.list_serializer_class.selected_fields(
+                self.request.query_params,
+                required=[field.lstrip('-') for field in self.keyset_ordering]
+            )
+            queryset = queryset.values(*fields)
+        return queryset
 
 
-class ComputerViewSet(viewsets.ModelViewSet):
+class ComputerViewSet(ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet pour les ordinateurs"""
     
     queryset = Computer.objects.all()
+    serializer_class = ComputerSerializer
+    list_serializer_class = ComputerListSerializer
+    # Ordre croissant : un ordinateur modifié pendant un parcours complet est
+    # retrouvé plus loin au lieu d'être manqué
+    keyset_ordering = ['updated_at', 'id']
     permission_classes = [IsAuthenticated]
     filterset_class = ComputerFilter
     
+    def perform_create(self, serializer):
+        """Crée l'ordinateur, son historique matériel/réseau et ses statistiques"""
+        computer = serializer.save()
+        update_fleet_statistics((), fleet_counters(computer))
+        record_changes(computer, {
+            'hardware_info': computer.hardware_info,
+            'network_info': computer.network_info,
+        }, computer.created_at, created=True)
+    
+    def perform_update(self, serializer):
+        """Historise le matériel/réseau modifié et met à jour les statistiques (désactivation, ...)"""
+        computer = serializer.instance
+        counters = fleet_counters(computer)
+        record_changes(computer, {
+            field: serializer.validated_data[field]
+            for field in ('hardware_info', 'network_info') if field in serializer.validated_data
+        }, timezone.now())
+        computer = serializer.save()
+        update_fleet_statistics(counters, fleet_counters(computer))
+    
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
-        """Vue dashboard avec statistiques"""
-        total_computers = Computer.objects.count()
-        active_computers = Computer.objects.filter(is_active=True).count()
-        recent_computers = Computer.objects.filter(
-            last_seen__gte=timezone.now() - timedelta(days=7)
-        ).count()
-        
-        # Top fabricants
-        top_manufacturers = Computer.objects.values('manufacturer').annotate(
-            count=Count('id')
-        ).order_by('-count')[:5]
-        
-        # Top modèles
-        top_models = Computer.objects.values('model').annotate(
-            count=Count('id')
-        ).order_by('-count')[:5]
+        """Vue dashboard avec statistiques (compteurs pré-calculés, réponse cachable)"""
+        statistics = dashboard_statistics()
+        etag = quote_etag(hashlib.md5(
+            json.dumps(statistics, cls=DjangoJSONEncoder, sort_keys=True).encode()
+        ).hexdigest())
         
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(statistics)
+        response['ETag'] = etag
+        patch_cache_control(
+            response, private=True, max_age=getattr(settings, 'INVENTORY_DASHBOARD_MAX_AGE', 30)
+        )
+        return response
+    
+    def get_computer_header(self):
+        """Ordinateur de l'URL, sans charger les champs JSON"""
+        computer = get_object_or_404(self.get_queryset().only('id', 'hostname'), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, computer)
+        return computer
+    
+    @action(detail=True, methods=['get'])
+    def software(self, request, pk=None):
+        """
+        Logiciels d'un ordinateur, paginés par curseur (`page_size`, `cursor`).
+        Filtres : `name` (préfixe), `source` (préfixe), `since`/`until` (date de
+        détection), `include_inactive`.
+        """
+        computer = self.get_computer_header()
+        if request.query_params.get('include_inactive') in TRUE_VALUES:
+            queryset = Software.all_objects.filter(computer=computer)
+        else:
+            queryset = Software.objects.filter(computer=computer)
+        if request.query_params.get('name'):
+            queryset = queryset.filter(name__startswith=request.query_params['name'])
+        if request.query_params.get('source'):
+            queryset = queryset.filter(source__startswith=request.query_params['source'])
+        try:
+            queryset = filter_date_range(queryset, 'detection_date', request.query_params)
+            page, count = nested_page(request, queryset, COMPUTER_SOFTWARE_ORDERING, SOFTWARE_LIST_FIELDS)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({
-            'total_computers': total_computers,
-            'active_computers': active_computers,
-            'recent_computers': recent_computers,
-            'top_manufacturers': top_manufacturers,
-            'top_models': top_models,
+            'computer': computer.hostname,
+            'software_count': count,
+            'software_list': page.rows,
+            'has_next': page.has_next,
+            'next_cursor': page.end_cursor if page.has_next else None,
         })
     
     @action(detail=True, methods=['get'])
-    def software(self, request, pk=None):
-        """Liste les logiciels d'un ordinateur"""
+    def software_as_of(self, request, pk=None):
+        """Logiciels installés sur l'ordinateur à la date `at` (ISO 8601)"""
+        at = parse_datetime_param(request.query_params.get('at'))
+        if at is None:
+            return Response({'error': "Paramètre 'at' manquant ou invalide"}, status=status.HTTP_400_BAD_REQUEST)
         computer = self.get_object()
-        software_list = computer.software_list.all()
+        software_list = software_as_of(computer.id, at).values(*HISTORY_FIELDS)
         return Response({
             'computer': computer.hostname,
-            'software_count': software_list.count(),
-            'software_list': [
-                {
-                    'id': software.id,
-                    'name': software.name,
-                    'version': software.version,
-                    'publisher': software.publisher,
-                    'install_date': software.install_date,
-                    'detection_date': software.detection_date
-                }
-                for software in software_list
-            ]
+            'at': at,
+            'software_list': list(software_list),
         })
     
     @action(detail=True, methods=['get'])
-    def logs(self, request, pk=None):
-        """Liste les logs d'un ordinateur"""
+    def snapshot(self, request, pk=None):
+        """État du matériel ou du réseau (`section`) à la date `at` (ISO 8601, dernier état si absente)"""
+        section = request.query_params.get('section', 'hardware')
+        if section not in ComputerSnapshot.SECTION_FIELDS:
+            return Response({'error': "Paramètre 'section' invalide"}, status=status.HTTP_400_BAD_REQUEST)
+        at = None
+        if request.query_params.get('at'):
+            at = parse_datetime_param(request.query_params['at'])
+            if at is None:
+                return Response({'error': "Paramètre 'at' invalide"}, status=status.HTTP_400_BAD_REQUEST)
         computer = self.get_object()
-        logs = computer.logs.all()
+        data, recorded_at = reconstruct(computer.id, section, at)
+        if recorded_at is None:
+            return Response({'error': "Aucun historique pour cette date"}, status=status.HTTP_404_NOT_FOUND)
         return Response({
             'computer': computer.hostname,
-            'logs_count': logs.count(),
-            'logs_list': [
-                {
-                    'id': log.id,
-                    'log_type': log.log_type,
-                    'message': log.message,
-                    'details': log.details,
-                    'created_at': log.created_at
-                }
-                for log in logs
-            ]
+            'section': section,
+            'recorded_at': recorded_at,
+            'data': data,
+        })
+    
+    @action(detail=True, methods=['get'])
+    def snapshots(self, request, pk=None):
+        """Dates des modifications du matériel et du réseau d'un ordinateur"""
+        computer = self.get_object()
+        queryset = ComputerSnapshot.objects.filter(computer=computer)
+        section = request.query_params.get('section')
+        if section:
+            queryset = queryset.filter(section=section)
+        return Response({
+            'computer': computer.hostname,
+            'snapshots': list(
+                queryset.order_by('-created_at', '-sequence')
+                .values('id', 'section', 'sequence', 'is_keyframe', 'created_at')
+            ),
+        })
+    
+    @action(detail=True, methods=['get'])
+    def logs(self, request, pk=None):
+        """
+        Logs d'un ordinateur, du plus récent au plus ancien, paginés par curseur
+        (`page_size`, `cursor`). Filtres : `log_type`, `since`/`until`.
+        """
+        computer = self.get_computer_header()
+        queryset = InventoryLog.objects.filter(computer=computer)
+        if request.query_params.get('log_type'):
+            queryset = queryset.filter(log_type=request.query_params['log_type'])
+        try:
+            queryset = filter_date_range(queryset, 'created_at', request.query_params)
+            page, count = nested_page(request, queryset, COMPUTER_LOGS_ORDERING, LOG_LIST_FIELDS)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'computer': computer.hostname,
+            'logs_count': count,
+            'logs_list': page.rows,
+            'has_next': page.has_next,
+            'next_cursor': page.end_cursor if page.has_next else None,
         })
 
 
-class SoftwareViewSet(viewsets.ModelViewSet):
+class SoftwareViewSet(ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet pour les logiciels"""
     
     queryset = Software.objects.all()
+    serializer_class = SoftwareSerializer
+    list_serializer_class = SoftwareListSerializer
     permission_classes = [IsAuthenticated]
+    filterset_class = SoftwareFilter
     
     def get_queryset(self):
-        """Filtre par ordinateur si spécifié"""
-        queryset = Software.objects.all()
+        """Filtre par ordinateur si spécifié (logiciels désinstallés exclus sauf include_inactive)"""
+        if self.request.query_params.get('include_inactive') in TRUE_VALUES:
+            queryset = Software.all_objects.all()
+        else:
+            queryset = Software.objects.all()
         computer_id = self.request.query_params.get('computer_id', None)
         if computer_id:
             queryset = queryset.filter(computer_id=computer_id)
         return queryset
+    
+    def perform_create(self, serializer):
+        """Crée le logiciel et met à jour le catalogue et les index dérivés"""
+        serializer.instance = save_software(Software(**serializer.validated_data))
+    
+    def perform_update(self, serializer):
+        """Enregistre le logiciel et met à jour le catalogue et les index dérivés"""
+        for field, value in serializer.validated_data.items():
+            setattr(serializer.instance, field, value)
+        save_software(serializer.instance)
+    
+    def perform_destroy(self, instance):
+        save_software(instance, delete=True)
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Installations et désinstallations entre `since` et `until` (ISO 8601)"""
+        since = parse_datetime_param(request.query_params.get('since'))
+        if since is None:
+            return Response({'error': "Paramètre 'since' manquant ou invalide"}, status=status.HTTP_400_BAD_REQUEST)
+        until = parse_datetime_param(request.query_params.get('until'))
+        try:
+            limit = min(int(request.query_params.get('limit', 1000)), HISTORY_MAX_RESULTS)
+        except ValueError:
+            limit = 1000
+        changes = software_changes(since, until, request.query_params.get('computer_id'))
+        return Response({
+            'since': since,
+            'until': until,
+            'changes': list(changes.values(*HISTORY_FIELDS)[:limit]),
+        })
+
+
+class SoftwareProductViewSet(viewsets.ViewSet):
+    """ViewSet pour le catalogue des produits logiciels"""
+    
+    permission_classes = [IsAuthenticated]
+    lookup_value_regex = '[0-9]+'
+    
+    def list(self, request):
+        """Liste les produits du catalogue (filtre `name` par préfixe)"""
+        queryset = SoftwareProduct.objects.all()
+        name = request.query_params.get('name', None)
+        if name:
+            queryset = queryset.filter(name__istartswith=name)
+        return Response(list(queryset.values('id', 'name', 'publisher')[:500]))
+    
+    def retrieve(self, request, pk=None):
+        """Détail d'un produit avec ses versions"""
+        product = SoftwareProduct.objects.filter(pk=pk).values('id', 'name', 'publisher').first()
+        if product is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        product['versions'] = list(
+            SoftwareVersion.objects.filter(product_id=pk).values('id', 'version')
+        )
+        return Response(product)
+    
+    @action(detail=True, methods=['get'])
+    def computers(self, request, pk=None):
+        """Ordinateurs sur lesquels le produit est installé (filtre `version_id`)"""
+        installations = Software.objects.filter(product_id=pk)
+        version_id = request.query_params.get('version_id', None)
+        if version_id:
+            installations = installations.filter(product_version_id=version_id)
+        computers = Computer.objects.filter(
+            id__in=installations.values('computer_id')
+        ).values('id', 'hostname', 'serial_number')
+        return Response({
+            'product_id': int(pk),
+            'computers': list(computers),
+        })
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """Recherche plein texte sur les ordinateurs et le catalogue des logiciels"""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def list(self, request):
+        """Résultats classés pour `q` (`limit` par section, 20 par défaut)"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': "Paramètre 'q' manquant"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), SEARCH_MAX_RESULTS))
+        except ValueError:
+            limit = 20
+        return Response(search(query, limit))
+
+
+class ComplianceViewSet(viewsets.ViewSet):
+    """Ordinateurs satisfaisant une expression sur les logiciels installés (voir compliance.py)"""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def list(self, request):
+        """Nombre et liste (`limit`, 100 par défaut) des ordinateurs satisfaisant `expr`"""
+        expression = request.query_params.get('expr', '').strip()
+        if not expression:
+            return Response({'error': "Paramètre 'expr' manquant"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(0, min(int(request.query_params.get('limit', 100)), COMPLIANCE_MAX_RESULTS))
+        except ValueError:
+            limit = 100
+        try:
+            return Response(compliance(expression, limit))
+        except ExpressionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class VulnerabilityViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    """ViewSet pour le catalogue local des vulnérabilités"""
+    
+    queryset = Vulnerability.objects.all()
+    serializer_class = VulnerabilitySerializer
+    list_serializer_class = VulnerabilityListSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        """Filtre par sévérité si spécifiée"""
+        queryset = Vulnerability.objects.all()
+        severity = self.request.query_params.get('severity', None)
+        if severity:
+            queryset = queryset.filter(severity=severity)
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('ranges')
+        return queryset
+
+
+class VulnerabilityFindingViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    """ViewSet pour les logiciels vulnérables détectés sur le parc"""
+    
+    queryset = VulnerabilityFinding.objects.all()
+    list_serializer_class = VulnerabilityFindingListSerializer
+    serializer_class = VulnerabilityFindingListSerializer
+    keyset_ordering = ['-id']
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        """Filtre par ordinateur, produit, vulnérabilité (identifiant) et sévérité si spécifiés"""
+        queryset = VulnerabilityFinding.objects.annotate(
+            hostname=F('computer__hostname'),
+            identifier=F('vulnerability__identifier'),
+            severity=F('vulnerability__severity'),
+        )
+        params = self.request.query_params
+        if params.get('computer_id'):
+            queryset = queryset.filter(computer_id=params['computer_id'])
+        if params.get('product_id'):
+            queryset = queryset.filter(product_id=params['product_id'])
+        if params.get('vulnerability'):
+            queryset = queryset.filter(vulnerability__identifier=params['vulnerability'])
+        if params.get('severity'):
+            queryset = queryset.filter(vulnerability__severity=params['severity'])
+        return queryset
+    
+    def retrieve(self, request, pk=None):
+        fields = self.list_serializer_class.selected_fields(request.query_params)
+        finding = self.get_queryset().filter(pk=pk).values(*fields).first()
+        if finding is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(finding)
+
+
+class SoftwareRollupViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Nombres d'installations pré-calculés (voir rollups.py), du plus installé au
+    moins installé : par produit, ou par version avec `level=version`.
+    """
+    
+    queryset = SoftwareRollup.objects.all()
+    list_serializer_class = SoftwareRollupListSerializer
+    serializer_class = SoftwareRollupListSerializer
+    keyset_ordering = ['-install_count', 'id']
+    permission_classes = [IsAuthenticated]
+    filterset_class = SoftwareRollupFilter
+    
+    def get_queryset(self):
+        """Compteurs non nuls du niveau demandé (`level`, 'product' par défaut)"""
+        level = self.request.query_params.get('level') or 'product'
+        if level not in ROLLUP_LEVELS:
+            raise ValidationError({'level': f"Niveau inconnu : {level} ({', '.join(ROLLUP_LEVELS)})"})
+        return SoftwareRollup.objects.filter(version__isnull=level == 'product', install_count__gt=0).annotate(
+            name=F('product__name'),
+            publisher=F('product__publisher'),
+            version_number=F('version__version'),
+            version_key=F('version__version_key'),
+        )
+    
+    def retrieve(self, request, pk=None):
+        fields = self.list_serializer_class.selected_fields(request.query_params)
+        rollup = self.get_queryset().filter(pk=pk).values(*fields).first()
+        if rollup is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(rollup)
 
 
-class InventoryLogViewSet(viewsets.ReadOnlyModelViewSet):
+class InventoryLogViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet pour les logs d'inventaire"""
     
     queryset = InventoryLog.objects.all()
+    serializer_class = InventoryLogSerializer
+    list_serializer_class = InventoryLogListSerializer
+    keyset_ordering = ['-created_at', '-id']
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
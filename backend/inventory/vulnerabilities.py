@@ -0,0 +1,335 @@
+"""
+Rapprochement d'un catalogue local de vulnérabilités et des logiciels installés
+
+Le catalogue (Vulnerability, VulnerableRange) est importé depuis un fichier
+JSON par `manage.py import_vulnerabilities`. Chaque intervalle désigne un
+produit par son nom (et éventuellement son éditeur) et des bornes de
+versions, à la manière des configurations CPE :
+
+    {"id": "CVE-2023-6345", "severity": "critical", "cvss": 9.6,
+     "summary": "...", "published": "2023-11-29T00:00:00Z",
+     "affected": [{"product": "Google Chrome", "publisher": "Google",
+                   "versionEndExcluding": "119.0.6045.199"}]}
+
+Les intervalles sont chargés une fois par processus dans un index trié par
+borne de début, par nom de produit : une version est comparée, par clé de
+version (versions.py), aux seuls intervalles qui commencent avant elle.
+
+Les correspondances sont enregistrées dans VulnerabilityFinding. Un nouveau
+logiciel (ou un logiciel réinstallé) est rapproché dès son ingestion ; un
+logiciel désinstallé perd ses correspondances. Après un import, tout le parc
+est rapproché à nouveau, version du catalogue par version du catalogue.
+"""
+
+import json
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .canonical import canonical_name, canonical_publisher, product_family
+from .models import Software, SoftwareProduct, SoftwareVersion, Vulnerability, VulnerabilityFinding, VulnerableRange
+from .versions import version_key
+
+# Taille des lots de lecture et d'écriture
+BATCH_SIZE = 500
+
+# Champs d'un intervalle importé (noms des configurations CPE)
+START_INCLUDING = 'versionStartIncluding'
+START_EXCLUDING = 'versionStartExcluding'
+END_INCLUDING = 'versionEndIncluding'
+END_EXCLUDING = 'versionEndExcluding'
+
+SEVERITIES = {choice for choice, _ in Vulnerability.SEVERITY_CHOICES}
+IDENTIFIER_MAX_LENGTH = Vulnerability._meta.get_field('identifier').max_length
+
+AffectedRange = namedtuple(
+    'AffectedRange', 'start_key start_inclusive end_key end_inclusive publisher vulnerability_id'
+)
+
+
+def batches(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def range_contains(affected, key):
+    """Vrai si la clé de version est dans l'intervalle (version inconnue : intervalle sans bornes uniquement)"""
+    if not key:
+        return not affected.start_key and not affected.end_key
+    if affected.start_key and (key < affected.start_key or (key == affected.start_key and not affected.start_inclusive)):
+        return False
+    if affected.end_key and (key > affected.end_key or (key == affected.end_key and not affected.end_inclusive)):
+        return False
+    return True
+
+
+class ProductRanges:
+    """Intervalles d'un produit triés par borne de début"""
+
+    def __init__(self, ranges):
+        self.ranges = sorted(ranges)
+        self.starts = [affected.start_key for affected in self.ranges]
+
+    def match(self, publisher, key):
+        """Identifiants des vulnérabilités affectant cette version"""
+        publisher = publisher.lower()
+        # Seuls les intervalles commençant au plus tard à cette version peuvent la contenir
+        candidates = self.ranges[:bisect_right(self.starts, key)]
+        return {
+            affected.vulnerability_id for affected in candidates
+            if (not affected.publisher or affected.publisher in publisher) and range_contains(affected, key)
+        }
+
+
+class VulnerabilityMatcher:
+    """
+    Index des intervalles affectés par nom de produit, propre au processus.
+
+    Il est rechargé lorsque le catalogue change (nombre de vulnérabilités ou
+    date du dernier import), ce qui est vérifié en une requête.
+    """
+
+    def __init__(self):
+        self.revision = None
+        self.products = {}
+
+    def clear(self):
+        self.revision = None
+        self.products = {}
+
+    def refresh(self):
+        summary = Vulnerability.objects.aggregate(count=Count('id'), imported_at=Max('imported_at'))
+        revision = (summary['count'], summary['imported_at'])
+        if revision == self.revision:
+            return
+        ranges = defaultdict(list)
+        rows = VulnerableRange.objects.values_list(
+            'product_name', 'start_key', 'start_inclusive', 'end_key', 'end_inclusive', 'publisher',
+            'vulnerability_id'
+        )
+        for name, start_key, start_inclusive, end_key, end_inclusive, publisher, vulnerability_id in rows:
+            # Noms et éditeurs comparés sous leur forme canonique, comme le catalogue
+            ranges[canonical_name(name).lower()].append(AffectedRange(
+                start_key, start_inclusive, end_key, end_inclusive,
+                canonical_publisher(publisher).lower() if publisher else '', vulnerability_id
+            ))
+        self.products = {name: ProductRanges(product_ranges) for name, product_ranges in ranges.items()}
+        self.revision = revision
+
+    def product_ranges(self, name):
+        """Intervalles d'un produit (nom canonique), sous son nom ou celui de sa gamme sans version"""
+        product = self.products.get(name.lower())
+        if product is None:
+            product = self.products.get(product_family(name).lower())
+        return product
+
+    def match(self, name, publisher, key):
+        """Identifiants des vulnérabilités d'une version (nom et éditeur canoniques)"""
+        product = self.product_ranges(name)
+        if product is None:
+            return set()
+        return product.match(publisher, key)
+
+
+# Instance partagée par le processus
+vulnerability_matcher = VulnerabilityMatcher()
+
+
+def remove_findings(software_ids):
+    """Supprime les correspondances de logiciels désinstallés ou modifiés"""
+    software_ids = [software_id for software_id in software_ids if software_id is not None]
+    if software_ids:
+        VulnerabilityFinding.objects.filter(software_id__in=software_ids).delete()
+
+
+def match_software(software_list, now=None):
+    """Rapproche des logiciels nouvellement installés du catalogue, retourne le nombre de correspondances"""
+    software_list = list({software.id: software for software in software_list if software.is_active}.values())
+    if not software_list:
+        return 0
+    vulnerability_matcher.refresh()
+    if not vulnerability_matcher.products:
+        return 0
+    now = now or timezone.now()
+    findings = [
+        VulnerabilityFinding(
+            computer_id=software.computer_id,
+            software_id=software.id,
+            vulnerability_id=vulnerability_id,
+            product_id=software.product_id,
+            version=software.version,
+            detected_at=now,
+        )
+        for software in software_list if software.product_id is not None
+        for vulnerability_id in vulnerability_matcher.match(
+            software.canonical_name, software.canonical_publisher, software.version_key
+        )
+    ]
+    VulnerabilityFinding.objects.bulk_create(findings, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(findings)
+
+
+def vulnerable_versions():
+    """{id version du catalogue: {ids vulnérabilités}} pour tout le catalogue des logiciels"""
+    vulnerability_matcher.refresh()
+    products = {
+        product_id: (name, publisher)
+        for product_id, name, publisher in SoftwareProduct.objects.values_list('id', 'name', 'publisher').iterator()
+        if vulnerability_matcher.product_ranges(name) is not None
+    }
+    matches = {}
+    for product_ids in batches(products):
+        rows = SoftwareVersion.objects.filter(product_id__in=product_ids).values_list('id', 'product_id', 'version_key')
+        for version_id, product_id, key in rows:
+            vulnerability_ids = vulnerability_matcher.match(*products[product_id], key)
+            if vulnerability_ids:
+                matches[version_id] = vulnerability_ids
+    return matches
+
+
+@transaction.atomic
+def match_fleet(now=None):
+    """
+    Rapproche tous les logiciels installés du catalogue : les correspondances
+    manquantes sont créées, celles qui ne sont plus valables sont supprimées.
+    Retourne (créées, supprimées).
+    """
+    now = now or timezone.now()
+    matches = vulnerable_versions()
+
+    expected = {}
+    for version_ids in batches(matches):
+        rows = Software.objects.filter(product_version_id__in=version_ids).values_list(
+            'id', 'computer_id', 'product_id', 'product_version_id', 'version'
+        )
+        for software_id, computer_id, product_id, version_id, version in rows:
+            for vulnerability_id in matches[version_id]:
+                expected[(software_id, vulnerability_id)] = (computer_id, product_id, version)
+
+    obsolete = []
+    for finding_id, software_id, vulnerability_id in VulnerabilityFinding.objects.values_list(
+        'id', 'software_id', 'vulnerability_id'
+    ).iterator(chunk_size=10000):
+        if expected.pop((software_id, vulnerability_id), None) is None:
+            obsolete.append(finding_id)
+    for finding_ids in batches(obsolete):
+        VulnerabilityFinding.objects.filter(id__in=finding_ids).delete()
+
+    VulnerabilityFinding.objects.bulk_create(
+        [
+            VulnerabilityFinding(
+                computer_id=computer_id,
+                software_id=software_id,
+                vulnerability_id=vulnerability_id,
+                product_id=product_id,
+                version=version,
+                detected_at=now,
+            )
+            for (software_id, vulnerability_id), (computer_id, product_id, version) in expected.items()
+        ],
+        batch_size=BATCH_SIZE
+    )
+    return len(expected), len(obsolete)
+
+
+def affected_ranges(entry):
+    """Intervalles d'une vulnérabilité importée (ValueError si un produit est incomplet)"""
+    ranges = []
+    for affected in entry.get('affected') or []:
+        name = (affected.get('product') or '').strip()
+        if not name:
+            raise ValueError(f"{entry['id']} : produit manquant")
+        if affected.get('version'):
+            start = end = affected['version']
+            start_inclusive = end_inclusive = True
+        else:
+            start = affected.get(START_INCLUDING) or affected.get(START_EXCLUDING) or ''
+            start_inclusive = not affected.get(START_EXCLUDING)
+            end = affected.get(END_INCLUDING) or affected.get(END_EXCLUDING) or ''
+            end_inclusive = bool(affected.get(END_INCLUDING))
+        ranges.append(VulnerableRange(
+            product_name=name[:255],
+            publisher=(affected.get('publisher') or '')[:255],
+            version_start=start[:100],
+            start_inclusive=start_inclusive,
+            version_end=end[:100],
+            end_inclusive=end_inclusive,
+            start_key=version_key(start),
+            end_key=version_key(end),
+        ))
+    return ranges
+
+
+def load_entries(source):
+    """Entrées d'un fichier JSON (liste ou {"vulnerabilities": [...]}) ou JSON Lines"""
+    text = source.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get('vulnerabilities', [data])
+    return data
+
+
+@transaction.atomic
+def import_vulnerabilities(entries, replace=False, now=None):
+    """
+    Importe (crée ou remplace) des vulnérabilités et leurs intervalles, puis
+    rapproche le parc. `replace` supprime les vulnérabilités absentes de
+    l'import. Retourne un dictionnaire de compteurs.
+    """
+    now = now or timezone.now()
+    vulnerabilities = {}
+    ranges = {}
+    for entry in entries:
+        identifier = (entry.get('id') or '').strip()
+        if not identifier:
+            raise ValueError("Vulnérabilité sans identifiant")
+        # Pas de troncature : deux identifiants de même préfixe seraient confondus
+        if len(identifier) > IDENTIFIER_MAX_LENGTH:
+            raise ValueError(f"{identifier} : identifiant de plus de {IDENTIFIER_MAX_LENGTH} caractères")
+        severity = (entry.get('severity') or 'unknown').lower()
+        vulnerabilities[identifier] = Vulnerability(
+            identifier=identifier,
+            summary=entry.get('summary') or '',
+            severity=severity if severity in SEVERITIES else 'unknown',
+            cvss=entry.get('cvss'),
+            published_at=parse_datetime(entry['published']) if entry.get('published') else None,
+            imported_at=now,
+        )
+        ranges[identifier] = affected_ranges(entry)
+
+    Vulnerability.objects.bulk_create(
+        vulnerabilities.values(),
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['identifier'],
+        update_fields=['summary', 'severity', 'cvss', 'published_at', 'imported_at'],
+    )
+    ids = dict(Vulnerability.objects.filter(identifier__in=vulnerabilities).values_list('identifier', 'id'))
+    deleted = 0
+    if replace:
+        deleted = Vulnerability.objects.exclude(id__in=ids.values()).delete()[1].get(Vulnerability._meta.label, 0)
+
+    VulnerableRange.objects.filter(vulnerability_id__in=ids.values()).delete()
+    new_ranges = []
+    for identifier, vulnerability_ranges in ranges.items():
+        for affected in vulnerability_ranges:
+            affected.vulnerability_id = ids[identifier]
+            new_ranges.append(affected)
+    VulnerableRange.objects.bulk_create(new_ranges, batch_size=BATCH_SIZE)
+
+    created, removed = match_fleet(now)
+    return {
+        'vulnerabilities': len(vulnerabilities),
+        'ranges': len(new_ranges),
+        'deleted': deleted,
+        'findings_created': created,
+        'findings_removed': removed,
+    }
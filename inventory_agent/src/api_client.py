@@ -5,10 +5,46 @@ Client GraphQL pour l'API Django
 import requests
 import json
 import time
+import hashlib
 from typing import Dict, Any, Optional
 import logging
 
-from config import GRAPHQL_ENDPOINT, MAX_RETRIES, RETRY_DELAY
+from config import GRAPHQL_ENDPOINT, MAX_RETRIES, RETRY_DELAY, USE_PERSISTED_QUERIES
+
+
+# Empreintes de contenu : même algorithme que backend/inventory/fingerprints.py
+SOFTWARE_FINGERPRINT_FIELDS = [
+    'name', 'version', 'publisher', 'installDate',
+    'installLocation', 'uninstallString', 'source',
+]
+
+
+def content_fingerprint(value: Any) -> str:
+    """Empreinte SHA-256 d'une valeur JSON sérialisée de façon canonique, '' si vide"""
+    if not value:
+        return ''
+    canonical = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def software_fingerprint(items: list) -> str:
+    """Empreinte de la liste des logiciels normalisés (le dernier doublon l'emporte)"""
+    by_key = {(item['name'], item['version']): item for item in items}
+    rows = sorted(
+        [str(item[field]) for field in SOFTWARE_FINGERPRINT_FIELDS]
+        for item in by_key.values()
+    )
+    return content_fingerprint(rows)
+
+
+# Erreur renvoyée par le serveur lorsqu'il ne connaît pas une requête persistée
+PERSISTED_QUERY_NOT_FOUND = 'PersistedQueryNotFound'
+
+
+def persisted_query_not_found(result: Optional[Dict[str, Any]]) -> bool:
+    """Indique si le serveur demande le texte complet d'une requête persistée"""
+    errors = (result or {}).get('errors') or []
+    return any(error.get('message') == PERSISTED_QUERY_NOT_FOUND for error in errors)
 
 
 class GraphQLClient:
@@ -52,6 +88,28 @@ class GraphQLClient:
                 }
             """,
             
+            'get_computer_fingerprint': """
+                query GetComputerFingerprint($serialNumber: String!) {
+                    computerFingerprint(serialNumber: $serialNumber) {
+                        id
+                        systemHash
+                        hardwareHash
+                        networkHash
+                        softwareHash
+                    }
+                }
+            """,
+            
+            'touch_inventory': """
+                mutation TouchInventory($serialNumber: String!, $fingerprints: FingerprintInput!) {
+                    touchInventory(serialNumber: $serialNumber, fingerprints: $fingerprints) {
+                        matched
+                        success
+                        errors
+                    }
+                }
+            """,
+            
             'get_computer': """
                 query GetComputer($serialNumber: String!) {
                     computerBySerial(serialNumber: $serialNumber) {
@@ -116,9 +174,26 @@ class GraphQLClient:
             ,
             'bulk_create_software': """
                 mutation BulkCreateSoftware($computerId: Int!, $items: [SoftwareItemInput!]!) {
-                    bulkCreateSoftware(computerId: $computerId, items: $items) {
+                    bulkCreateSoftware(computerId: $computerId, items: $items, complete: true) {
                         created
                         updated
+                        deactivated
+                        success
+                        errors
+                    }
+                }
+            """,
+
+            'sync_inventory': """
+                mutation SyncInventory($input: ComputerInput!, $software: [SoftwareItemInput!]) {
+                    syncInventory(input: $input, software: $software) {
+                        computerId
+                        created
+                        softwareCreated
+                        softwareUpdated
+                        softwareDeactivated
+                        unchanged
+                        queued
                         success
                         errors
                     }
@@ -137,17 +212,24 @@ class GraphQLClient:
             'query': query,
             'variables': variables or {}
         }
+        if USE_PERSISTED_QUERIES:
+            # Seule l'empreinte est envoyée ; le texte ne l'est que si le serveur le demande
+            payload = {
+                'variables': variables or {},
+                'extensions': {
+                    'persistedQuery': {
+                        'version': 1,
+                        'sha256Hash': hashlib.sha256(query.encode('utf-8')).hexdigest(),
+                    }
+                }
+            }
         
         for attempt in range(MAX_RETRIES):
             try:
-                response = self.session.post(
-                    self.endpoint,
-                    json=payload,
-                    timeout=30
-                )
-                response.raise_for_status()
-                
-                result = response.json()
+                result = self._post(payload)
+                if persisted_query_not_found(result):
+                    payload = {**payload, 'query': query}
+                    result = self._post(payload)
                 
                 # Vérifier les erreurs GraphQL
                 if 'errors' in result:
@@ -170,6 +252,24 @@ class GraphQLClient:
                 logging.error(f"Erreur inattendue pour {query_name}: {str(e)}")
                 return None
     
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Envoie une requête GraphQL et retourne la réponse décodée"""
+        response = self.session.post(
+            self.endpoint,
+            json=payload,
+            timeout=30
+        )
+        if response.status_code == 400:
+            # Le serveur répond 400 lorsqu'une requête persistée lui est inconnue
+            try:
+                result = response.json()
+            except ValueError:
+                result = None
+            if persisted_query_not_found(result):
+                return result
+        response.raise_for_status()
+        return response.json()
+    
     def get_computer(self, serial_number: str) -> Optional[Dict[str, Any]]:
         """Récupère un ordinateur par son numéro de série"""
         result = self.execute_query('get_computer', {'serialNumber': serial_number})
@@ -177,6 +277,45 @@ class GraphQLClient:
             return result['computerBySerial']
         return None
     
+    def get_computer_fingerprint(self, serial_number: str) -> Optional[Dict[str, Any]]:
+        """Récupère les empreintes d'un ordinateur sans ses données JSON"""
+        result = self.execute_query('get_computer_fingerprint', {'serialNumber': serial_number})
+        if result and 'computerFingerprint' in result:
+            return result['computerFingerprint']
+        return None
+    
+    def compute_fingerprints(self, computer_data: Dict[str, Any], software_list: Optional[list] = None) -> Dict[str, str]:
+        """Calcule les empreintes locales des sections non vides de l'inventaire"""
+        fingerprints = {}
+        for input_field, hash_field in (
+            ('systemInfo', 'systemHash'),
+            ('hardwareInfo', 'hardwareHash'),
+            ('networkInfo', 'networkHash'),
+        ):
+            value = computer_data.get(input_field)
+            if isinstance(value, str):
+                value = json.loads(value) if value else {}
+            fingerprint = content_fingerprint(value)
+            if fingerprint:
+                fingerprints[hash_field] = fingerprint
+        
+        items = self.prepare_software_items(software_list or [])
+        if items:
+            fingerprints['softwareHash'] = software_fingerprint(items)
+        return fingerprints
+    
+    def touch_inventory(self, serial_number: str, fingerprints: Dict[str, str]) -> bool:
+        """Signale un scan sans changement ; retourne False si un envoi complet est nécessaire"""
+        if not serial_number or not fingerprints:
+            return False
+        result = self.execute_query('touch_inventory', {
+            'serialNumber': serial_number,
+            'fingerprints': fingerprints
+        })
+        if result and 'touchInventory' in result:
+            return bool(result['touchInventory'].get('matched'))
+        return False
+    
     def create_computer(self, computer_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crée un nouvel ordinateur"""
         result = self.execute_query('create_computer', {'input': computer_data})
@@ -226,31 +365,15 @@ class GraphQLClient:
                 logging.error("Numéro de série manquant pour la synchronisation")
                 return False
             
-            # Vérifier si l'ordinateur existe déjà
-            existing_computer = self.get_computer(serial_number)
+            # Vérifier si l'ordinateur existe déjà (empreintes uniquement)
+            existing_computer = self.get_computer_fingerprint(serial_number)
             
             if existing_computer:
                 # Détection de changements: si aucun changement, ignorer la MAJ
-                try:
-                    def _to_str(value):
-                        if isinstance(value, dict):
-                            return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
-                        return value or ""
-
-                    same = (
-                        (existing_computer.get('hostname') or '') == (computer_data.get('hostname') or '') and
-                        (existing_computer.get('manufacturer') or '') == (computer_data.get('manufacturer') or '') and
-                        (existing_computer.get('model') or '') == (computer_data.get('model') or '') and
-                        (existing_computer.get('currentUser') or '') == (computer_data.get('currentUser') or '') and
-                        _to_str(existing_computer.get('systemInfo')) == (computer_data.get('systemInfo') or '') and
-                        _to_str(existing_computer.get('hardwareInfo')) == (computer_data.get('hardwareInfo') or '') and
-                        _to_str(existing_computer.get('networkInfo')) == (computer_data.get('networkInfo') or '')
-                    )
-                    if same:
-                        logging.info(f"Aucun changement détecté pour {serial_number}, mise à jour ignorée")
-                        return True
-                except Exception:
-                    pass
+                local = self.compute_fingerprints(computer_data)
+                if local and all(existing_computer.get(field) == value for field, value in local.items()):
+                    logging.info(f"Aucun changement détecté pour {serial_number}, mise à jour ignorée")
+                    return True
                 # Mettre à jour l'ordinateur existant
                 result = self.update_computer(existing_computer['id'], computer_data)
                 if result:
@@ -273,25 +396,68 @@ class GraphQLClient:
             logging.error(f"Erreur lors de la synchronisation: {str(e)}")
             return False
     
+    def prepare_software_items(self, software_list: list) -> list:
+        """Normalise la liste des logiciels collectés pour l'API"""
+        items = []
+        for sw in software_list:
+            name = (sw.get('name') or '').strip()
+            if not name:
+                continue
+            item = {
+                'name': name[:255],
+                'version': (sw.get('version') or 'Unknown')[:100],
+                'publisher': (sw.get('publisher') or 'Unknown')[:255],
+                'installDate': (sw.get('install_date') or 'Unknown'),
+                'installLocation': (sw.get('install_location') or '')[:512],
+                'uninstallString': (sw.get('uninstall_string') or ''),
+                'source': (sw.get('source') or '')[:50]
+            }
+            items.append(item)
+        return items
+
+    def sync_inventory(self, computer_data: Dict[str, Any], software_list: Optional[list] = None) -> Optional[Dict[str, Any]]:
+        """Synchronise l'ordinateur et ses logiciels en un seul aller-retour"""
+        try:
+            serial_number = computer_data.get('serialNumber')
+            if not serial_number:
+                logging.error("Numéro de série manquant pour la synchronisation")
+                return None
+
+            variables = {'input': computer_data}
+            # Une liste vide n'est pas envoyée pour ne pas écraser les logiciels connus
+            items = self.prepare_software_items(software_list or [])
+            if items:
+                variables['software'] = items
+
+            result = self.execute_query('sync_inventory', variables)
+            if not result or 'syncInventory' not in result:
+                logging.error("Réponse inattendue pour syncInventory")
+                return None
+
+            payload = result['syncInventory']
+            if not payload.get('success'):
+                logging.error(f"Échec de la synchronisation de {serial_number}: {payload.get('errors')}")
+                return None
+
+            if payload.get('queued'):
+                logging.info(f"Inventaire de {serial_number} mis en file d'attente sur le serveur")
+                return payload
+
+            logging.info(
+                f"Ordinateur {serial_number} {'créé' if payload.get('created') else 'mis à jour'}, "
+                f"logiciels: {payload.get('softwareCreated')} créés, {payload.get('softwareUpdated')} mis à jour, "
+                f"{payload.get('softwareDeactivated')} désinstallés"
+            )
+            return payload
+
+        except Exception as e:
+            logging.error(f"Erreur lors de la synchronisation de l'inventaire: {str(e)}")
+            return None
+
     def sync_software_data(self, computer_id: str, software_list: list) -> bool:
         """Synchronise les données des logiciels d'un ordinateur"""
         try:
-            # Préparer les items normalisés
-            items = []
-            for sw in software_list:
-                name = (sw.get('name') or '').strip()
-                if not name:
-                    continue
-                item = {
-                    'name': name[:255],
-                    'version': (sw.get('version') or 'Unknown')[:100],
-                    'publisher': (sw.get('publisher') or 'Unknown')[:255],
-                    'installDate': (sw.get('install_date') or 'Unknown'),
-                    'installLocation': (sw.get('install_location') or '')[:512],
-                    'uninstallString': (sw.get('uninstall_string') or ''),
-                    'source': (sw.get('source') or '')[:50]
-                }
-                items.append(item)
+            items = self.prepare_software_items(software_list)
 
             if not items:
                 return True
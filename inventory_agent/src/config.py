@@ -38,6 +38,9 @@ EXCLUDED_SOFTWARE = [
     "Hotfix"
 ]
 
+# Requêtes persistées : n'envoyer que l'empreinte des requêtes déjà connues du serveur
+USE_PERSISTED_QUERIES = True
+
 # Configuration de retry
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # secondes